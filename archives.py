@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Archives zip / tar utilisées comme sources, sans extraction sur disque.
+
+Un membre est désigné par un chemin virtuel "<archive>!<sep><membre>", par
+exemple /depots/src.zip!/pkg/module.py. Les membres passent par les mêmes
+filtres et transformations que les fichiers ordinaires ; la lecture se fait
+en flux, la mémoire reste bornée par la taille max par fichier (ou par le
+début + la fin en mode troncature).
+"""
+from __future__ import annotations
+import os
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+from models import Options
+from core import (
+    ARCHIVE_MARK, BINARY_EXTS, SKIP_REASONS, decode_text, human_size, join_head_tail, render_text, skipped_kinds,
+    sniff_kind
+)
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+_MAX_OPEN = 4
+_SNIFF_SIZE = 4096
+_READ_CHUNK = 1024 * 1024
+
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+def split_member(vpath: str) -> Optional[Tuple[str, str]]:
+    """(chemin de l'archive, nom du membre avec '/') ou None si vpath n'est pas un membre."""
+    i = vpath.find(ARCHIVE_MARK)
+    while i >= 0:
+        archive = vpath[:i]
+        if is_archive(archive):
+            return archive, vpath[i + len(ARCHIVE_MARK):].replace(os.sep, '/')
+        i = vpath.find(ARCHIVE_MARK, i + 1)
+    return None
+
+
+def _clean_name(name: str) -> Optional[str]:
+    """Nom de membre normalisé, ou None s'il sort de l'archive (absolu, '..')."""
+    name = name.replace('\\', '/')
+    while name.startswith('./'):
+        name = name[2:]
+    parts = [p for p in name.split('/') if p and p != '.']
+    if not parts or name.startswith('/') or '..' in parts:
+        return None
+    return '/'.join(parts)
+
+
+class _Archive:
+    """Archive ouverte : liste des membres (ordre de l'archive) et accès en lecture."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.users = 0          # lecteurs en cours (voir _opened), sous _open_lock
+        self.retired = False    # sortie du cache : fermée au départ du dernier lecteur
+        self.sizes: Dict[str, int] = {}
+        self._raw: Dict[str, object] = {}
+        if zipfile.is_zipfile(path):
+            self._zip: Optional[zipfile.ZipFile] = zipfile.ZipFile(path)
+            self._tar: Optional[tarfile.TarFile] = None
+            for info in self._zip.infolist():
+                name = _clean_name(info.filename)
+                if name is not None and not info.is_dir():
+                    self.sizes[name] = info.file_size
+                    self._raw[name] = info
+        else:
+            self._zip = None
+            self._tar = tarfile.open(path, 'r:*')
+            for member in self._tar.getmembers():
+                name = _clean_name(member.name)
+                if name is not None and member.isreg():
+                    self.sizes[name] = member.size
+                    self._raw[name] = member
+
+    def open(self, name: str) -> IO[bytes]:
+        raw = self._raw[name]
+        if self._zip is not None:
+            return self._zip.open(raw)  # type: ignore[arg-type]
+        assert self._tar is not None
+        f = self._tar.extractfile(raw)  # type: ignore[arg-type]
+        if f is None:
+            raise OSError(f"membre illisible : {name}")
+        return f
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+        if self._tar is not None:
+            self._tar.close()
+
+
+_open: OrderedDict[str, Tuple[Tuple[int, int], _Archive]] = OrderedDict()
+_open_lock = threading.Lock()
+
+
+def _retire(arc: _Archive) -> None:
+    """Sort `arc` du cache ; fermée tout de suite si personne ne la lit (_open_lock tenu)."""
+    arc.retired = True
+    if not arc.users:
+        arc.close()
+
+
+@contextmanager
+def _opened(path: str) -> Iterator[_Archive]:
+    """
+    Archive ouverte, gardée en cache (quelques-unes) tant qu'elle ne change pas sur disque.
+    Une archive évincée pendant qu'un autre thread la lit n'est fermée qu'à la fin de sa lecture.
+    """
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    with _open_lock:
+        cached = _open.get(path)
+        if cached is not None and cached[0] == key:
+            _open.move_to_end(path)
+            arc = cached[1]
+        else:
+            arc = _Archive(path)
+            if cached is not None:
+                _retire(cached[1])
+            _open[path] = (key, arc)
+            while len(_open) > _MAX_OPEN:
+                _, (_, old) = _open.popitem(last=False)
+                _retire(old)
+        arc.users += 1
+    try:
+        yield arc
+    finally:
+        with _open_lock:
+            arc.users -= 1
+            if arc.retired and not arc.users:
+                arc.close()
+
+
+def close_archives() -> None:
+    with _open_lock:
+        for _, arc in _open.values():
+            _retire(arc)
+        _open.clear()
+
+
+def list_members(archive: str, opts: Options) -> List[str]:
+    """Chemins virtuels des membres retenus par les filtres (extensions, dossiers exclus, récursivité)."""
+    excluded = {d.strip() for d in opts.exclude_dirs if d.strip()}
+    include_all = (len(opts.include_exts) == 0)
+    try:
+        with _opened(archive) as arc:
+            names = list(arc.sizes)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError):
+        return []
+    prefix = archive + ARCHIVE_MARK
+    out: List[str] = []
+    for name in names:
+        parts = name.split('/')
+        if not opts.recursive and len(parts) > 1:
+            continue
+        if excluded and not excluded.isdisjoint(parts[:-1]):
+            continue
+        if not include_all and os.path.splitext(parts[-1])[1].lower() not in opts.include_exts:
+            continue
+        out.append(prefix + name.replace('/', os.sep))
+    return out
+
+
+def member_size(vpath: str) -> int:
+    split = split_member(vpath)
+    if split is None:
+        raise FileNotFoundError(vpath)
+    try:
+        with _opened(split[0]) as arc:
+            size = arc.sizes.get(split[1])
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise OSError(str(e))
+    if size is None:
+        raise FileNotFoundError(vpath)
+    return size
+
+
+def _read_member(f: IO[bytes], name: str, size: int, opts: Options,
+                 too_big: bool) -> Tuple[Optional[str], Optional[str]]:
+    """Lit un membre en flux. Retourne (contenu, None) ou (None, raison)."""
+    sniff = f.read(_SNIFF_SIZE)
+    skip = skipped_kinds(opts)
+    if skip:
+        kind = sniff_kind(name, sniff, complete=len(sniff) < _SNIFF_SIZE)
+        if kind in skip:
+            return None, SKIP_REASONS[kind]
+    head, tail = opts.head_kb * 1024, opts.tail_kb * 1024
+    if not (too_big and head + tail < size):
+        return decode_text(sniff + f.read()), None  # comme un fichier lu sur disque
+
+    # Membre compressé : pas de seek possible, on ne garde que la fin du flux
+    h = bytearray(sniff)
+    if len(h) < head:
+        h += f.read(head - len(h))
+    del h[head:]
+    t = bytearray(sniff[head:])
+    while True:
+        chunk = f.read(_READ_CHUNK)
+        if not chunk:
+            break
+        t += chunk
+        if len(t) > tail:
+            del t[:len(t) - tail]
+    return join_head_tail(bytes(h), bytes(t), size), None
+
+
+def render_member(vpath: str, opts: Options) -> Tuple[Optional[str], Optional[str]]:
+    """Comme core.render_file, pour un membre d'archive."""
+    split = split_member(vpath)
+    if split is None:
+        return None, "erreur: membre d'archive introuvable"
+    archive, name = split
+    max_bytes = int(opts.max_mb * 1024 * 1024)
+    try:
+        with _opened(archive) as arc:
+            size = arc.sizes.get(name)
+            if size is None:
+                return None, "erreur: membre d'archive introuvable"
+            too_big = size > max_bytes
+            if too_big and not opts.truncate_large:
+                return None, f"taille {human_size(size)} > {opts.max_mb} Mo"
+            if opts.ignore_binaries and os.path.splitext(name)[1].lower() in BINARY_EXTS:
+                return None, SKIP_REASONS['binary']
+            with arc.lock:
+                with arc.open(name) as f:
+                    content, reason = _read_member(f, name, size, opts, too_big)
+    except Exception as e:
+        return None, f"erreur: {e}"
+    if content is None:
+        return None, reason
+    return render_text(vpath, content, opts)
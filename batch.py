@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Exécution groupée de profils enregistrés (concatenator-cli --batch).
+
+Les sources de tous les profils sont parcourues avec un cache de listings
+commun : un dossier partagé par plusieurs profils n'est listé qu'une fois.
+Chaque profil écrit ensuite sa sortie dans son propre thread, avec ses filtres
+et ses transformations, mais tous passent par un SharedRenderer : un fichier
+de l'union n'est lu qu'une fois, et un segment n'est rendu qu'une fois par jeu
+d'options de rendu, quel que soit le nombre de profils qui l'utilisent.
+
+Les valeurs partagées en attente de leurs derniers utilisateurs sont bornées
+(SHARED_BUFFER_BYTES) : si un profil prend du retard, les plus anciennes sont
+libérées et ce profil les relira ou les re-rendra lui-même.
+"""
+from __future__ import annotations
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import profiles
+from models import BatchResult, Options
+from core import (
+    BINARY_EXTS, DirLister, FileSink, KindCheck, ProgressCb, RenderFn, concat_to_sinks, detect_kind,
+    gather_candidate_files, kind_from_name, list_dir, render_file, skipped_kinds
+)
+from caches import ListingCache, render_key
+from filetable import FileTable
+from tracing import span
+
+
+SHARED_BUFFER_BYTES = 64 * 1024 * 1024  # valeurs gardées pour les profils en retard
+
+
+def _value_size(value: object) -> int:
+    """Taille approximative d'une valeur partagée (contenu lu ou segment rendu)."""
+    if isinstance(value, tuple):
+        return 64 + sum(len(v) for v in value if v is not None)
+    return 64 + (len(value) if isinstance(value, (bytes, str)) else 0)
+
+
+class _Shared:
+    """
+    Valeur calculée par son premier demandeur, gardée jusqu'à son dernier utilisateur.
+    Si le calcul échoue, l'exception est relancée chez chaque utilisateur qui l'attendait.
+    """
+    __slots__ = ('value', 'error', 'size', 'ready')
+
+    def __init__(self):
+        self.value: object = None
+        self.error: Optional[BaseException] = None
+        self.size = 0
+        self.ready = threading.Event()
+
+
+class SharedRenderer:
+    """
+    Rendu partagé entre les profils d'un lot, utilisable depuis plusieurs threads.
+
+    Le nombre d'utilisations de chaque fichier et de chaque segment est connu
+    d'avance (listes de fichiers des profils) : une entrée est libérée dès que
+    son dernier utilisateur l'a prise. Un thread qui demande une entrée en
+    cours de calcul attend son résultat au lieu de relire le fichier.
+
+    Les entrées prêtes sont bornées à `max_buffer` octets : au-delà, les plus
+    anciennes sont libérées (sans bloquer les profils en avance) et leurs
+    utilisateurs restants les recalculent.
+    """
+
+    def __init__(self, jobs: Iterable[Tuple[Sequence[str], Options]], classify: KindCheck = detect_kind,
+                 max_buffer: int = SHARED_BUFFER_BYTES):
+        self._classify = classify
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        # Segments : clé (chemin, options de rendu) ; contenus lus : clé chemin
+        self._entries: Dict[Hashable, _Shared] = {}  # ordre d'insertion = ordre d'éviction
+        self._uses: Dict[Hashable, int] = {}         # utilisations restantes par clé
+        self._buffered = 0
+        self._variants: Dict[str, Dict[Hashable, Options]] = {}  # chemin -> options de rendu distinctes
+        for files, opts in jobs:
+            rkey = render_key(opts)
+            for f in files:
+                k = (f, rkey)
+                self._uses[k] = self._uses.get(k, 0) + 1
+                self._variants.setdefault(f, {})[rkey] = opts
+        for f, variants in self._variants.items():
+            self._uses[f] = len(variants)
+        self.reads = 0      # fichiers lus en entier
+        self.renders = 0    # segments rendus
+        self.evictions = 0  # entrées libérées avant leur dernier utilisateur
+
+    def _take(self, key: Hashable, produce: Callable[[], object]) -> object:
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if entry is None:
+                entry = self._entries[key] = _Shared()
+        if owner:
+            try:
+                entry.value = produce()
+            except BaseException as e:
+                entry.error = e
+            with self._lock:
+                if entry.error is not None:
+                    # Pas gardée : les utilisateurs suivants recalculent
+                    self._entries.pop(key, None)
+                elif self._entries.get(key) is entry:
+                    entry.size = _value_size(entry.value)
+                    self._buffered += entry.size
+                    self._evict()
+            entry.ready.set()
+        else:
+            entry.ready.wait()
+        with self._lock:
+            left = self._uses.get(key, 1) - 1
+            if left > 0:
+                self._uses[key] = left
+            else:
+                self._uses.pop(key, None)
+                self._drop(key, entry)
+        if entry.error is not None:
+            raise entry.error
+        return entry.value
+
+    def _drop(self, key: Hashable, entry: _Shared) -> None:
+        """Retire `entry` de la table si elle y est encore (verrou tenu)."""
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+            self._buffered -= entry.size
+
+    def _evict(self) -> None:
+        """Libère les plus anciennes entrées prêtes au-delà du budget (verrou tenu)."""
+        excess = self._buffered - self.max_buffer
+        if excess <= 0:
+            return
+        victims = []
+        for key, entry in self._entries.items():
+            if excess <= 0:
+                break
+            if entry.ready.is_set():
+                victims.append((key, entry))
+                excess -= entry.size
+        for key, entry in victims:
+            self._drop(key, entry)
+        self.evictions += len(victims)
+
+    @property
+    def buffered(self) -> int:
+        """Octets (approximatifs) des entrées prêtes gardées pour d'autres profils."""
+        with self._lock:
+            return self._buffered
+
+    def renderer(self, opts: Options) -> RenderFn:
+        """Fonction de rendu d'un profil (options `opts`), pour concat_to_sinks."""
+        rkey = render_key(opts)
+
+        def render(fpath: str, o: Options) -> Tuple[str | None, str | None]:
+            return self._take((fpath, rkey), lambda: self._render(fpath, o))  # type: ignore[return-value]
+        return render
+
+    def _render(self, fpath: str, opts: Options) -> Tuple[str | None, str | None]:
+        variants = self._variants.get(fpath, {})
+        data = self._take(fpath, lambda: self._read(fpath, variants.values()))
+        with self._lock:
+            self.renders += 1
+        return render_file(fpath, opts, self._classify, data=data)  # type: ignore[arg-type]
+
+    def _read(self, fpath: str, variants: Iterable[Options]) -> Optional[bytes]:
+        """
+        Contenu complet du fichier si au moins un profil le lira en entier ; sinon
+        None (fichier ignoré ou tronqué partout, membre d'archive…) et chaque
+        rendu lit lui-même ce qu'il lui faut.
+        """
+        try:
+            size = os.stat(fpath).st_size
+        except OSError:
+            return None
+        ext = os.path.splitext(fpath)[1].lower()
+        name_kind = kind_from_name(fpath)
+        for o in variants:
+            skip = skipped_kinds(o)
+            if ('binary' in skip and ext in BINARY_EXTS) or name_kind in skip:
+                continue
+            if size <= o.max_mb * 1024 * 1024 or (o.truncate_large and (o.head_kb + o.tail_kb) * 1024 >= size):
+                break
+        else:
+            return None
+        try:
+            with open(fpath, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self.reads += 1
+        return data
+
+
+Job = Tuple[BatchResult, FileTable, Options]
+
+
+def prepare_jobs(names: Sequence[str], lister: DirLister = list_dir,
+                 scan_workers: int = 1) -> Tuple[List[BatchResult], List[Job]]:
+    """
+    Charge les profils et liste leurs fichiers avec un cache de listings commun.
+    Retourne (un résultat par nom, tâches exécutables). Un profil inutilisable
+    (introuvable, sans source ou sans sortie, sortie déjà prise par un autre
+    profil) n'a pas de tâche : son erreur est dans son BatchResult.
+    """
+    listings = ListingCache(lister=lister)
+    results: List[BatchResult] = []
+    jobs: List[Job] = []
+    outputs: Dict[str, str] = {}
+    for name in names:
+        res = BatchResult(profile=name)
+        results.append(res)
+        try:
+            prof = profiles.load_profile(name)
+        except ValueError as e:
+            res.error = f"profil illisible : {e}"
+            continue
+        if prof is None:
+            res.error = "profil introuvable"
+            continue
+        res.out_path = prof.out_path
+        roots, excluded = profiles.profile_selection(prof)
+        out = os.path.abspath(prof.out_path) if prof.out_path else ""
+        if not out:
+            res.error = "aucun fichier de sortie"
+        elif out in outputs:
+            res.error = f"même sortie que le profil « {outputs[out]} »"
+        elif not roots:
+            res.error = "aucune source"
+        if res.error:
+            continue
+        outputs[out] = name
+        opts = profiles.profile_options(prof)
+        with span('batch_scan', profile=name):
+            found = gather_candidate_files(roots, opts, listings, scan_workers)
+        files = found.without(excluded)
+        res.files = len(files)
+        jobs.append((res, files, opts))
+    return results, jobs
+
+
+def run_batch(names: Sequence[str], lister: DirLister = list_dir, classify: KindCheck = detect_kind,
+              scan_workers: int = 1, progress_cb: ProgressCb = None) -> Tuple[List[BatchResult], SharedRenderer]:
+    """
+    Exécute les profils `names` : une sortie par profil, toutes écrites en
+    parallèle (un thread par profil), chaque fichier lu une seule fois.
+    Les erreurs d'un profil n'arrêtent pas les autres (BatchResult.error).
+    Retourne (résultats dans l'ordre de names, rendu partagé pour ses compteurs).
+    """
+    results, runnable = prepare_jobs(names, lister, scan_workers)
+    shared = SharedRenderer(((files, opts) for _, files, opts in runnable), classify)
+
+    total = max(1, sum(len(files) for _, files, _ in runnable))
+    done = [0] * len(runnable)
+    lock = threading.Lock()
+
+    def job_progress(idx: int) -> ProgressCb:
+        if progress_cb is None:
+            return None
+
+        def cb(i: int, _total: int) -> None:
+            with lock:
+                done[idx] = i
+                n = sum(done)
+            progress_cb(n, total)
+        return cb
+
+    def run(idx: int) -> None:
+        res, files, opts = runnable[idx]
+        sink = FileSink(res.out_path)
+        try:
+            with span('batch_profile', profile=res.profile):
+                res.written, res.skipped = concat_to_sinks(files, opts, [sink], job_progress(idx),
+                                                           shared.renderer(opts))
+            res.changed = sink.changed
+        except Exception as e:
+            res.error = f"erreur: {e}"
+
+    if runnable:
+        with ThreadPoolExecutor(max_workers=len(runnable), thread_name_prefix='batch') as pool:
+            list(pool.map(run, range(len(runnable))))
+    return results, shared
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Mémoire et temps de la liste des fichiers candidats : FileTable contre liste de chemins.
+
+L'arborescence est simulée sous un dossier temporaire vide (lister en mémoire,
+aucun accès disque) : seuls le parcours et le stockage des chemins sont
+mesurés. La « liste » reproduit l'ancienne construction (chemins complets,
+dédoublonnage, copie filtrée). Le temps est mesuré sans traçage, la mémoire
+(tracemalloc) sur une seconde construction.
+
+    python benchmarks/bench_filetable.py [--files 1000000] [--per-dir 50]
+"""
+from __future__ import annotations
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import DirListing, gather_candidate_files, iter_dir_files  # noqa: E402
+from models import Options  # noqa: E402
+
+
+class FakeTree:
+    """Lister d'une arborescence virtuelle : `n_dirs` dossiers de `per_dir` fichiers, 10 sous-dossiers par niveau."""
+
+    def __init__(self, root: str, n_files: int, per_dir: int):
+        self.root = root
+        self.n_dirs = max(1, n_files // per_dir)
+        self.per_dir = per_dir
+
+    def _index(self, path: str) -> int:
+        rel = path[len(self.root):].strip(os.sep)
+        return int(rel.rsplit("d", 1)[1]) if rel else 0
+
+    def __call__(self, path: str) -> DirListing:
+        i = self._index(path)
+        files = [f"module_{i}_{k:03d}.py" for k in range(self.per_dir)]
+        subdirs = [f"d{c}" for c in range(i * 10 + 1, i * 10 + 11) if c < self.n_dirs]
+        return files, subdirs
+
+
+def measure(label: str, build) -> object:
+    """Temps d'une construction (sans traçage), puis mémoire retenue d'une seconde (tracemalloc)."""
+    gc.collect()
+    t0 = time.perf_counter()
+    value = build()
+    dt = time.perf_counter() - t0
+    del value
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:28} {len(value):>9} fichiers  {used / 2**20:8.1f} Mo  {dt:6.2f} s")
+    return value
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--files", type=int, default=1_000_000)
+    ap.add_argument("--per-dir", type=int, default=50)
+    args = ap.parse_args()
+
+    opts = Options(recursive=True, include_exts=set(), exclude_dirs=set(), ignore_binaries=True,
+                   max_mb=5.0, add_headers=True, normalize_eol=True)
+    with tempfile.TemporaryDirectory() as root:
+        return run(root, FakeTree(root, args.files, args.per_dir), opts)
+
+
+def run(root: str, tree: FakeTree, opts: Options) -> int:
+    excluded = {os.path.join(root, "module_0_000.py")}
+
+    old = measure("liste de chemins", lambda: [f for f in dict.fromkeys(iter_dir_files(root, opts, tree))
+                                               if f not in excluded])
+    old_len = len(old)
+    first, last = old[0], old[-1]
+    del old
+    table = measure("FileTable", lambda: gather_candidate_files([root], opts, tree).without(excluded))
+    if len(table) != old_len or table[0] != first or table[-1] != last:
+        print("ERREUR : contenus différents", file=sys.stderr)
+        return 1
+    t0 = time.perf_counter()
+    n = sum(1 for _ in table)
+    print(f"itération de la table        {n:>9} chemins   {time.perf_counter() - t0:6.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Ordre de lecture : 'path' (ordre de sortie) contre 'inode' (ordre du disque).
+
+Scénario « cache froid » : avant chaque mesure, les pages des fichiers sont
+chassées du cache. En root, via /proc/sys/vm/drop_caches (tout le cache) ;
+sinon, fichier par fichier, via posix_fadvise(DONTNEED) après un sync (les
+pages propres sont libérées, sans droits particuliers). Scénario « cache
+chaud » : les mêmes lectures, cache rempli.
+
+    python benchmarks/bench_read_order.py [--files 5000] [--kb 8] [--runs 3] [--dir CHEMIN]
+
+Sans --dir, l'arborescence est générée dans un dossier temporaire (créé dans
+le dossier courant : un tmpfs ne montrerait aucune différence), fichiers créés
+dans un ordre aléatoire pour que l'ordre des chemins diffère de celui des
+inodes. Avec --dir, mesure une arborescence existante (disque dur, NFS…).
+"""
+from __future__ import annotations
+import argparse
+import dataclasses
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core import gather_candidate_files, iter_concat  # noqa: E402
+from models import Options  # noqa: E402
+
+
+def make_tree(base: str, n_files: int, kb: int) -> None:
+    names = [os.path.join(f"d{i % 50:02d}", f"f{i:06d}.txt") for i in range(n_files)]
+    random.Random(42).shuffle(names)
+    line = "x" * 63 + "\n"
+    for name in names:
+        path = os.path.join(base, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(line * (kb * 16))
+
+
+def drop_caches(files: List[str]) -> str:
+    """Chasse les fichiers du cache de pages. Retourne la méthode utilisée."""
+    os.sync()
+    try:
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return "drop_caches"
+    except OSError:
+        pass
+    if not hasattr(os, "posix_fadvise"):
+        return "aucune (cache chaud)"
+    for p in files:
+        try:
+            fd = os.open(p, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return "fadvise(DONTNEED)"
+
+
+def run(files: List[str], opts: Options) -> float:
+    t0 = time.perf_counter()
+    for _ in iter_concat(files, opts):
+        pass
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--files", type=int, default=5000)
+    ap.add_argument("--kb", type=int, default=8, help="taille de chaque fichier généré (Ko)")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--dir", help="arborescence existante à mesurer (au lieu d'en générer une)")
+    args = ap.parse_args()
+
+    tmp = None
+    base = args.dir
+    if base is None:
+        tmp = tempfile.mkdtemp(prefix="bench_read_order_", dir=os.getcwd())
+        base = tmp
+        make_tree(base, args.files, args.kb)
+    try:
+        opts = Options(recursive=True, include_exts=set(), exclude_dirs=set(), ignore_binaries=True,
+                       max_mb=5.0, add_headers=True, normalize_eol=True)
+        files = gather_candidate_files([base], opts)
+        print(f"{len(files)} fichiers sous {base}")
+        for cold in (True, False):
+            label = "froid" if cold else "chaud"
+            for order in ("path", "inode"):
+                o = dataclasses.replace(opts, read_order=order)
+                times, method = [], ""
+                for _ in range(args.runs):
+                    if cold:
+                        method = drop_caches(files)
+                    times.append(run(files, o))
+                extra = f"  [{method}]" if cold else ""
+                print(f"cache {label:5} ordre {order:5} : médiane {statistics.median(times) * 1000:8.0f} ms"
+                      f"   (min {min(times) * 1000:.0f}){extra}")
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
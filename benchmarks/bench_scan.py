@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Parcours séquentiel vs parallèle sur un système de fichiers « lent ».
+
+Chaque listing de dossier est retardé (latence simulée d'un montage réseau).
+
+    python benchmarks/bench_scan.py [--dirs 400] [--latency-ms 5] [--workers 16]
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import DirListing, gather_candidate_files, list_dir  # noqa: E402
+from models import Options  # noqa: E402
+
+
+class SlowLister:
+    """Lister qui attend `latency` secondes avant chaque listing (aller-retour réseau)."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, path: str) -> DirListing:
+        self.calls += 1
+        time.sleep(self.latency)
+        return list_dir(path)
+
+
+def make_tree(root: str, n_dirs: int, files_per_dir: int = 5, fanout: int = 8) -> None:
+    dirs = [root]
+    made = 0
+    i = 0
+    while made < n_dirs:
+        parent = dirs[i // fanout]
+        d = os.path.join(parent, f"d{made}")
+        os.mkdir(d)
+        for k in range(files_per_dir):
+            with open(os.path.join(d, f"f{k}.txt"), "w") as fh:
+                fh.write("x\n")
+        dirs.append(d)
+        made += 1
+        i += 1
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--dirs", type=int, default=400)
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    ap.add_argument("--workers", type=int, default=16)
+    args = ap.parse_args()
+
+    opts = Options(recursive=True, include_exts=set(), exclude_dirs=set(), ignore_binaries=True,
+                   max_mb=5.0, add_headers=True, normalize_eol=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        make_tree(tmp, args.dirs)
+        results = {}
+        for workers in (1, args.workers):
+            lister = SlowLister(args.latency_ms / 1000.0)
+            t0 = time.perf_counter()
+            files = gather_candidate_files([tmp], opts, lister, workers)
+            dt = time.perf_counter() - t0
+            results[workers] = files
+            print(f"workers={workers:<3} {len(files):>6} fichiers  {lister.calls:>5} listings  {dt:7.3f} s")
+        if results[1] != results[args.workers]:
+            print("ERREUR : ordre différent entre les deux parcours", file=sys.stderr)
+            return 1
+    print("Ordre identique.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
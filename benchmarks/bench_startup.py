@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Temps de démarrage de l'interface : premier affichage et fenêtre interactive.
+
+Chaque mesure lance un nouveau processus (démarrage à froid de l'interpréteur
+et des imports). « Premier affichage » : premier événement Paint de la fenêtre
+principale ; « interactive » : fin des tâches différées du démarrage (icônes,
+boutons de l'arbre…), signal MainWindow.ready.
+
+    python benchmarks/bench_startup.py [--runs 5] [--items 200]
+
+--items : nombre d'éléments dans le profil chargé au démarrage (profil
+temporaire, dossier de données isolé via CONCATENATOR_HOME).
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_CHILD = r"""
+import sys, time, json
+sys.path.insert(0, ROOT)
+from PySide6.QtCore import QCoreApplication, QEvent, QObject, QTimer
+from PySide6.QtWidgets import QApplication
+
+marks = {}
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, ev):
+        if ev.type() == QEvent.Type.Paint and 'paint' not in marks and obj.isWindow():
+            marks['paint'] = time.time()
+        return False
+
+QCoreApplication.setOrganizationName("ConcatTools")
+QCoreApplication.setApplicationName("Concatenator")
+app = QApplication(sys.argv)
+flt = FirstPaint()
+app.installEventFilter(flt)
+from ui_mainwindow import MainWindow
+win = MainWindow()
+
+def done():
+    marks['ready'] = time.time()
+    QTimer.singleShot(0, app.quit)
+
+win.ready.connect(done)
+win.show()
+QTimer.singleShot(30000, app.quit)
+app.exec()
+print(json.dumps(marks))
+"""
+
+
+def make_profile(home: str, n_items: int) -> None:
+    os.environ['CONCATENATOR_HOME'] = home
+    import profiles
+    from models import Profile, ProfileItem
+    src = os.path.join(home, "src")
+    os.makedirs(src)
+    items = []
+    for i in range(n_items):
+        d = os.path.join(src, f"d{i}")
+        os.mkdir(d)
+        with open(os.path.join(d, "a.py"), "w") as fh:
+            fh.write("x = 1\n")
+        items.append(ProfileItem(path=d, kind='dir'))
+    profiles.save_profile(Profile(name="Défaut", items=items, out_path=os.path.join(home, "out.txt")))
+
+
+def run_once(home: str) -> dict:
+    env = dict(os.environ, CONCATENATOR_HOME=home)
+    t0 = time.time()
+    out = subprocess.run([sys.executable, "-c", f"ROOT = {ROOT!r}\n" + _CHILD], env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+    marks = json.loads(out.stdout.strip().splitlines()[-1])
+    return {k: v - t0 for k, v in marks.items()}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--items", type=int, default=200)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        make_profile(home, args.items)
+        paints, readies = [], []
+        for i in range(args.runs):
+            r = run_once(home)
+            paints.append(r.get('paint', float('nan')))
+            readies.append(r.get('ready', float('nan')))
+            print(f"run {i + 1}: premier affichage {paints[-1] * 1000:7.0f} ms   "
+                  f"interactive {readies[-1] * 1000:7.0f} ms")
+    print(f"médiane  : premier affichage {statistics.median(paints) * 1000:7.0f} ms   "
+          f"interactive {statistics.median(readies) * 1000:7.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
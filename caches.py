@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Caches en mémoire partagés entre exécutions (serveur local, lots de profils…)."""
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import fields
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from models import Options
+from core import ARCHIVE_MARK, SCHEDULING_FIELDS, DirListing, DirLister, list_dir, render_file
+
+# Champs d'Options qui n'influencent que la sélection des fichiers (ou l'ordre de lecture), pas leur rendu
+_SCAN_ONLY_FIELDS = {'recursive', 'include_exts', 'exclude_dirs'} | SCHEDULING_FIELDS
+
+
+def render_key(opts: Options) -> Tuple[Any, ...]:
+    """Empreinte (hashable) des options qui influencent le rendu d'un fichier."""
+    out = []
+    for f in fields(opts):
+        if f.name in _SCAN_ONLY_FIELDS:
+            continue
+        v = getattr(opts, f.name)
+        if isinstance(v, (set, frozenset)):
+            v = tuple(sorted(v))
+        elif isinstance(v, list):
+            v = tuple(v)
+        out.append(v)
+    return tuple(out)
+
+
+class LRUCache:
+    """Cache LRU thread-safe borné par un budget (somme des tailles des entrées)."""
+
+    def __init__(self, budget: int, sizeof: Callable[[Any], int] = lambda v: 1):
+        self.budget = budget
+        self.sizeof = sizeof
+        self._data: OrderedDict[Hashable, Tuple[Any, int]] = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self.sizeof(value)
+        if size > self.budget:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._used -= old[1]
+            self._data[key] = (value, size)
+            self._used += size
+            while self._used > self.budget and self._data:
+                _, (_, s) = self._data.popitem(last=False)
+                self._used -= s
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._data), 'used': self._used, 'budget': self.budget,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+def _listing_size(entry: Tuple[int, DirListing]) -> int:
+    files, dirs = entry[1]
+    return 64 + sum(len(n) + 56 for n in files) + sum(len(n) + 56 for n in dirs)
+
+
+class ListingCache:
+    """
+    Lister de dossiers validé par le mtime du dossier, utilisable par gather_candidate_files.
+    lister : lister appelé en cas d'absence (par défaut core.list_dir ; le cache persistant
+    de scancache pour un lot de profils).
+    """
+
+    def __init__(self, budget_bytes: int = 64 * 1024 * 1024, lister: DirLister = list_dir):
+        self._lru = LRUCache(budget_bytes, _listing_size)
+        self._lister = lister
+
+    def __call__(self, path: str) -> DirListing:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], []
+        cached = self._lru.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        listing = self._lister(path)
+        self._lru.put(path, (mtime, listing))
+        return listing
+
+    def stats(self) -> Dict[str, int]:
+        return self._lru.stats()
+
+
+class ContentCache:
+    """Segments de sortie déjà rendus, indexés par (chemin, mtime, taille, options de rendu)."""
+
+    def __init__(self, budget_bytes: int = 256 * 1024 * 1024):
+        # Approximation : un caractère ≈ un octet pour du code source
+        self._lru = LRUCache(budget_bytes, lambda v: len(v[0] or v[1] or '') + 64)
+
+    def render(self, fpath: str, opts: Options, rkey: Optional[Tuple[Any, ...]] = None) -> Tuple[str | None, str | None]:
+        """
+        Comme core.render_file, mais servi depuis le cache si le fichier n'a pas changé.
+        Un membre d'archive (« archive!/membre ») est validé par la date et la taille de l'archive.
+        """
+        stat_path = fpath
+        if ARCHIVE_MARK in fpath:
+            from archives import split_member
+            split = split_member(fpath)
+            if split is not None:
+                stat_path = split[0]
+        try:
+            st = os.stat(stat_path)
+        except OSError as e:
+            return None, f"erreur: {e}"
+        key = (fpath, st.st_mtime_ns, st.st_size, rkey if rkey is not None else render_key(opts))
+        cached = self._lru.get(key)
+        if cached is not None:
+            return cached
+        result = render_file(fpath, opts)
+        self._lru.put(key, result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return self._lru.stats()
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""Interface en ligne de commande (sans Qt)."""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import threading
+from typing import List, Optional, Sequence, Set, Tuple
+
+from models import Options, Profile
+from core import (
+    gather_candidate_files, concat_to_file, concat_to_gzip, concat_to_stream, concat_to_sinks,
+    OUTPUT_FORMATS, READ_ORDERS, TRANSFORMS, estimate_files, format_estimate, list_dir, render_file, route_from_patterns, ext_sinks,
+    FileSink, Sink, StreamSink, ResumeError, detect_kind, parse_csv_list
+)
+import profiles
+from scancache import cached_renderer, default_cache, default_verdicts
+
+
+def _print_skipped(skipped: List[Tuple[str, str]], limit: int = 5) -> None:
+    if not skipped:
+        return
+    print(f"Ignorés : {len(skipped)}", file=sys.stderr)
+    for p, why in skipped[:limit]:
+        print(f"- {p} ({why})", file=sys.stderr)
+    if len(skipped) > limit:
+        print("…", file=sys.stderr)
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns if path != '-' else None
+    except OSError:
+        return None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="concatenator-cli", description="Concatène des fichiers texte sans interface graphique.")
+    ap.add_argument("paths", nargs="*", help="fichiers ou dossiers à concaténer")
+    ap.add_argument("-o", "--out", help="fichier de sortie ('-' = sortie standard, '.gz' = compressé)")
+    ap.add_argument("--route", action="append", default=[], metavar="MOTIFS=SORTIE",
+                    help="sortie supplémentaire pour les fichiers filtrés, ex. '.py,.pyi=py.txt' ou '*.md=docs.txt' (répétable)")
+    ap.add_argument("--split-by-ext", action="store_true", help="écrire aussi une sortie par extension (concat.py.txt…)")
+    ap.add_argument("--format", choices=("auto",) + OUTPUT_FORMATS,
+                    help="format de sortie (auto = d'après l'extension : .jsonl, .md, sinon texte)")
+    ap.add_argument("-p", "--profile", help="profil enregistré à utiliser (sources, filtres, sortie)")
+    ap.add_argument("--batch", nargs="*", metavar="PROFIL",
+                    help="régénérer la sortie de plusieurs profils en une passe (sans nom : tous les profils) ; "
+                         "chaque fichier commun n'est lu qu'une fois")
+    ap.add_argument("--exts", help="extensions à inclure, séparées par des virgules (vide = tout)")
+    ap.add_argument("--exclude-dirs", help="noms de dossiers à exclure, séparés par des virgules")
+    ap.add_argument("--max-mb", type=float, help="taille max par fichier (Mo)")
+    ap.add_argument("--truncate", action="store_true", help="au-delà de --max-mb, garder le début et la fin au lieu d'ignorer")
+    ap.add_argument("--head-kb", type=int, help="Ko conservés au début d'un fichier tronqué")
+    ap.add_argument("--tail-kb", type=int, help="Ko conservés à la fin d'un fichier tronqué")
+    ap.add_argument("--no-recursive", action="store_true", help="ne pas descendre dans les sous-dossiers")
+    ap.add_argument("--no-headers", action="store_true", help="ne pas ajouter de séparateur avec le chemin")
+    ap.add_argument("--keep-binaries", action="store_true", help="ne pas ignorer les fichiers binaires")
+    ap.add_argument("--skip-lockfiles", action="store_true",
+                    help="ignorer les fichiers de verrouillage (package-lock.json, yarn.lock, Cargo.lock…)")
+    ap.add_argument("--skip-minified", action="store_true",
+                    help="ignorer les fichiers minifiés et les source maps (*.min.js, *.map, lignes très longues)")
+    ap.add_argument("--skip-generated", action="store_true",
+                    help="ignorer les fichiers générés (stubs protobuf, marques @generated / DO NOT EDIT…)")
+    ap.add_argument("--keep-eol", action="store_true", help="ne pas normaliser les fins de ligne")
+    ap.add_argument("-t", "--transform", action="append", default=[], metavar="NOM",
+                    help="transformation du texte à appliquer (répétable ou séparée par des virgules) : "
+                         + ", ".join(n for n in TRANSFORMS if n != 'eol'))
+    ap.add_argument("--tab-size", type=int, help="largeur des tabulations pour la transformation 'tabs'")
+    ap.add_argument("--read-order", choices=READ_ORDERS,
+                    help="ordre de lecture : path (ordre de sortie) ou inode (ordre du disque, plus rapide "
+                         "sur disque dur ou réseau quand le cache est froid ; la sortie garde le même ordre)")
+    ap.add_argument("--resume", action="store_true",
+                    help="reprendre une concaténation interrompue (refusé si les options ou les fichiers ont changé)")
+    ap.add_argument("--delta", action="store_true",
+                    help="n'écrire que les fichiers ajoutés, modifiés ou supprimés depuis l'exécution précédente "
+                         "(manifeste SORTIE.manifest.json)")
+    ap.add_argument("--diff", action="store_true", help="avec --delta : fichiers modifiés en diff unifié (implique --delta)")
+    ap.add_argument("-n", "--dry-run", action="store_true", help="estimer la sortie sans lire les fichiers (stat uniquement)")
+    ap.add_argument("--git", action="store_true", help="lister les fichiers suivis par git (index) au lieu de parcourir le disque")
+    ap.add_argument("--untracked", action="store_true", help="avec --git : ajouter les fichiers non suivis et non ignorés")
+    ap.add_argument("--since", metavar="REV", help="seulement les fichiers modifiés depuis la révision REV (implique --git)")
+    ap.add_argument("-j", "--scan-workers", type=int, default=1,
+                    help="nombre de dossiers listés en parallèle (utile sur NFS/SMB)")
+    ap.add_argument("--no-cache", action="store_true", help="ne pas utiliser le cache persistant (dossiers, verdicts binaire/texte)")
+    ap.add_argument("-w", "--watch", action="store_true", help="surveiller les sources et régénérer la sortie à chaque changement")
+    ap.add_argument("--interval", type=float, default=0.25, help="intervalle de surveillance (s)")
+    ap.add_argument("--serve", action="store_true", help="lancer le serveur local de concaténation (caches chauds)")
+    ap.add_argument("--port", type=int, help="port du serveur local")
+    return ap
+
+
+def resolve_job(args: argparse.Namespace) -> Tuple[List[str], Set[str], Options, str]:
+    """Retourne (racines, fichiers décochés, options, sortie) depuis le profil et/ou les arguments."""
+    prof = Profile(name="")
+    roots: List[str] = []
+    excluded: Set[str] = set()
+    if args.profile:
+        try:
+            loaded = profiles.load_profile(args.profile)
+        except ValueError as e:
+            raise SystemExit(f"Profil illisible : {args.profile} ({e})")
+        if loaded is None:
+            raise SystemExit(f"Profil introuvable : {args.profile}")
+        prof = loaded
+        roots, excluded = profiles.profile_selection(prof)
+    if args.paths:
+        roots, excluded = list(args.paths), set()
+    if args.exts is not None:
+        prof.exts = args.exts
+    if args.exclude_dirs is not None:
+        prof.excludedirs = args.exclude_dirs
+    if args.max_mb is not None:
+        prof.max_mb = args.max_mb
+    if args.format:
+        prof.output_format = args.format
+    if args.truncate:
+        prof.truncate_large = True
+    if args.head_kb is not None:
+        prof.head_kb = args.head_kb
+    if args.tail_kb is not None:
+        prof.tail_kb = args.tail_kb
+    if args.no_recursive:
+        prof.recursive = False
+    if args.no_headers:
+        prof.headers = False
+    if args.keep_binaries:
+        prof.ignore_bin = False
+    if args.skip_lockfiles:
+        prof.skip_lockfiles = True
+    if args.skip_minified:
+        prof.skip_minified = True
+    if args.skip_generated:
+        prof.skip_generated = True
+    if args.keep_eol:
+        prof.normalize_eol = False
+    if args.transform:
+        names = [n for spec in args.transform for n in parse_csv_list(spec)]
+        available = [n for n in TRANSFORMS if n != 'eol']  # 'eol' : actif par défaut, voir --keep-eol
+        unknown = [n for n in names if n not in available]
+        if unknown:
+            raise SystemExit(f"Transformation inconnue : {', '.join(unknown)} "
+                             f"(disponibles : {', '.join(available)})")
+        prof.transforms = list(dict.fromkeys(prof.transforms + names))
+    if args.tab_size is not None:
+        prof.tab_size = args.tab_size
+    if args.read_order:
+        prof.read_order = args.read_order
+    out = args.out or prof.out_path
+    if not out and not args.dry_run and not args.route:
+        raise SystemExit("Spécifiez un fichier de sortie (-o).")
+    if not roots:
+        raise SystemExit("Rien à faire : aucune source.")
+    return roots, excluded, profiles.profile_options(prof, out), out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        from server import DEFAULT_PORT, serve
+        port = args.port or DEFAULT_PORT
+        print(f"Serveur de concaténation sur http://127.0.0.1:{port} (Ctrl+C pour arrêter)", file=sys.stderr)
+        try:
+            serve(port=port)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.batch is not None:
+        return _run_batch(args)
+
+    roots, excluded, opts, out = resolve_job(args)
+    _check_combinations(parser, args, out)
+    lister = list_dir if args.no_cache else default_cache()
+    render = render_file if args.no_cache else cached_renderer()
+
+    if args.watch:
+        from watch import watch
+
+        def on_update(written: int, skipped: List[Tuple[str, str]], rendered: int):
+            print(f"Sortie mise à jour : {written} fichier(s), {rendered} relu(s).", file=sys.stderr)
+
+        stop = threading.Event()
+        print(f"Surveillance de {len(roots)} racine(s) → {out} (Ctrl+C pour arrêter)", file=sys.stderr)
+        try:
+            watch(roots, opts, out, stop=stop, on_update=on_update,
+                  excluded_files=excluded, interval=args.interval, lister=lister,
+                  render=render)
+        except KeyboardInterrupt:
+            stop.set()
+        return 0
+
+    if args.git or args.since:
+        from gitfiles import gather_git_files
+        try:
+            found = gather_git_files(roots, opts, args.untracked, args.since, lister, args.scan_workers)
+        except ValueError as e:
+            raise SystemExit(str(e))
+    else:
+        found = gather_candidate_files(roots, opts, lister, args.scan_workers)
+    files = found.without(excluded)
+    if args.dry_run:
+        print(format_estimate(estimate_files(files, opts)))
+        return 0
+    if not files:
+        print("Aucun fichier correspondant.", file=sys.stderr)
+        return 1
+    if args.route or args.split_by_ext:
+        return _run_sinks(args, files, opts, out, render)
+    if args.delta or args.diff:
+        return _run_delta(args, files, opts, out, render)
+    before = _mtime(out)
+    if out == '-':
+        written, skipped = concat_to_stream(files, opts, sys.stdout.buffer, render=render)
+    elif out.endswith('.gz'):
+        written, skipped = concat_to_gzip(files, opts, out, render=render)
+    else:
+        # Point de reprise régulier (out + '.ckpt') : --resume repart de là après annulation ou plantage
+        try:
+            written, skipped = concat_to_file(files, opts, out, render=render, checkpoint=True,
+                                              resume=args.resume)
+        except ResumeError as e:
+            raise SystemExit(f"Reprise impossible : {e}")
+    unchanged = before is not None and _mtime(out) == before
+    print(f"Écrits : {written} fichier(s) → {out}" + (" (contenu identique, non modifié)" if unchanged else ""),
+          file=sys.stderr)
+    _print_skipped(skipped)
+    return 0
+
+
+def _check_combinations(parser: argparse.ArgumentParser, args: argparse.Namespace, out: str) -> None:
+    """Refuse les options qui seraient ignorées en silence avec cette sortie (sortie du profil comprise)."""
+    plain_file = bool(out) and out != '-' and not out.endswith('.gz')
+    several = args.route or args.split_by_ext
+    if args.resume:
+        if not plain_file:
+            parser.error("--resume nécessite un fichier de sortie non compressé (-o)")
+        if several or args.delta or args.diff or args.watch:
+            parser.error("--resume ne se combine pas avec --route, --split-by-ext, --delta ni --watch")
+    if args.watch:
+        if not plain_file:
+            parser.error("--watch nécessite un fichier de sortie non compressé (-o)")
+        ignored = [name for name, on in (("--route", args.route), ("--split-by-ext", args.split_by_ext),
+                                         ("--delta", args.delta or args.diff), ("--git", args.git),
+                                         ("--since", args.since), ("--untracked", args.untracked),
+                                         ("--dry-run", args.dry_run), ("-j", args.scan_workers != 1)) if on]
+        if ignored:
+            parser.error(f"--watch ne se combine pas avec {', '.join(ignored)}")
+    if args.delta or args.diff:
+        if several:
+            parser.error("--delta ne se combine pas avec --route ni --split-by-ext")
+        if not plain_file and not args.dry_run:
+            parser.error("--delta nécessite un fichier de sortie non compressé (-o)")
+
+
+def _run_delta(args: argparse.Namespace, files: Sequence[str], opts: Options, out: str, render) -> int:
+    """Sortie différentielle : seulement les changements depuis le dernier manifeste."""
+    from delta import concat_delta
+    res = concat_delta(files, opts, out, diff=args.diff, render=render)
+    what = "référence complète" if res.baseline else "changements"
+    print(f"Delta ({what}) → {out} : {len(res.added)} ajouté(s), {len(res.modified)} modifié(s), "
+          f"{len(res.deleted)} supprimé(s), {res.unchanged} inchangé(s) ; {res.rendered} fichier(s) relu(s).",
+          file=sys.stderr)
+    if res.retained:
+        print(f"Hors sélection (gardés au manifeste) : {len(res.retained)}", file=sys.stderr)
+    _print_skipped(res.skipped)
+    return 0
+
+
+def _run_batch(args: argparse.Namespace) -> int:
+    """Plusieurs profils, chacun vers sa propre sortie, en une seule lecture des sources."""
+    from batch import run_batch
+    names = args.batch or profiles.list_profiles()
+    if not names:
+        raise SystemExit("Aucun profil enregistré.")
+    lister = list_dir if args.no_cache else default_cache()
+    classify = detect_kind if args.no_cache else default_verdicts().kind
+    results, shared = run_batch(names, lister, classify, args.scan_workers)
+    failed = 0
+    for res in results:
+        if res.error:
+            failed += 1
+            print(f"✗ {res.profile} : {res.error}", file=sys.stderr)
+            continue
+        note = " (contenu identique, non modifié)" if res.changed is False else ""
+        if res.changed is None:
+            note = " (aucun fichier, sortie non écrite)"
+        print(f"{res.profile} : {res.written} fichier(s) → {res.out_path}{note}", file=sys.stderr)
+    print(f"Lus : {shared.reads} fichier(s), {shared.renders} segment(s) rendu(s) "
+          f"pour {sum(r.written for r in results)} écrit(s)"
+          + (f", {shared.evictions} libéré(s) en avance (profil en retard)" if shared.evictions else "")
+          + ".", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _run_sinks(args: argparse.Namespace, files: Sequence[str], opts: Options, out: str, render) -> int:
+    """Sortie principale + sorties routées, en une seule passe sur les sources."""
+    sinks: List[Sink] = []
+    if out == '-':
+        sinks.append(StreamSink(sys.stdout.buffer))
+    elif out:
+        sinks.append(FileSink(out))
+    for spec in args.route:
+        patterns, sep, path = spec.rpartition('=')
+        if not sep or not path:
+            raise SystemExit(f"--route invalide (attendu MOTIFS=SORTIE) : {spec}")
+        sinks.append(FileSink(path, route_from_patterns(patterns)))
+    if args.split_by_ext:
+        if not out or out == '-':
+            raise SystemExit("--split-by-ext nécessite un fichier de sortie (-o).")
+        sinks.extend(ext_sinks(files, out))
+    written, skipped = concat_to_sinks(files, opts, sinks, render=render)
+    print(f"Écrits : {written} fichier(s)", file=sys.stderr)
+    for sink in sinks:
+        name = sink.path if isinstance(sink, FileSink) else '-'
+        print(f"  {sink.count:>6} → {name}", file=sys.stderr)
+    _print_skipped(skipped)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
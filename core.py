@@ -1,11 +1,28 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import os
+import sys
+import codecs
+import fnmatch
+import gzip
+import hashlib
+import heapq
+import json
+import re
+import secrets
+import socket
 import pathlib
-from typing import Iterable, List, Set, Tuple, Callable
+import time
+from abc import ABC, abstractmethod
+from dataclasses import fields
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Callable, cast
 import subprocess
 
-from models import Options
+from filetable import FileTable
+from models import Estimate, Options
+from tracing import span, traced
 
 ProgressCb = Callable[[int, int], None] | None
 
@@ -41,22 +58,70 @@ def normalize_exts(exts: List[str]) -> Set[str]:
     return norm
 
 
-def detect_binary(path: str, sample_size: int = 8192) -> bool:
+# Extensions presque toujours binaires : permettent de trancher sans lire le fichier
+BINARY_EXTS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.icns', '.tif', '.tiff', '.webp', '.psd',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.ods',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.tar', '.zst', '.jar', '.war', '.nupkg', '.whl',
+    '.exe', '.dll', '.so', '.dylib', '.a', '.lib', '.o', '.obj', '.pdb', '.class', '.pyc', '.pyo', '.pyd',
+    '.wasm', '.bin', '.dat', '.db', '.sqlite', '.sqlite3',
+    '.mp3', '.wav', '.ogg', '.flac', '.mp4', '.mkv', '.avi', '.mov', '.webm',
+    '.ttf', '.otf', '.woff', '.woff2', '.eot',
+}
+
+
+# Signatures de formats binaires courants (début de fichier)
+MAGIC_NUMBERS = (
+    b'\x89PNG', b'GIF87a', b'GIF89a', b'\xff\xd8\xff', b'%PDF-', b'PK\x03\x04', b'PK\x05\x06',
+    b'\x1f\x8b', b'\xfd7zXZ\x00', b'7z\xbc\xaf\x27\x1c', b'Rar!\x1a\x07', b'\x28\xb5\x2f\xfd',
+    b'\x7fELF', b'\xca\xfe\xba\xbe', b'\xcf\xfa\xed\xfe', b'\xce\xfa\xed\xfe',
+    b'\x00asm', b'SQLite format 3\x00', b'OggS', b'RIFF', b'fLaC', b'ID3', b'wOFF', b'wOF2',
+    b'\xd0\xcf\x11\xe0',
+)
+
+BinaryCheck = Callable[[str], bool]
+
+
+def sniff_binary(chunk: bytes, complete: bool) -> bool:
+    """
+    Classe un échantillon de début de fichier : signature connue, octet nul,
+    puis décodage UTF-8 (si l'échantillon n'est pas tout le fichier, une
+    séquence coupée à la fin n'est pas une erreur).
+    """
+    if chunk.startswith(MAGIC_NUMBERS) or b'\x00' in chunk:
+        return True
     try:
-        with open(path, 'rb') as f:
-            chunk = f.read(sample_size)
-        if b'\x00' in chunk:
-            return True
-        try:
-            chunk.decode('utf-8')
-            return False
-        except UnicodeDecodeError:
-            return True
-    except Exception:
-        # En cas d'erreur, on suppose binaire pour éviter de polluer la sortie
+        codecs.getincrementaldecoder('utf-8')().decode(chunk, final=complete)
+        return False
+    except UnicodeDecodeError:
         return True
 
 
+_SNIFF_SIZE = 4096
+
+
+def detect_binary(path: str, sample_size: int = _SNIFF_SIZE) -> bool:
+    """
+    Classe un fichier binaire / texte UTF-8, du moins coûteux au plus coûteux :
+    extension connue (sans lecture), puis sniff_binary sur un petit échantillon.
+    """
+    return detect_kind(path, sample_size) == 'binary'
+
+
+def app_data_dir() -> pathlib.Path:
+    """Dossier de données utilisateur, partagé par l'interface et le mode sans interface."""
+    env = os.environ.get('CONCATENATOR_HOME')
+    if env:
+        return pathlib.Path(env)
+    if sys.platform.startswith('win'):
+        base = pathlib.Path(os.environ.get('APPDATA') or pathlib.Path.home() / 'AppData' / 'Roaming')
+    elif sys.platform == 'darwin':
+        base = pathlib.Path.home() / 'Library' / 'Application Support'
+    else:
+        base = pathlib.Path(os.environ.get('XDG_CONFIG_HOME') or pathlib.Path.home() / '.config')
+    return base / 'ConcatTools' / 'Concatenator'
+
+
 def human_size(nbytes: int) -> str:
     units = ['B', 'KB', 'MB', 'GB', 'TB']
     size = float(nbytes)
@@ -67,33 +132,332 @@ def human_size(nbytes: int) -> str:
     return f"{size:.1f} {units[i]}"
 
 
+# ------------------------ Fichiers générés ------------------------
+
+# Nature d'un fichier : 'text', 'binary' ou une catégorie de fichier généré
+GENERATED_KINDS = ('lockfile', 'minified', 'generated')
+SKIP_REASONS = {
+    'binary': "binaire/encodage non UTF-8",
+    'lockfile': "fichier de verrouillage (dépendances)",
+    'minified': "minifié / source map",
+    'generated': "fichier généré",
+}
+KindCheck = Callable[[str], str]
+
+LOCKFILE_NAMES = {
+    'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml', 'bun.lock', 'bun.lockb',
+    'deno.lock', 'poetry.lock', 'pipfile.lock', 'pdm.lock', 'uv.lock', 'cargo.lock', 'gemfile.lock',
+    'composer.lock', 'go.sum', 'mix.lock', 'pubspec.lock', 'podfile.lock', 'packages.lock.json',
+    'flake.lock', 'gradle.lockfile', 'package.resolved', 'conan.lock',
+}
+MINIFIED_SUFFIXES = ('.min.js', '.min.mjs', '.min.css', '.map')
+GENERATED_SUFFIXES = (
+    '_pb2.py', '_pb2.pyi', '_pb2_grpc.py', '.pb.go', '.pb.h', '.pb.cc', '.pb.swift', '_pb.js', '_pb.d.ts',
+    '_grpc_pb.js', '.g.cs', '.g.i.cs', '.designer.cs', '.generated.cs', '.g.dart', '.freezed.dart',
+)
+# Marques usuelles des générateurs (protoc, go generate, outils .NET, Phabricator…), cherchées dans l'échantillon
+_GENERATED_MARKERS = re.compile(
+    rb'@generated|DO NOT EDIT|<auto-generated|Generated by the protocol buffer compiler'
+    rb'|[Aa]uto-?generated (?:file|code|by)|This file (?:is|was|has been) (?:automatically |auto-?)?generated'
+)
+MINIFIED_MIN_SAMPLE = 1024   # en deçà, un fichier court n'est pas jugé sur ses lignes
+MINIFIED_AVG_LINE = 300      # longueur moyenne de ligne (octets) au-delà de laquelle on parle de minifié
+
+
+def kind_from_name(path: str) -> Optional[str]:
+    """Catégorie de fichier généré d'après le seul nom (sans lecture), ou None."""
+    name = os.path.basename(path).lower()
+    if name in LOCKFILE_NAMES:
+        return 'lockfile'
+    if name.endswith(MINIFIED_SUFFIXES):
+        return 'minified'
+    if name.endswith(GENERATED_SUFFIXES):
+        return 'generated'
+    return None
+
+
+def sniff_content_kind(chunk: bytes, complete: bool) -> str:
+    """
+    Nature d'après le seul échantillon (sans le nom) : binaire, puis longueur
+    moyenne des lignes (minifié) et marques de générateurs, sinon texte.
+    """
+    if sniff_binary(chunk, complete):
+        return 'binary'
+    if len(chunk) >= MINIFIED_MIN_SAMPLE and len(chunk) / (chunk.count(b'\n') + 1) > MINIFIED_AVG_LINE:
+        return 'minified'
+    if _GENERATED_MARKERS.search(chunk):
+        return 'generated'
+    return 'text'
+
+
+def kind_with_name(path: str, content_kind: str) -> str:
+    """Combine la nature du contenu avec le nom : binaire d'abord, puis nom (verrouillage, minifié, généré)."""
+    if content_kind == 'binary':
+        return 'binary'
+    kind = kind_from_name(path)
+    return kind if kind is not None else content_kind
+
+
+def sniff_kind(path: str, chunk: bytes, complete: bool) -> str:
+    """
+    Nature d'un fichier d'après son nom et l'échantillon déjà lu pour le test
+    binaire : binaire, puis nom (verrouillage, minifié, généré), puis longueur
+    moyenne des lignes et marques de générateurs dans l'échantillon.
+    """
+    return kind_with_name(path, sniff_content_kind(chunk, complete))
+
+
+def detect_content_kind(path: str, sample_size: int = _SNIFF_SIZE) -> str:
+    """Nature d'après le seul contenu (voir sniff_content_kind) ; binaire si le fichier est illisible."""
+    try:
+        with open(path, 'rb') as f:
+            chunk = f.read(sample_size)
+        return sniff_content_kind(chunk, complete=len(chunk) < sample_size)
+    except Exception:
+        # En cas d'erreur, on suppose binaire pour éviter de polluer la sortie
+        return 'binary'
+
+
+def detect_kind(path: str, sample_size: int = _SNIFF_SIZE) -> str:
+    """Comme detect_binary, mais rend la nature du fichier (voir sniff_kind), sur le même échantillon."""
+    if _ext(path) in BINARY_EXTS:
+        return 'binary'
+    return kind_with_name(path, detect_content_kind(path, sample_size))
+
+
+def skipped_kinds(opts: Options) -> Set[str]:
+    """Natures de fichiers écartées par ces options."""
+    skip: Set[str] = set()
+    if opts.ignore_binaries:
+        skip.add('binary')
+    if opts.skip_lockfiles:
+        skip.add('lockfile')
+    if opts.skip_minified:
+        skip.add('minified')
+    if opts.skip_generated:
+        skip.add('generated')
+    return skip
+
+
 # ------------------------ Scan fichiers ------------------------
 
-def gather_candidate_files(roots: Iterable[str], opts: Options) -> List[str]:
-    candidates: List[str] = []
+# Membre d'archive : "<archive>!<sep><chemin du membre>" (voir archives.py)
+ARCHIVE_MARK = '!' + os.sep
+
+# Contenu direct d'un dossier : (noms de fichiers, noms de sous-dossiers)
+DirListing = Tuple[List[str], List[str]]
+DirLister = Callable[[str], DirListing]
+
+
+def list_dir(path: str) -> DirListing:
+    """Liste un dossier dans l'ordre de scandir. Les liens vers des dossiers ne sont pas suivis."""
+    files: List[str] = []
+    dirs: List[str] = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            dirs.append(entry.name)
+                        continue
+                except OSError:
+                    continue
+                files.append(entry.name)
+    except OSError:
+        pass
+    return files, dirs
+
+
+def _ext(name: str) -> str:
+    return os.path.splitext(name)[1].lower()
+
+
+def iter_dir_files(root: str, opts: Options, lister: DirLister = list_dir) -> Iterator[str]:
+    """Parcours en profondeur (préordre) d'un dossier : fichiers du dossier puis sous-dossiers."""
     excluded = {d.strip() for d in opts.exclude_dirs if d.strip()}
     include_all = (len(opts.include_exts) == 0)
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        files, subdirs = lister(d)
+        prefix = d if d.endswith(os.sep) else d + os.sep
+        for name in files:
+            if include_all or _ext(name) in opts.include_exts:
+                yield prefix + name
+        if opts.recursive:
+            stack.extend(prefix + n for n in reversed(subdirs) if n not in excluded)
+
+
+def prefetch_listings(dirs: Iterable[str], opts: Options, lister: DirLister = list_dir,
+                      workers: int = 8) -> Dict[str, DirListing]:
+    """
+    Liste en parallèle tous les dossiers à parcourir (utile quand chaque appel
+    au système de fichiers coûte cher : NFS, SMB…). Retourne {dossier: listing}.
+    """
+    excluded = {d.strip() for d in opts.exclude_dirs if d.strip()}
+    listings: Dict[str, DirListing] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        pending = {ex.submit(lister, d): d for d in dirs}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                d = pending.pop(fut)
+                files, subdirs = listing = fut.result()
+                listings[d] = listing
+                if opts.recursive:
+                    prefix = d if d.endswith(os.sep) else d + os.sep
+                    for n in subdirs:
+                        if n not in excluded:
+                            sub = prefix + n
+                            pending[ex.submit(lister, sub)] = sub
+    return listings
+
 
-    for root in unique_paths(roots):
-        p = pathlib.Path(root)
-        if p.is_file():
-            if include_all or p.suffix.lower() in opts.include_exts:
-                candidates.append(str(p))
+def _scan_into(table: FileTable, root: str, opts: Options, lister: DirLister) -> None:
+    """Même parcours qu'iter_dir_files, un listing filtré par dossier ajouté à la table."""
+    excluded = {d.strip() for d in opts.exclude_dirs if d.strip()}
+    include_all = (len(opts.include_exts) == 0)
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        files, subdirs = lister(d)
+        prefix = d if d.endswith(os.sep) else d + os.sep
+        if not table.add_listing(prefix, files if include_all else
+                                 (n for n in files if _ext(n) in opts.include_exts)):
+            continue  # dossier déjà parcouru (racines qui se recouvrent) : sous-dossiers compris
+        if opts.recursive:
+            stack.extend(prefix + n for n in reversed(subdirs) if n not in excluded)
+
+
+@traced()
+def gather_candidate_files(roots: Iterable[str], opts: Options, lister: DirLister = list_dir,
+                           workers: int = 1, table: Optional[FileTable] = None) -> FileTable:
+    """
+    Fichiers candidats sous les racines, dans l'ordre du parcours en profondeur.
+    workers > 1 : les dossiers sont listés en parallèle, l'ordre reste identique.
+    Retourne une FileTable (séquence de chemins compacte, sans doublons) ;
+    `table` : table existante à compléter plutôt qu'une nouvelle.
+    """
+    table = FileTable() if table is None else table
+    include_all = (len(opts.include_exts) == 0)
+    roots = unique_paths(roots)
+
+    if workers > 1:
+        listings = prefetch_listings([r for r in roots if os.path.isdir(r)], opts, lister, workers)
+        lister = lambda d, base=lister: listings[d] if d in listings else base(d)
+
+    for root in roots:
+        if os.path.isfile(root):
+            from archives import is_archive, list_members
+            if is_archive(root):
+                table.extend(list_members(root, opts))
+            elif include_all or _ext(root) in opts.include_exts:
+                table.append(root)
+            continue
+        if ARCHIVE_MARK in root:
+            from archives import split_member
+            if split_member(root) is not None and (include_all or _ext(root) in opts.include_exts):
+                table.append(root)
             continue
 
-        if p.is_dir():
-            it = p.rglob('*') if opts.recursive else p.glob('*')
-            for sub in it:
-                if sub.is_dir():
-                    if sub.name in excluded:
-                        pass
-                    continue
-                if any(part in excluded for part in sub.parts):
-                    continue
-                if include_all or sub.suffix.lower() in opts.include_exts:
-                    candidates.append(str(sub))
+        if os.path.isdir(root):
+            # Les racines sont déjà normalisées et les noms listés ne contiennent pas
+            # de séparateur : les chemins ne sont ni renormalisés ni dédoublonnés après coup.
+            _scan_into(table, root, opts, lister)
+    return table
+
+
+# ------------------------ Estimation ------------------------
+
+def file_size(fpath: str) -> int:
+    """Taille d'un fichier ou d'un membre d'archive (OSError si introuvable)."""
+    try:
+        return os.stat(fpath).st_size
+    except OSError:
+        if ARCHIVE_MARK not in fpath:
+            raise
+        from archives import member_size
+        return member_size(fpath)
 
-    return unique_paths(candidates)
+TOKEN_BYTES = 4  # ordre de grandeur usuel : ~4 octets de code source par token
+
+
+def estimate_files(files: Sequence[str], opts: Options, top: int = 10) -> Estimate:
+    """
+    Prévoit le résultat d'une concaténation sans lire aucun contenu (stat uniquement).
+    Les fichiers binaires sont prédits d'après l'extension seulement, les
+    fichiers générés d'après le nom seulement.
+    """
+    max_bytes = int(opts.max_mb * 1024 * 1024)
+    skip = skipped_kinds(opts)
+    est = Estimate(files=len(files))
+    sizes: List[Tuple[int, str]] = []
+    by_ext: dict[str, list[int]] = {}
+    header_bytes = 0
+    table = files if isinstance(files, FileTable) else None
+    for i, fpath in enumerate(files):
+        st = table.stat(i) if table is not None else None  # relevé une fois, gardé dans la table
+        try:
+            size = st[0] if st is not None else file_size(fpath)
+        except OSError:
+            est.skip_error += 1
+            continue
+        est.total_bytes += size
+        ext = _ext(fpath) or '(aucune)'
+        if size > max_bytes and not opts.truncate_large:
+            est.skip_size += 1
+            continue
+        if opts.ignore_binaries and ext in BINARY_EXTS:
+            est.skip_binary += 1
+            continue
+        if kind_from_name(fpath) in skip:
+            est.skip_generated += 1
+            continue
+        if size > max_bytes:
+            est.truncated += 1
+            size = min(size, (opts.head_kb + opts.tail_kb) * 1024)
+        est.kept += 1
+        est.kept_bytes += size
+        if opts.add_headers:
+            header_bytes += len(fpath) + 28
+        sizes.append((size, fpath))
+        acc = by_ext.setdefault(ext, [0, 0])
+        acc[0] += 1
+        acc[1] += size
+    est.est_tokens = (est.kept_bytes + header_bytes) // TOKEN_BYTES
+    est.largest = [(p, n) for n, p in heapq.nlargest(top, sizes)]
+    est.by_ext = {k: (v[0], v[1]) for k, v in sorted(by_ext.items(), key=lambda kv: -kv[1][1])}
+    return est
+
+
+def estimate(roots: Iterable[str], opts: Options, top: int = 10) -> Estimate:
+    return estimate_files(gather_candidate_files(roots, opts), opts, top)
+
+
+def format_estimate(est: Estimate, max_exts: int = 12) -> str:
+    lines = [
+        f"Fichiers retenus : {est.kept} / {est.files}",
+        f"Taille de sortie : ~{human_size(est.kept_bytes)} (candidats : {human_size(est.total_bytes)})",
+        f"Tokens estimés : ~{est.est_tokens:,}".replace(',', ' '),
+        f"Ignorés prévus : {est.skip_size} (taille), {est.skip_binary} (binaires), "
+        f"{est.skip_generated} (générés), {est.skip_error} (erreurs)",
+    ]
+    if est.truncated:
+        lines.append(f"Tronqués (début + fin) : {est.truncated}")
+    if est.by_ext:
+        lines.append("")
+        lines.append("Par extension :")
+        for ext, (n, size) in list(est.by_ext.items())[:max_exts]:
+            lines.append(f"  {ext:<12} {n:>7}  {human_size(size):>10}")
+        if len(est.by_ext) > max_exts:
+            lines.append("  …")
+    if est.largest:
+        lines.append("")
+        lines.append("Plus gros fichiers :")
+        for p, size in est.largest:
+            lines.append(f"  {human_size(size):>10}  {p}")
+    return "\n".join(lines)
 
 
 # ------------------------ Concaténation ------------------------
@@ -103,10 +467,219 @@ def _read_text_file(path: str) -> str:
         return fin.read()
 
 
+def decode_text(data: bytes) -> str:
+    """Décode un contenu déjà lu comme _read_text_file (mode texte : fins de ligne universelles)."""
+    return data.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _read_head_tail(path: str, size: int, head: int, tail: int) -> str:
+    """
+    Lit le début et la fin d'un gros fichier (seek : le milieu n'est jamais lu),
+    coupés sur des fins de ligne, avec une marque indiquant ce qui a été omis.
+    """
+    with open(path, 'rb') as f:
+        h = f.read(head)
+        f.seek(max(len(h), size - tail))
+        t = f.read(tail)
+    return join_head_tail(h, t, size)
+
+
+def join_head_tail(h: bytes, t: bytes, size: int) -> str:
+    """Assemble début et fin d'un contenu de `size` octets, coupés sur des fins de ligne."""
+    cut = h.rfind(b'\n')
+    if cut >= 0:
+        h = h[:cut + 1]
+    cut = t.find(b'\n')
+    if 0 <= cut < len(t) - 1:
+        t = t[cut + 1:]
+    omitted = size - len(h) - len(t)
+    head_text = h.decode('utf-8', errors='replace')
+    if head_text and not head_text.endswith('\n'):
+        head_text += '\n'
+    marker = f"[… {human_size(omitted)} omis ({omitted} octets) …]\n"
+    return head_text + marker + t.decode('utf-8', errors='replace')
+
+
+# ------------------------ Transformations de texte ------------------------
+
+LineStage = Callable[[Iterable[str], Options], Iterable[str]]
+TextStage = Callable[[str, Options], str]
+
+
+class Transform:
+    """
+    Étape de transformation enregistrée. Une étape « lignes » reçoit et produit
+    un itérable de lignes (sans '\n') : les étapes lignes consécutives sont
+    chaînées paresseusement et le texte n'est découpé puis rejoint qu'une fois.
+    Une étape « texte » reçoit le contenu entier.
+    """
+
+    def __init__(self, name: str, label: str, lines: Optional[LineStage] = None,
+                 text: Optional[TextStage] = None):
+        if (lines is None) == (text is None):
+            raise ValueError("une transformation est soit « lignes », soit « texte »")
+        self.name = name
+        self.label = label
+        self.lines = lines
+        self.text = text
+
+
+# Ordre d'enregistrement = ordre d'application
+TRANSFORMS: Dict[str, Transform] = {}
+
+
+def register_transform(name: str, label: str, lines: Optional[LineStage] = None,
+                       text: Optional[TextStage] = None) -> Transform:
+    t = Transform(name, label, lines, text)
+    TRANSFORMS[name] = t
+    return t
+
+
+def active_transforms(opts: Options) -> List[Transform]:
+    """Étapes demandées par les options, dans l'ordre du registre (noms inconnus ignorés)."""
+    wanted = set(opts.transforms) - {'eol'}  # piloté par opts.normalize_eol
+    if opts.normalize_eol:
+        wanted.add('eol')
+    return [t for name, t in TRANSFORMS.items() if name in wanted]
+
+
+def _run_lines(text: str, stages: List[LineStage], opts: Options) -> str:
+    lines: Iterable[str] = text.split('\n')
+    final_eol = text.endswith('\n')
+    if final_eol:
+        cast(list, lines).pop()  # pas de ligne vide fictive après le dernier '\n'
+    for stage in stages:
+        lines = stage(lines, opts)
+    out = '\n'.join(lines)
+    return out + '\n' if final_eol else out
+
+
+def apply_transforms(text: str, opts: Options) -> str:
+    """Applique la chaîne de transformations des options en un minimum de passes."""
+    pending: List[LineStage] = []
+    for t in active_transforms(opts):
+        if t.lines is not None:
+            pending.append(t.lines)
+            continue
+        if pending:
+            text = _run_lines(text, pending, opts)
+            pending = []
+        text = cast(TextStage, t.text)(text, opts)
+    if pending:
+        text = _run_lines(text, pending, opts)
+    return text
+
+
 def _normalize_eol(text: str) -> str:
+    if '\r' not in text:
+        return text
     return text.replace('\r\n', '\n').replace('\r', '\n')
 
 
+def _strip_trailing(lines: Iterable[str], opts: Options) -> Iterable[str]:
+    if opts.normalize_eol:
+        return map(str.rstrip, lines)  # boucle entièrement en C
+    # Fins de ligne non normalisées : on garde le '\r'
+    return (line[:-1].rstrip(' \t') + '\r' if line.endswith('\r') else line.rstrip(' \t')
+            for line in lines)
+
+
+def _collapse_blank(lines: Iterable[str], opts: Options) -> Iterable[str]:
+    blank = False
+    for line in lines:
+        if line.strip():
+            blank = False
+            yield line
+        elif not blank:
+            blank = True
+            yield line
+
+
+def _expand_tabs(lines: Iterable[str], opts: Options) -> Iterable[str]:
+    size = max(1, opts.tab_size)
+    return (line.expandtabs(size) if '\t' in line else line for line in lines)
+
+
+_LICENSE_RE = re.compile(r'copyright|licen[cs]e|spdx-license-identifier|\(c\)', re.I)
+_PREAMBLE_RE = re.compile(r'#!|#.*coding[:=]')
+_HASH_COMMENT_RE = re.compile(r'#(\s|$)')
+_LICENSE_MAX_LINES = 200
+
+
+def _is_line_comment(s: str, prefix: str) -> bool:
+    if prefix == '#':
+        return _HASH_COMMENT_RE.match(s) is not None  # pas les directives #include, #define…
+    return s.startswith(prefix)
+
+
+def _strip_license(lines: Iterable[str], opts: Options) -> Iterable[str]:
+    """
+    Retire le premier bloc de commentaires du fichier (après un éventuel shebang /
+    déclaration d'encodage) s'il mentionne une licence ou un copyright.
+    Seul le début est examiné ; le reste est enchaîné tel quel (itertools.chain).
+    """
+    it = iter(lines)
+    head: List[str] = []
+    line = next(it, None)
+    while line is not None and _PREAMBLE_RE.match(line.lstrip()):
+        head.append(line)
+        line = next(it, None)
+    if line is None:
+        return head
+    s = line.strip()
+    block = [line]
+    after: Optional[str] = None  # première ligne qui suit le bloc
+    rest = ''                    # code qui suit le commentaire sur sa dernière ligne
+    if s.startswith('/*') or s.startswith('<!--'):
+        opener, end = ('/*', '*/') if s.startswith('/*') else ('<!--', '-->')
+        pos = line.find(end, line.index(opener) + len(opener))
+        while pos < 0 and len(block) < _LICENSE_MAX_LINES:
+            nxt = next(it, None)
+            if nxt is None:
+                break
+            block.append(nxt)
+            pos = nxt.find(end)
+        closed = pos >= 0
+        if closed:
+            rest = block[-1][pos + len(end):].lstrip(' \t')
+    else:
+        prefix = next((p for p in ('//', '#', '--', ';') if _is_line_comment(s, p)), None)
+        if prefix is None:
+            head.append(line)
+            return chain(head, it)
+        closed = True
+        while True:
+            after = next(it, None)
+            if after is None or not _is_line_comment(after.strip(), prefix):
+                break
+            block.append(after)
+            if len(block) >= _LICENSE_MAX_LINES:
+                closed, after = False, None
+                break
+    if closed and _LICENSE_RE.search('\n'.join(block)):
+        # Bloc retiré, ainsi que les lignes vides qui le suivent ; le code de sa dernière ligne est gardé
+        if rest.strip():
+            head.append(rest)
+        else:
+            if after is None:  # bloc /* … */ : la ligne suivante n'est pas encore lue
+                after = next(it, None)
+            while after is not None and not after.strip():
+                after = next(it, None)
+    else:
+        head.extend(block)
+    if after is not None:
+        head.append(after)
+    return chain(head, it)
+
+
+register_transform('eol', "Normaliser les fins de ligne en \\n", text=lambda t, o: _normalize_eol(t))
+register_transform('license', "Retirer l'en-tête de licence", lines=_strip_license)
+register_transform('trailing', "Supprimer les espaces en fin de ligne", lines=_strip_trailing)
+register_transform('tabs', "Remplacer les tabulations par des espaces", lines=_expand_tabs)
+register_transform('blank', "Réduire les lignes vides consécutives à une seule", lines=_collapse_blank)
+
+
+@traced()
 def clean_csharp(text: str, remove_comments: bool, remove_usings: bool) -> str:
     """Nettoie du code C# via le binaire RoslynCleaner."""
     if not (remove_comments or remove_usings):
@@ -135,93 +708,817 @@ def clean_csharp(text: str, remove_comments: bool, remove_usings: bool) -> str:
         return text
 
 
-def concat_to_file(files: List[str], opts: Options, out_path: str, progress_cb: ProgressCb = None) -> Tuple[int, list[tuple[str, str]]]:
+def render_file(fpath: str, opts: Options, classify: KindCheck = detect_kind,
+                data: Optional[bytes] = None) -> Tuple[str | None, str | None]:
     """
-    Écrit la concaténation dans out_path. Retourne (nb_fichiers_écrits, skipped[(path, raison)]).
+    Produit le segment de sortie d'un fichier (en-tête compris).
+    Retourne (segment, None) ou (None, raison) si le fichier est ignoré.
+
+    data : contenu complet du fichier, déjà lu (lots de profils) ; rien n'est
+    alors relu sur disque, le résultat est le même.
     """
+    if ARCHIVE_MARK in fpath:
+        from archives import render_member, split_member
+        if split_member(fpath) is not None:
+            return render_member(fpath, opts)
     max_bytes = int(opts.max_mb * 1024 * 1024)
-    written = 0
-    skipped: list[tuple[str, str]] = []
+    try:
+        size = len(data) if data is not None else os.stat(fpath).st_size
+        too_big = size > max_bytes
+        if too_big and not opts.truncate_large:
+            return None, f"taille {human_size(size)} > {opts.max_mb} Mo"
 
-    with open(out_path, 'w', encoding='utf-8', newline='\n') as out:
-        total = max(1, len(files))
-        for i, fpath in enumerate(files, start=1):
-            if progress_cb:
-                progress_cb(i, total)
+        skip = skipped_kinds(opts)
+        if skip:
+            if data is None:
+                kind = classify(fpath)
+            elif _ext(fpath) in BINARY_EXTS:
+                kind = 'binary'
+            else:
+                kind = sniff_kind(fpath, data[:_SNIFF_SIZE], complete=size < _SNIFF_SIZE)
+            if kind in skip:
+                return None, SKIP_REASONS[kind]
 
-            try:
-                st = os.stat(fpath)
-                if st.st_size > max_bytes:
-                    skipped.append((fpath, f"taille {human_size(st.st_size)} > {opts.max_mb} Mo"))
-                    continue
+        head, tail = opts.head_kb * 1024, opts.tail_kb * 1024
+        if too_big and head + tail < size:
+            if data is None:
+                content = _read_head_tail(fpath, size, head, tail)
+            else:
+                content = join_head_tail(data[:head], data[max(head, size - tail):], size)
+        elif data is None:
+            content = _read_text_file(fpath)
+        else:
+            content = decode_text(data)
+    except Exception as e:
+        return None, f"erreur: {e}"
+    return render_text(fpath, content, opts)
 
-                if opts.ignore_binaries and detect_binary(fpath):
-                    skipped.append((fpath, "binaire/encodage non UTF-8"))
-                    continue
 
-                content = _read_text_file(fpath)
-                if opts.normalize_eol:
-                    content = _normalize_eol(content)
-                if fpath.lower().endswith('.cs') and (opts.cs_remove_comments or opts.cs_remove_usings):
-                    content = clean_csharp(content, opts.cs_remove_comments, opts.cs_remove_usings)
+def render_text(fpath: str, content: str, opts: Options) -> Tuple[str | None, str | None]:
+    """Applique les transformations de texte à un contenu déjà lu et ajoute l'en-tête."""
+    try:
+        content = apply_transforms(content, opts)
+        if fpath.lower().endswith('.cs') and (opts.cs_remove_comments or opts.cs_remove_usings):
+            content = clean_csharp(content, opts.cs_remove_comments, opts.cs_remove_usings)
+    except Exception as e:
+        return None, f"erreur: {e}"
 
-                if opts.add_headers:
-                    sep = '=' * 12
-                    out.write(f"\n{sep} {fpath} {sep}\n")
+    if opts.output_format == 'jsonl':
+        return _jsonl_record(fpath, content), None
+    if opts.output_format == 'markdown':
+        return _markdown_block(fpath, content, opts.add_headers), None
 
-                out.write(content)
-                if not content.endswith('\n'):
-                    out.write('\n')
-                written += 1
-            except Exception as e:
-                skipped.append((fpath, f"erreur: {e}"))
-                continue
+    parts: List[str] = []
+    if opts.add_headers:
+        sep = '=' * 12
+        parts.append(f"\n{sep} {fpath} {sep}\n")
+    parts.append(content)
+    if not content.endswith('\n'):
+        parts.append('\n')
+    return ''.join(parts), None
 
-    if progress_cb:
-        progress_cb(len(files), max(1, len(files)))
 
-    return written, skipped
+# ------------------------ Formats structurés ------------------------
 
+OUTPUT_FORMATS = ('text', 'jsonl', 'markdown')
 
-def concat_to_string(files: List[str], opts: Options, progress_cb: ProgressCb = None) -> Tuple[str, int, list[tuple[str, str]]]:
-    """Retourne (texte_concaténé, nb_fichiers_écrits, skipped)."""
-    max_bytes = int(opts.max_mb * 1024 * 1024)
-    written = 0
-    skipped: list[tuple[str, str]] = []
-    parts: List[str] = []
+# Extension -> langage (JSONL « language », info de bloc Markdown)
+LANGUAGES = {
+    '.py': 'python', '.pyi': 'python', '.ts': 'typescript', '.tsx': 'tsx', '.js': 'javascript',
+    '.jsx': 'jsx', '.mjs': 'javascript', '.java': 'java', '.kt': 'kotlin', '.kts': 'kotlin',
+    '.cs': 'csharp', '.csproj': 'xml', '.cpp': 'cpp', '.cc': 'cpp', '.cxx': 'cpp', '.c': 'c',
+    '.h': 'c', '.hpp': 'cpp', '.go': 'go', '.rs': 'rust', '.rb': 'ruby', '.php': 'php',
+    '.swift': 'swift', '.scala': 'scala', '.sh': 'bash', '.bash': 'bash', '.ps1': 'powershell',
+    '.sql': 'sql', '.html': 'html', '.css': 'css', '.scss': 'scss', '.xml': 'xml', '.svg': 'xml',
+    '.json': 'json', '.jsonl': 'json', '.yml': 'yaml', '.yaml': 'yaml', '.toml': 'toml',
+    '.ini': 'ini', '.md': 'markdown', '.rst': 'rst', '.txt': 'text', '.dockerfile': 'dockerfile',
+}
+
+_FENCE_RE = re.compile(r'^`{3,}', re.MULTILINE)
+
+
+def language_of(fpath: str) -> str:
+    name = os.path.basename(fpath).lower()
+    if name == 'dockerfile':
+        return 'dockerfile'
+    if name == 'makefile':
+        return 'make'
+    return LANGUAGES.get(_ext(name), '')
+
+
+def format_for_path(out_path: str) -> str:
+    """Format de sortie déduit de l'extension du fichier de sortie (.jsonl, .md), sinon 'text'."""
+    p = out_path.lower()
+    if p.endswith('.gz'):
+        p = p[:-3]
+    if p.endswith('.jsonl'):
+        return 'jsonl'
+    if p.endswith(('.md', '.markdown')):
+        return 'markdown'
+    return 'text'
+
+
+def _jsonl_record(fpath: str, content: str) -> str:
+    """Un enregistrement JSON par ligne ; size et sha256 portent sur le contenu émis (UTF-8)."""
+    data = content.encode('utf-8', errors='surrogatepass')
+    record: Dict[str, object] = {
+        'path': fpath,
+        'size': len(data),
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'language': language_of(fpath),
+        'content': content,
+    }
+    return json_line(record)
+
+
+def json_line(record: Dict[str, object]) -> str:
+    """Un enregistrement JSONL : une seule ligne, saut de ligne compris."""
+    line = json.dumps(record, ensure_ascii=False)
+    # U+2028/U+2029 sont valides en JSON mais coupent les lignes pour str.splitlines()
+    return line.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029') + '\n'
+
+
+def markdown_fence(content: str) -> str:
+    """Clôture de bloc de code plus longue que toute clôture présente dans le contenu."""
+    longest = max((len(m.group(0)) for m in _FENCE_RE.finditer(content)), default=0)
+    return '`' * max(3, longest + 1)
+
+
+def _markdown_block(fpath: str, content: str, heading: bool) -> str:
+    fence = markdown_fence(content)
+    parts = [f"## `{fpath}`\n\n"] if heading else []
+    parts.append(f"{fence}{language_of(fpath)}\n")
+    parts.append(content)
+    if content and not content.endswith('\n'):
+        parts.append('\n')
+    parts.append(f"{fence}\n\n")
+    return ''.join(parts)
+
+
+RenderFn = Callable[[str, Options], Tuple[str | None, str | None]]
+CHUNK_SIZE = 64 * 1024
 
+
+# ------------------------ Ordre de lecture ------------------------
+
+READ_ORDERS = ('path', 'inode')
+# Champs d'Options qui ne changent ni la sélection ni le contenu de la sortie
+SCHEDULING_FIELDS = frozenset({'read_order'})
+REORDER_WINDOW = 256                # fichiers lus en avance au plus…
+REORDER_BYTES = 32 * 1024 * 1024    # … et octets (taille sur disque) gardés en attente
+
+
+def _locality_stat(path: str) -> Tuple[Tuple[int, int], int]:
+    """((périphérique, inode), taille). Un membre d'archive prend l'inode de son archive."""
+    try:
+        st = os.stat(path)
+        return (st.st_dev, st.st_ino), st.st_size
+    except OSError:
+        pass
+    if ARCHIVE_MARK in path:
+        try:
+            st = os.stat(path.split(ARCHIVE_MARK, 1)[0])
+            return (st.st_dev, st.st_ino), 0
+        except OSError:
+            pass
+    return (0, 0), 0
+
+
+def _advise_willneed(paths: Iterable[str]) -> None:
+    """Annonce au noyau la lecture prochaine de ces fichiers (lecture anticipée asynchrone)."""
+    advise = getattr(os, 'posix_fadvise', None)
+    if advise is None:
+        return
+    for p in paths:
+        try:
+            fd = os.open(p, os.O_RDONLY)
+        except OSError:
+            continue  # membre d'archive, fichier disparu…
+        try:
+            advise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def _locality_windows(files: Sequence[str]) -> Iterator[Tuple[int, List[int]]]:
+    """
+    Découpe files en fenêtres consécutives (au plus REORDER_WINDOW fichiers et
+    REORDER_BYTES octets) et produit (début, ordre de lecture) : les indices
+    relatifs à la fenêtre, triés par (périphérique, inode).
+    """
+    start = 0
+    while start < len(files):
+        keys: List[Tuple[int, int]] = []
+        size = 0
+        while start + len(keys) < len(files) and len(keys) < REORDER_WINDOW and (not keys or size < REORDER_BYTES):
+            key, n = _locality_stat(files[start + len(keys)])
+            keys.append(key)
+            size += n
+        yield start, sorted(range(len(keys)), key=keys.__getitem__)
+        start += len(keys)
+
+
+def _read_in_order(files: Sequence[str], opts: Options, render: RenderFn,
+                   progress_cb: ProgressCb) -> Iterator[Tuple[str | None, str | None]]:
     total = max(1, len(files))
     for i, fpath in enumerate(files, start=1):
         if progress_cb:
             progress_cb(i, total)
-        try:
-            st = os.stat(fpath)
-            if st.st_size > max_bytes:
-                skipped.append((fpath, f"taille {human_size(st.st_size)} > {opts.max_mb} Mo"))
-                continue
+        with span('render_file', path=fpath):
+            yield render(fpath, opts)
 
-            if opts.ignore_binaries and detect_binary(fpath):
-                skipped.append((fpath, "binaire/encodage non UTF-8"))
-                continue
 
-            content = _read_text_file(fpath)
-            if opts.normalize_eol:
-                content = _normalize_eol(content)
-            if fpath.lower().endswith('.cs') and (opts.cs_remove_comments or opts.cs_remove_usings):
-                content = clean_csharp(content, opts.cs_remove_comments, opts.cs_remove_usings)
-
-            if opts.add_headers:
-                sep = '=' * 12
-                parts.append(f"{sep} {fpath} {sep}")
-            parts.append(content)
-            if not content.endswith('\n'):
-                parts.append('\n')
-            written += 1
-        except Exception as e:
-            skipped.append((fpath, f"erreur: {e}"))
+def _read_by_locality(files: Sequence[str], opts: Options, render: RenderFn,
+                      progress_cb: ProgressCb) -> Iterator[Tuple[str | None, str | None]]:
+    """
+    Comme _read_in_order, mais chaque fenêtre est lue dans l'ordre des inodes
+    (proche de l'ordre physique sur ext4/XFS/APFS : moins de déplacements de
+    tête et de requêtes dispersées quand le cache est froid). Les résultats
+    sont restitués dans l'ordre de files ; le tampon de réordonnancement est
+    borné à une fenêtre. La fenêtre suivante est annoncée au noyau
+    (posix_fadvise WILLNEED) pendant que le consommateur écrit la courante.
+    """
+    total = max(1, len(files))
+    done = 0
+    windows = _locality_windows(files)
+    current = next(windows, None)
+    if current is not None:
+        _advise_willneed(files[current[0] + k] for k in current[1])
+    while current is not None:
+        start, order = current
+        results: List[Tuple[str | None, str | None]] = [(None, None)] * len(order)
+        with span('read_window', start=start, files=len(order)):
+            for k in order:
+                done += 1
+                if progress_cb:
+                    progress_cb(done, total)
+                fpath = files[start + k]
+                with span('render_file', path=fpath):
+                    results[k] = render(fpath, opts)
+        upcoming = next(windows, None)
+        if upcoming is not None:
+            _advise_willneed(files[upcoming[0] + k] for k in upcoming[1])
+        yield from results
+        current = upcoming
+
+
+def _iter_indexed(files: Sequence[str], opts: Options, skipped: list[tuple[str, str]] | None,
+                  progress_cb: ProgressCb, render: RenderFn | None) -> Iterator[Tuple[int, str, str]]:
+    """
+    Comme iter_rendered, avec l'indice dans files de chaque segment produit.
+    La progression peut précéder les segments (lecture par fenêtre) : seul cet
+    indice dit jusqu'où la sortie est réellement écrite.
+    """
+    render = render or render_file
+    if opts.read_order == 'inode' and len(files) > 1:
+        results = _read_by_locality(files, opts, render, progress_cb)
+    else:
+        results = _read_in_order(files, opts, render, progress_cb)
+    for i, (fpath, (segment, reason)) in enumerate(zip(files, results)):
+        if segment is None:
+            if skipped is not None:
+                skipped.append((fpath, reason or ""))
             continue
+        yield i, fpath, segment
 
     if progress_cb:
         progress_cb(len(files), max(1, len(files)))
 
-    return ''.join(parts), written, skipped
\ No newline at end of file
+
+def iter_rendered(files: Sequence[str], opts: Options, skipped: list[tuple[str, str]] | None = None,
+                  progress_cb: ProgressCb = None, render: RenderFn | None = None) -> Iterator[Tuple[str, str]]:
+    """
+    Moteur commun de concaténation : produit (chemin, segment) pour chaque fichier retenu, dans l'ordre.
+
+    Les fichiers ignorés sont ajoutés à `skipped`. Rien n'est lu avant que le
+    consommateur ne demande le segment suivant : la mémoire reste bornée à un
+    fichier (à une fenêtre de lecture avec opts.read_order == 'inode').
+    """
+    for _, fpath, segment in _iter_indexed(files, opts, skipped, progress_cb, render):
+        yield fpath, segment
+
+
+def iter_concat(files: Sequence[str], opts: Options, skipped: list[tuple[str, str]] | None = None,
+                progress_cb: ProgressCb = None, render: RenderFn | None = None) -> Iterator[str]:
+    """Comme iter_rendered, sans les chemins : le texte de sortie, segment par segment."""
+    for _, segment in iter_rendered(files, opts, skipped, progress_cb, render):
+        yield segment
+
+
+def iter_concat_bytes(files: Sequence[str], opts: Options, skipped: list[tuple[str, str]] | None = None,
+                      progress_cb: ProgressCb = None, render: RenderFn | None = None,
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Comme iter_concat, mais en blocs UTF-8 d'environ chunk_size octets (sockets, compression…)."""
+    buf = bytearray()
+    for segment in iter_concat(files, opts, skipped, progress_cb, render):
+        buf += segment.encode('utf-8')
+        if len(buf) >= chunk_size:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+# ------------------------ Sorties ------------------------
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _fsync_file(path: str) -> None:
+    """Force le contenu de `path` sur disque avant un renommage."""
+    # Lecture seule suffit à fsync sous POSIX ; Windows (_commit) exige l'écriture
+    flags = os.O_RDONLY if os.name == 'posix' else os.O_RDWR | getattr(os, 'O_BINARY', 0)
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path: str) -> None:
+    """Rend durable un renommage dans le dossier de `path` (POSIX ; sans objet ailleurs)."""
+    if os.name != 'posix':
+        return
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def durable_replace(tmp_path: str, out_path: str) -> None:
+    """
+    os.replace de tmp_path sur out_path, précédé d'un fsync de tmp_path et suivi
+    d'un fsync du dossier : après un plantage, out_path a l'ancien ou le nouveau
+    contenu complet, jamais un fichier vide ou tronqué (allocation différée).
+    """
+    _fsync_file(tmp_path)
+    os.replace(tmp_path, out_path)
+    _fsync_dir(out_path)
+
+
+def replace_if_changed(tmp_path: str, out_path: str, digest: Optional[str] = None) -> bool:
+    """
+    Remplace out_path par tmp_path (durable_replace, atomique) sauf si le contenu
+    est identique : tmp_path est alors supprimé et out_path n'est pas touché (mtime
+    compris). digest : SHA-256 de tmp_path s'il est déjà connu.
+    Retourne True si out_path a été remplacé.
+    """
+    try:
+        st = os.stat(out_path)
+    except OSError:
+        st = None
+    if st is not None and st.st_size == os.path.getsize(tmp_path):
+        try:
+            same = (digest or _file_digest(tmp_path)) == _file_digest(out_path)
+        except OSError:
+            same = False
+        if same:
+            os.remove(tmp_path)
+            return False
+    _fsync_file(tmp_path)  # avant chmod : la sortie existante peut être en lecture seule
+    if st is not None:
+        try:
+            os.chmod(tmp_path, st.st_mode & 0o7777)  # garder les droits de la sortie existante
+        except OSError:
+            pass
+    os.replace(tmp_path, out_path)
+    _fsync_dir(out_path)
+    return True
+
+
+class AtomicWriter:
+    """
+    Fichier binaire temporaire dans le dossier de la cible, haché (SHA-256) au fil
+    de l'écriture. commit() le renomme sur la cible, sauf contenu identique ;
+    discard() l'abandonne. Les lecteurs ne voient jamais de sortie à moitié écrite.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory, base = os.path.split(os.path.abspath(path))
+        self.tmp_path = os.path.join(directory, f".{base}.{secrets.token_hex(4)}.tmp")
+        # os.open plutôt que tempfile : droits par défaut (umask) et non 0600
+        fd = os.open(self.tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        self._f = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+        self.name = path  # attendu par gzip.GzipFile(fileobj=…)
+        self.changed: Optional[bool] = None  # après commit() : la cible a-t-elle été remplacée ?
+
+    def write(self, data: bytes) -> int:
+        self._f.write(data)
+        self._hash.update(data)
+        return len(data)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def commit(self) -> bool:
+        self._f.close()
+        self.changed = replace_if_changed(self.tmp_path, self.path, self._hash.hexdigest())
+        return self.changed
+
+    def discard(self) -> None:
+        self._f.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+def concat_to_file(files: Sequence[str], opts: Options, out_path: str, progress_cb: ProgressCb = None,
+                   render: RenderFn | None = None, checkpoint: bool = False,
+                   resume: bool = False) -> Tuple[int, list[tuple[str, str]]]:
+    """
+    Écrit la concaténation dans out_path. Retourne (nb_fichiers_écrits, skipped[(path, raison)]).
+
+    La sortie est écrite à côté puis renommée sur out_path (atomique) ; si le
+    contenu est identique à l'existant, out_path n'est pas touché (mtime compris).
+
+    checkpoint : enregistre régulièrement un point de reprise (out_path + '.ckpt') ;
+    après une annulation ou un plantage, la sortie partielle (out_path + '.part')
+    et le point de reprise restent sur disque. resume : repart du dernier point de reprise (ResumeError
+    s'il n'existe pas ou si les options / la liste de fichiers ont changé).
+    """
+    if checkpoint or resume:
+        return _concat_checkpointed(files, opts, out_path, progress_cb, render, resume)
+    skipped: list[tuple[str, str]] = []
+    out = AtomicWriter(out_path)
+    try:
+        for segment in iter_concat(files, opts, skipped, progress_cb, render):
+            out.write(segment.encode('utf-8'))
+    except BaseException:
+        out.discard()
+        raise
+    out.commit()
+    return len(files) - len(skipped), skipped
+
+
+def concat_to_string(files: Sequence[str], opts: Options, progress_cb: ProgressCb = None,
+                     render: RenderFn | None = None) -> Tuple[str, int, list[tuple[str, str]]]:
+    """Retourne (texte_concaténé, nb_fichiers_écrits, skipped)."""
+    skipped: list[tuple[str, str]] = []
+    text = ''.join(iter_concat(files, opts, skipped, progress_cb, render))
+    return text, len(files) - len(skipped), skipped
+
+
+def concat_to_stream(files: Sequence[str], opts: Options, stream: BinaryIO, progress_cb: ProgressCb = None,
+                     render: RenderFn | None = None) -> Tuple[int, list[tuple[str, str]]]:
+    """Écrit la concaténation (UTF-8) dans un flux binaire : stdout, stdin d'un sous-processus, fichier…"""
+    skipped: list[tuple[str, str]] = []
+    for chunk in iter_concat_bytes(files, opts, skipped, progress_cb, render):
+        stream.write(chunk)
+    stream.flush()
+    return len(files) - len(skipped), skipped
+
+
+def concat_to_gzip(files: Sequence[str], opts: Options, out_path: str, progress_cb: ProgressCb = None,
+                   render: RenderFn | None = None) -> Tuple[int, list[tuple[str, str]]]:
+    """Écrit la concaténation compressée (gzip) dans out_path (remplacement atomique, sauf contenu identique)."""
+    raw = AtomicWriter(out_path)
+    try:
+        # mtime=0 : même contenu => mêmes octets compressés, la comparaison reste possible
+        with gzip.GzipFile(fileobj=cast(BinaryIO, raw), mode='wb', mtime=0) as out:
+            result = concat_to_stream(files, opts, cast(BinaryIO, out), progress_cb, render)
+    except BaseException:
+        raw.discard()
+        raise
+    raw.commit()
+    return result
+
+
+def concat_to_socket(files: Sequence[str], opts: Options, sock: socket.socket, progress_cb: ProgressCb = None,
+                     render: RenderFn | None = None) -> Tuple[int, list[tuple[str, str]]]:
+    """Envoie la concaténation sur une socket connectée (sendall bloque tant que le pair ne lit pas)."""
+    skipped: list[tuple[str, str]] = []
+    for chunk in iter_concat_bytes(files, opts, skipped, progress_cb, render):
+        sock.sendall(chunk)
+    return len(files) - len(skipped), skipped
+
+
+# ------------------------ Points de reprise ------------------------
+
+CHECKPOINT_SUFFIX = '.ckpt'
+PARTIAL_SUFFIX = '.part'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL = 2.0  # secondes entre deux points de reprise
+
+
+class ResumeError(ValueError):
+    """Reprise impossible : pas de point de reprise, ou travail différent."""
+
+
+def checkpoint_path(out_path: str) -> str:
+    return out_path + CHECKPOINT_SUFFIX
+
+
+def partial_path(out_path: str) -> str:
+    return out_path + PARTIAL_SUFFIX
+
+
+def options_digest(opts: Options) -> str:
+    data: Dict[str, object] = {}
+    for f in fields(opts):
+        if f.name in SCHEDULING_FIELDS:
+            continue  # changer l'ordre de lecture n'empêche pas la reprise
+        v = getattr(opts, f.name)
+        if isinstance(v, (set, frozenset, tuple)):
+            v = sorted(v) if not isinstance(v, tuple) else list(v)
+        data[f.name] = v
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def files_digest(files: Sequence[str]) -> str:
+    h = hashlib.sha256()
+    for f in files:
+        h.update(f.encode('utf-8', 'surrogateescape'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def load_checkpoint(out_path: str, files: Sequence[str], opts: Options) -> Dict[str, object]:
+    """Point de reprise valide pour ce travail, sinon ResumeError (avec la raison)."""
+    try:
+        with open(checkpoint_path(out_path), 'r', encoding='utf-8') as f:
+            ck = json.load(f)
+    except FileNotFoundError:
+        raise ResumeError(f"aucun point de reprise pour {out_path}")
+    except (OSError, ValueError) as e:
+        raise ResumeError(f"point de reprise illisible : {e}")
+    if not isinstance(ck, dict) or ck.get('version') != CHECKPOINT_VERSION:
+        raise ResumeError("point de reprise d'une version incompatible")
+    if ck.get('options') != options_digest(opts):
+        raise ResumeError("les options ont changé depuis l'interruption")
+    if ck.get('files') != files_digest(files) or int(ck.get('index', -1)) > len(files):
+        raise ResumeError("la liste des fichiers a changé depuis l'interruption")
+    try:
+        size = os.path.getsize(partial_path(out_path))
+    except OSError:
+        raise ResumeError(f"sortie partielle introuvable : {partial_path(out_path)}")
+    if size < int(ck.get('offset', 0)):
+        raise ResumeError("la sortie partielle est plus courte que le point de reprise")
+    return ck
+
+
+def _save_checkpoint(out_path: str, ck: Dict[str, object]) -> None:
+    path = checkpoint_path(out_path)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(ck, f)
+    durable_replace(tmp, path)
+
+
+def _concat_checkpointed(files: Sequence[str], opts: Options, out_path: str, progress_cb: ProgressCb,
+                         render: RenderFn | None, resume: bool) -> Tuple[int, list[tuple[str, str]]]:
+    """
+    Comme concat_to_file, dans out_path + '.part' (binaire, pour connaître l'offset
+    exact), renommé sur out_path à la fin. Un point de reprise n'est écrit qu'après
+    flush + fsync : l'offset qu'il indique est toujours sur disque. À la reprise, la
+    sortie partielle est tronquée à cet offset (un segment à moitié écrit est jeté)
+    et la boucle repart du fichier suivant.
+    """
+    ck: Dict[str, object] = {
+        'version': CHECKPOINT_VERSION, 'options': options_digest(opts), 'files': files_digest(files),
+        'index': 0, 'offset': 0, 'written': 0, 'skipped': [],
+    }
+    if resume:
+        ck = load_checkpoint(out_path, files, opts)
+    start = int(ck['index'])  # type: ignore[arg-type]
+    written = int(ck['written'])  # type: ignore[arg-type]
+    skipped: list[tuple[str, str]] = [(p, r) for p, r in ck['skipped']]  # type: ignore[union-attr]
+    total = len(files)
+
+    def cb(i: int, _total: int) -> None:
+        if progress_cb:
+            progress_cb(start + i, total)
+
+    def save() -> None:
+        ck.update(index=done, offset=offset, written=written, skipped=skipped[:done_skipped])
+        _save_checkpoint(out_path, ck)
+
+    offset = int(ck['offset'])  # type: ignore[arg-type]
+    done, done_skipped = start, len(skipped)
+    part = partial_path(out_path)
+    out = open(part, 'r+b' if resume else 'wb')
+    try:
+        out.truncate(offset)
+        out.seek(offset)
+        last = time.monotonic()
+        # L'indice vient du segment produit, pas de la progression : en lecture par
+        # fenêtre (read_order 'inode'), toute la fenêtre est annoncée avant d'être écrite.
+        for i, _, segment in _iter_indexed(files[start:], opts, skipped, cb, render):
+            data = segment.encode('utf-8')
+            out.write(data)
+            offset += len(data)
+            written += 1
+            done, done_skipped = start + i + 1, len(skipped)
+            now = time.monotonic()
+            if now - last >= CHECKPOINT_INTERVAL:
+                out.flush()
+                os.fsync(out.fileno())
+                save()
+                last = now
+    except BaseException:
+        # Annulation, erreur d'écriture… : point de reprise sur le dernier segment complet
+        try:
+            out.flush()
+            os.fsync(out.fileno())  # l'offset du point de reprise doit être sur disque
+            out.close()
+            save()
+        except Exception:
+            pass
+        raise
+    out.close()
+    replace_if_changed(part, out_path)
+    try:
+        os.remove(checkpoint_path(out_path))
+    except FileNotFoundError:
+        pass
+    return written, skipped
+
+
+# ------------------------ Sorties multiples ------------------------
+
+Route = Callable[[str], bool]
+
+
+def route_from_patterns(spec: str) -> Route:
+    """
+    Filtre de routage depuis une liste séparée par des virgules : extensions
+    (".py") ou motifs glob ("*.test.ts", "docs/*"). Vide = tous les fichiers.
+    """
+    exts: Set[str] = set()
+    globs: List[str] = []
+    for item in parse_csv_list(spec):
+        if item.startswith('.') and not any(c in item for c in '*?['):
+            exts.add(item.lower())
+        else:
+            globs.append(item)
+    if not exts and not globs:
+        return lambda fpath: True
+
+    def route(fpath: str) -> bool:
+        if exts and _ext(fpath) in exts:
+            return True
+        name = os.path.basename(fpath)
+        unix = fpath.replace(os.sep, '/')
+        return any(fnmatch.fnmatch(name, g) or fnmatch.fnmatch(unix, '*/' + g) for g in globs)
+    return route
+
+
+class Sink(ABC):
+    """Destination d'une concaténation à sorties multiples, avec son filtre de routage."""
+
+    def __init__(self, route: Optional[Route] = None):
+        self.route = route
+        self.count = 0  # fichiers écrits dans cette sortie
+
+    def accepts(self, fpath: str) -> bool:
+        return self.route is None or self.route(fpath)
+
+    @abstractmethod
+    def write(self, segment: str) -> None:
+        """Ajoute un segment de sortie (fichier accepté par le routage)."""
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        """Passe interrompue (annulation, erreur). Par défaut : comme close()."""
+        self.close()
+
+
+class FileSink(Sink):
+    """
+    Fichier texte UTF-8 (compressé si le nom finit par .gz), créé au premier segment.
+    Écrit via AtomicWriter : remplacé à close() seulement si le contenu a changé,
+    laissé intact si la passe est interrompue.
+    """
+
+    def __init__(self, path: str, route: Optional[Route] = None):
+        super().__init__(route)
+        self.path = path
+        self.changed: Optional[bool] = None
+        self._raw: Optional[AtomicWriter] = None
+        self._gz: Optional[gzip.GzipFile] = None
+
+    def write(self, segment: str) -> None:
+        if self._raw is None:
+            self._raw = AtomicWriter(self.path)
+            if self.path.endswith('.gz'):
+                self._gz = gzip.GzipFile(fileobj=cast(BinaryIO, self._raw), mode='wb', mtime=0)
+        data = segment.encode('utf-8')
+        if self._gz is not None:
+            self._gz.write(data)
+        else:
+            self._raw.write(data)
+
+    def close(self) -> None:
+        if self._raw is None:
+            return
+        try:
+            if self._gz is not None:
+                self._gz.close()
+        except BaseException:
+            self._raw.discard()
+            raise
+        finally:
+            self._gz = None
+        self.changed = self._raw.commit()
+        self._raw = None
+
+    def abort(self) -> None:
+        if self._raw is None:
+            return
+        try:
+            if self._gz is not None:
+                self._gz.close()
+        except Exception:
+            pass
+        self._raw.discard()
+        self._raw, self._gz = None, None
+
+
+class StringSink(Sink):
+    """Accumule le texte en mémoire (presse-papiers…)."""
+
+    def __init__(self, route: Optional[Route] = None):
+        super().__init__(route)
+        self._parts: List[str] = []
+
+    def write(self, segment: str) -> None:
+        self._parts.append(segment)
+
+    def text(self) -> str:
+        return ''.join(self._parts)
+
+
+class StreamSink(Sink):
+    """Flux binaire déjà ouvert (stdout…), en UTF-8. Le flux n'est pas fermé."""
+
+    def __init__(self, stream: BinaryIO, route: Optional[Route] = None):
+        super().__init__(route)
+        self.stream = stream
+
+    def write(self, segment: str) -> None:
+        self.stream.write(segment.encode('utf-8'))
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+def per_ext_path(out_path: str, ext: str) -> str:
+    """concat.txt + .py -> concat.py.txt"""
+    stem, suffix = os.path.splitext(out_path)
+    return f"{stem}{ext or '.noext'}{suffix}"
+
+
+def ext_sinks(files: Iterable[str], out_path: str) -> List[FileSink]:
+    """Une sortie par extension présente dans files, nommée d'après out_path."""
+    exts = sorted({_ext(f) for f in files})
+    return [FileSink(per_ext_path(out_path, e), route=lambda f, e=e: _ext(f) == e) for e in exts]
+
+
+def concat_to_sinks(files: Sequence[str], opts: Options, sinks: List[Sink], progress_cb: ProgressCb = None,
+                    render: RenderFn | None = None) -> Tuple[int, list[tuple[str, str]]]:
+    """
+    Une seule passe pour plusieurs sorties : chaque fichier est lu et transformé
+    une fois, puis envoyé à toutes les sorties dont le filtre l'accepte. Les
+    fichiers qu'aucune sortie ne veut ne sont pas lus.
+    Retourne (nb_fichiers_écrits, skipped) ; le détail par sortie est dans Sink.count.
+    """
+    skipped: list[tuple[str, str]] = []
+    wanted = [f for f in files if any(s.accepts(f) for s in sinks)]
+    written = 0
+    try:
+        for fpath, segment in iter_rendered(wanted, opts, skipped, progress_cb, render):
+            for sink in sinks:
+                if sink.accepts(fpath):
+                    sink.write(segment)
+                    sink.count += 1
+            written += 1
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    for sink in sinks:
+        sink.close()
+    return written, skipped
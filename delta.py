@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Sortie différentielle : seulement ce qui a changé depuis l'exécution précédente.
+
+Un manifeste compact (out + '.manifest.json') garde, pour chaque fichier de la
+dernière exécution, (mtime, taille, SHA-256 du contenu transformé). Un fichier
+dont le mtime et la taille n'ont pas bougé n'est pas relu ; un fichier relu mais
+au contenu identique n'apparaît pas dans la sortie. La sortie ne contient que
+les fichiers ajoutés, modifiés (contenu complet, ou diff unifié avec --diff) et
+supprimés : sa taille suit celle du changement, pas celle du dépôt. Un fichier
+ignoré cette fois (binaire, trop gros) ou absent de la sélection mais toujours
+sur disque n'est pas « supprimé » : son entrée reste au manifeste.
+
+Pour les diffs, le contenu précédent de chaque fichier est conservé, compressé
+et adressé par son empreinte, dans out + '.objects/'. Seuls les objets des
+fichiers changés sont écrits ou supprimés.
+"""
+from __future__ import annotations
+import difflib
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models import DeltaResult, Options
+from core import (
+    AtomicWriter, ProgressCb, RenderFn, durable_replace, file_size, json_line, language_of, markdown_fence,
+    options_digest, render_file
+)
+from tracing import span
+
+MANIFEST_SUFFIX = '.manifest.json'
+OBJECTS_SUFFIX = '.objects'
+MANIFEST_VERSION = 1
+# Fichier modifié il y a moins d'une seconde : il peut encore changer sans que
+# son mtime bouge, on le relira (et comparera son empreinte) la prochaine fois.
+_RACY_NS = 1_000_000_000
+
+ADDED, MODIFIED, DELETED = 'added', 'modified', 'deleted'
+_LABELS = {ADDED: 'AJOUTÉ', MODIFIED: 'MODIFIÉ', DELETED: 'SUPPRIMÉ'}
+
+# Entrée du manifeste : [mtime_ns, taille, sha256 du contenu]
+Entry = List
+
+
+def manifest_path(out_path: str) -> str:
+    return out_path + MANIFEST_SUFFIX
+
+
+def objects_dir(out_path: str) -> str:
+    return out_path + OBJECTS_SUFFIX
+
+
+def content_options(opts: Options) -> Options:
+    """Options de rendu du contenu seul : l'en-tête et le format sont ajoutés par la sortie différentielle."""
+    return replace(opts, add_headers=False, output_format='text')
+
+
+def load_manifest(out_path: str, opts: Options) -> Optional[Dict[str, Entry]]:
+    """Fichiers de l'exécution précédente, ou None (pas de manifeste, illisible, options de rendu changées)."""
+    try:
+        with open(manifest_path(out_path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != MANIFEST_VERSION or data.get('options') != options_digest(content_options(opts)):
+        return None
+    files = data.get('files')
+    return files if isinstance(files, dict) else None
+
+
+def _save_manifest(out_path: str, opts: Options, files: Dict[str, Entry]) -> None:
+    path = manifest_path(out_path)
+    tmp = path + '.tmp'
+    data = {'version': MANIFEST_VERSION, 'options': options_digest(content_options(opts)), 'files': files}
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    durable_replace(tmp, path)
+
+
+def _object_path(out_path: str, digest: str) -> str:
+    return os.path.join(objects_dir(out_path), digest[:2], digest[2:])
+
+
+def _load_object(out_path: str, digest: str) -> Optional[str]:
+    try:
+        with open(_object_path(out_path, digest), 'rb') as f:
+            return gzip.decompress(f.read()).decode('utf-8')
+    except (OSError, EOFError, ValueError):
+        return None
+
+
+def _store_object(out_path: str, digest: str, content: str) -> None:
+    path = _object_path(out_path, digest)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(gzip.compress(content.encode('utf-8'), mtime=0))
+    durable_replace(tmp, path)
+
+
+def _drop_object(out_path: str, digest: str) -> None:
+    try:
+        os.remove(_object_path(out_path, digest))
+    except OSError:
+        pass
+
+
+def _exists(fpath: str) -> bool:
+    """Le fichier (ou le membre d'archive) existe-t-il encore ?"""
+    try:
+        file_size(fpath)
+        return True
+    except OSError:
+        return False
+
+
+def unified_diff(fpath: str, old: str, new: str) -> str:
+    name = fpath.replace(os.sep, '/').lstrip('/')
+    lines = difflib.unified_diff(old.splitlines(keepends=True), new.splitlines(keepends=True),
+                                 fromfile=f"a/{name}", tofile=f"b/{name}")
+    out = []
+    for line in lines:
+        out.append(line if line.endswith('\n') else line + '\n\\ No newline at end of file\n')
+    return ''.join(out)
+
+
+def delta_block(fpath: str, status: str, body: str, opts: Options, is_diff: bool = False) -> str:
+    """Segment de sortie d'un changement, au format des options (texte, JSONL, Markdown)."""
+    if opts.output_format == 'jsonl':
+        record: Dict[str, object] = {'path': fpath.replace(os.sep, '/'), 'status': status}
+        if status != DELETED:
+            record['diff' if is_diff else 'content'] = body
+        return json_line(record)
+    if opts.output_format == 'markdown':
+        head = f"## `{fpath}` ({_LABELS[status].lower()})\n\n"
+        if status == DELETED:
+            return head
+        fence = markdown_fence(body)
+        if body and not body.endswith('\n'):
+            body += '\n'
+        return f"{head}{fence}{'diff' if is_diff else language_of(fpath)}\n{body}{fence}\n\n"
+    sep = '=' * 12
+    return f"\n{sep} {_LABELS[status]} : {fpath} {sep}\n{body}"
+
+
+def concat_delta(files: Sequence[str], opts: Options, out_path: str, diff: bool = False,
+                 progress_cb: ProgressCb = None, render: RenderFn | None = None) -> DeltaResult:
+    """
+    Écrit dans out_path les changements depuis la dernière exécution (ajouts,
+    modifications, suppressions), puis met à jour le manifeste. Sans manifeste
+    valide (première exécution, options de rendu changées), tous les fichiers
+    sont « ajoutés ». La sortie est remplacée de façon atomique ; le manifeste
+    n'est mis à jour qu'une fois la sortie en place.
+    """
+    render = render or render_file
+    copts = content_options(opts)
+    previous = load_manifest(out_path, opts)
+    if previous is None and os.path.isdir(objects_dir(out_path)):
+        shutil.rmtree(objects_dir(out_path), ignore_errors=True)  # objets d'un manifeste obsolète
+    old = previous or {}
+    result = DeltaResult(baseline=previous is None)
+    current: Dict[str, Entry] = {}
+    stored: List[str] = []      # objets écrits (à retirer si la passe échoue)
+    released: List[str] = []    # objets remplacés (à retirer une fois la passe réussie)
+    total = max(1, len(files))
+
+    out = AtomicWriter(out_path)
+    try:
+        for i, fpath in enumerate(files, start=1):
+            if progress_cb:
+                progress_cb(i, total)
+            try:
+                st = os.stat(fpath)
+                key: Tuple[int, int] | None = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                key = None  # membre d'archive : toujours relu
+            prev = old.get(fpath)
+            if prev is not None and key is not None and (prev[0], prev[1]) == key:
+                current[fpath] = prev
+                result.unchanged += 1
+                continue
+            with span('render_file', path=fpath):
+                content, reason = render(fpath, copts)
+            result.rendered += 1
+            if content is None:
+                # Ignoré cette fois (binaire, trop gros…) : pas « supprimé », son entrée est gardée
+                result.skipped.append((fpath, reason or ""))
+                if prev is not None:
+                    current[fpath] = prev
+                continue
+            digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            if key is None or time.time_ns() - key[0] < _RACY_NS:
+                key = (0, 0)
+            current[fpath] = [key[0], key[1], digest]
+            if prev is not None and prev[2] == digest:
+                result.unchanged += 1
+                continue
+            if diff:
+                _store_object(out_path, digest, content)
+                stored.append(digest)
+            if prev is None:
+                out.write(delta_block(fpath, ADDED, content, opts).encode('utf-8'))
+                result.added.append(fpath)
+                continue
+            before = _load_object(out_path, prev[2]) if diff else None
+            if before is not None:
+                segment = delta_block(fpath, MODIFIED, unified_diff(fpath, before, content), opts, is_diff=True)
+            else:
+                segment = delta_block(fpath, MODIFIED, content, opts)
+            out.write(segment.encode('utf-8'))
+            result.modified.append(fpath)
+            released.append(prev[2])
+        for fpath, prev in old.items():
+            if fpath in current:
+                continue
+            if _exists(fpath):
+                # Hors de la sélection de cette exécution (décoché, filtré) mais toujours là
+                current[fpath] = prev
+                result.retained.append(fpath)
+                continue
+            out.write(delta_block(fpath, DELETED, '', opts).encode('utf-8'))
+            result.deleted.append(fpath)
+            released.append(prev[2])
+    except BaseException:
+        out.discard()
+        referenced = {e[2] for e in old.values()}
+        for digest in stored:
+            if digest not in referenced:
+                _drop_object(out_path, digest)
+        raise
+    result.changed = out.commit()
+    _save_manifest(out_path, opts, current)
+    live = {e[2] for e in current.values()}
+    for digest in released:
+        if digest not in live:
+            _drop_object(out_path, digest)
+    return result
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Table compacte des fichiers candidats, du parcours jusqu'à la concaténation.
+
+Une liste de chemins absolus coûte ~100 octets par fichier (objet str, préfixe
+répété, pointeur de liste). Ici chaque dossier n'est stocké qu'une fois ; un
+fichier est une ligne de colonnes en tableaux : numéro de dossier, fin de son
+nom dans un blob d'octets (encodé comme os.fsencode), taille et mtime. Environ
+30 octets par fichier plus la longueur de son nom.
+
+Le parcours (os.scandir) ne donne pas la taille sans un stat par fichier sous
+POSIX : taille et mtime valent -1 jusqu'au premier FileTable.stat, qui les
+relève une fois et les garde pour les étapes suivantes (estimation…).
+
+FileTable est une séquence de chemins (len, index, tranches, itération, `in`) :
+les fonctions qui attendent une liste de chemins l'acceptent telle quelle.
+Les doublons sont écartés à la construction : un dossier listé deux fois
+(racines qui se recouvrent) n'ajoute ses fichiers qu'une fois. L'appartenance
+passe par un index nom -> ligne, construit par dossier à la première recherche.
+"""
+from __future__ import annotations
+import os
+import sys
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, overload
+
+_ENCODING, _ERRORS = sys.getfilesystemencoding(), sys.getfilesystemencodeerrors()
+_UNKNOWN = array('q', [-1])
+
+
+class FileTable(Sequence):
+    def __init__(self) -> None:
+        self._dirs: List[str] = []          # préfixes (dossier + séparateur)
+        self._dir_ids: Dict[str, int] = {}
+        self._dir_col = array('I')
+        self._blob = bytearray()
+        self._ends = array('Q')             # fin du nom de chaque ligne dans _blob
+        self.sizes = array('q')
+        self.mtimes = array('q')
+        self._listed: Dict[int, Tuple[int, int]] = {}  # dossier listé -> lignes [début, fin)
+        self._loose: Dict[str, int] = {}               # chemin ajouté un par un (racine fichier…) -> ligne
+        self._names: Dict[int, Dict[bytes, int]] = {}  # dossier listé -> nom encodé -> ligne (à la demande)
+
+    # ----- construction -----
+
+    def _dir_id(self, prefix: str) -> int:
+        ident = self._dir_ids.get(prefix)
+        if ident is None:
+            ident = self._dir_ids[prefix] = len(self._dirs)
+            self._dirs.append(prefix)
+        return ident
+
+    def _push(self, ident: int, encoded: List[bytes]) -> None:
+        """Ajoute les noms encodés `encoded`, tous du dossier `ident` (taille et mtime inconnus)."""
+        n = len(encoded)
+        if not n:
+            return
+        self._dir_col.extend(array('I', [ident]) * n)
+        ends = accumulate(map(len, encoded), initial=len(self._blob))
+        next(ends)
+        self._ends.extend(ends)
+        self._blob += b''.join(encoded)
+        self.sizes.extend(_UNKNOWN * n)
+        self.mtimes.extend(_UNKNOWN * n)
+
+    def add_listing(self, directory: str, names: Iterable[str]) -> bool:
+        """
+        Ajoute les fichiers `names` (noms simples, déjà filtrés) du dossier.
+        Un dossier déjà listé est ignoré ; retourne False dans ce cas.
+        """
+        prefix = directory if directory.endswith(os.sep) else directory + os.sep
+        ident = self._dir_id(prefix)
+        if ident in self._listed:
+            return False
+        if self._loose:
+            names = [n for n in names if prefix + n not in self._loose]
+        start = len(self._ends)
+        self._push(ident, [n.encode(_ENCODING, _ERRORS) for n in names])
+        self._listed[ident] = (start, len(self._ends))
+        return True
+
+    def append(self, path: str, size: int = -1, mtime: int = -1) -> bool:
+        """Ajoute un chemin isolé (racine fichier, membre d'archive, fichier git). False si déjà présent."""
+        if path in self:
+            return False
+        prefix, _, name = path.rpartition(os.sep)
+        self._loose[path] = len(self._ends)
+        self._push(self._dir_id(prefix + os.sep), [name.encode(_ENCODING, _ERRORS)])
+        self.sizes[-1], self.mtimes[-1] = size, mtime
+        return True
+
+    def extend(self, paths: Iterable[str]) -> None:
+        for p in paths:
+            self.append(p)
+
+    # ----- séquence de chemins -----
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    def _name(self, i: int) -> str:
+        start = self._ends[i - 1] if i else 0
+        return self._blob[start:self._ends[i]].decode(_ENCODING, _ERRORS)
+
+    @overload
+    def __getitem__(self, i: int) -> str: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> FileTable: ...
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.take(range(*i.indices(len(self))))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._dirs[self._dir_col[i]] + self._name(i)
+
+    def __iter__(self) -> Iterator[str]:
+        dirs, col, ends = self._dirs, self._dir_col, self._ends
+        blob = self._blob
+        start = 0
+        for ident, end in zip(col, ends):
+            yield dirs[ident] + blob[start:end].decode(_ENCODING, _ERRORS)
+            start = end
+
+    def __contains__(self, path: object) -> bool:
+        return isinstance(path, str) and self._row(path) is not None
+
+    def _row(self, path: str) -> Optional[int]:
+        """Ligne du chemin, ou None. Un fichier listé est cherché dans la plage de son dossier."""
+        row = self._loose.get(path)
+        if row is not None:
+            return row
+        prefix, _, name = path.rpartition(os.sep)
+        ident = self._dir_ids.get(prefix + os.sep)
+        if ident is None or ident not in self._listed:
+            return None
+        names = self._names.get(ident)
+        if names is None:
+            # Index nom -> ligne du dossier, construit à la première recherche puis gardé
+            blob, ends = self._blob, self._ends
+            a, b = self._listed[ident]
+            start = ends[a - 1] if a else 0
+            names = self._names[ident] = {}
+            for i in range(a, b):
+                names.setdefault(bytes(blob[start:ends[i]]), i)
+                start = ends[i]
+        return names.get(name.encode(_ENCODING, _ERRORS))
+
+    def __repr__(self) -> str:
+        return f"<FileTable {len(self)} fichier(s), {len(self._dirs)} dossier(s)>"
+
+    # ----- sélection -----
+
+    def take(self, rows: Iterable[int]) -> FileTable:
+        """Nouvelle table avec les lignes `rows` (dans cet ordre), tailles et mtimes compris."""
+        out = FileTable()
+        out._dirs = self._dirs[:]
+        out._dir_ids = dict(self._dir_ids)
+        for a, b in _runs(rows):
+            out._copy_rows(self, a, b)
+        return out
+
+    def _copy_rows(self, src: FileTable, a: int, b: int) -> None:
+        """Copie en bloc les lignes [a, b) de `src` à la fin de la table."""
+        o = len(self._ends)
+        base = src._ends[a - 1] if a else 0
+        shift = len(self._blob) - base
+        self._blob += src._blob[base:src._ends[b - 1]]
+        self._ends.extend(e + shift for e in src._ends[a:b])
+        self._dir_col.extend(src._dir_col[a:b])
+        self.sizes.extend(src.sizes[a:b])
+        self.mtimes.extend(src.mtimes[a:b])
+        # Une sélection dans l'ordre garde les fichiers d'un dossier contigus : l'appartenance
+        # reste une plage de lignes ; sinon (ou ligne isolée) le chemin passe dans _loose.
+        i = a
+        while i < b:
+            ident = src._dir_col[i]
+            span = src._listed.get(ident)
+            if span is None or not span[0] <= i < span[1]:
+                self._loose[src[i]] = o + i - a
+                i += 1
+                continue
+            j = min(b, span[1])
+            mine = self._listed.get(ident)
+            if mine is None:
+                self._listed[ident] = (o + i - a, o + j - a)
+            elif mine[1] == o + i - a:
+                self._listed[ident] = (mine[0], o + j - a)
+                self._names.pop(ident, None)
+            else:
+                self._loose.update((src[k], o + k - a) for k in range(i, j))
+            i = j
+
+    def select(self, keep: Callable[[str], bool]) -> FileTable:
+        """Lignes dont le chemin satisfait `keep`."""
+        return self.take(i for i, p in enumerate(self) if keep(p))
+
+    def without(self, paths: Set[str]) -> FileTable:
+        """Table sans les chemins de `paths` (fichiers décochés d'un profil…) ; self si rien à retirer."""
+        drop = {r for r in map(self._row, paths) if r is not None}
+        if not drop:
+            return self
+        return self.take(i for i in range(len(self)) if i not in drop)
+
+    # ----- métadonnées -----
+
+    def stat(self, i: int) -> Optional[Tuple[int, int]]:
+        """(taille, mtime_ns) de la ligne i, relevés une seule fois ; None si le fichier est introuvable."""
+        if self.sizes[i] < 0:
+            try:
+                st = os.stat(self[i])
+            except OSError:
+                return None
+            self.sizes[i], self.mtimes[i] = st.st_size, st.st_mtime_ns
+        return self.sizes[i], self.mtimes[i]
+
+    def nbytes(self) -> int:
+        """Mémoire occupée (approximative)."""
+        arrays = (self._dir_col, self._ends, self.sizes, self.mtimes)
+        return (len(self._blob) + sum(a.itemsize * len(a) for a in arrays)
+                + sum(len(d) + 100 for d in self._dirs) + 48 * len(self._listed)
+                + sum(len(p) + 80 for p in self._loose)
+                + sum(len(n) + 90 for names in self._names.values() for n in names))
+
+
+def _runs(rows: Iterable[int]) -> Iterator[Tuple[int, int]]:
+    """Regroupe des indices en plages consécutives [début, fin)."""
+    start = end = -1
+    for i in rows:
+        if i == end:
+            end += 1
+            continue
+        if start >= 0:
+            yield start, end
+        start, end = i, i + 1
+    if start >= 0:
+        yield start, end
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Énumération des fichiers via l'index git (git ls-files / git diff) au lieu du
+parcours du disque. Un appel git par racine, jamais par fichier ; les racines
+hors dépôt retombent sur le parcours classique.
+"""
+from __future__ import annotations
+import os
+import subprocess
+from typing import Iterable, List, Optional
+
+from models import Options
+from core import DirLister, gather_candidate_files, list_dir, unique_paths
+from filetable import FileTable
+
+
+def _git(root: str, *args: str) -> Optional[bytes]:
+    """Lance git dans root. Retourne stdout, ou None si git échoue ou est absent."""
+    try:
+        proc = subprocess.run(['git', '-C', root, *args], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout
+
+
+def is_git_dir(path: str) -> bool:
+    out = _git(path, 'rev-parse', '--is-inside-work-tree')
+    return out is not None and out.strip() == b'true'
+
+
+def _split_z(out: bytes) -> List[str]:
+    return [os.fsdecode(p) for p in out.split(b'\0') if p]
+
+
+def git_files(root: str, untracked: bool = False, since: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Chemins (relatifs à root, séparateur '/') suivis par git sous root.
+    untracked : ajoute les fichiers non suivis et non ignorés.
+    since : seulement les fichiers modifiés depuis cette révision (arbre de travail compris).
+    Retourne None si root n'est pas dans un dépôt ; ValueError si la révision est inconnue.
+    """
+    if not is_git_dir(root):
+        return None
+    if since:
+        out = _git(root, 'diff', '--name-only', '-z', '--relative', '--diff-filter=d', since, '--', '.')
+        if out is None:
+            raise ValueError(f"révision inconnue dans {root} : {since}")
+    else:
+        out = _git(root, 'ls-files', '-z', '--cached', '--', '.')
+    if out is None:
+        return None
+    rel = _split_z(out)
+    if untracked:
+        extra = _git(root, 'ls-files', '-z', '--others', '--exclude-standard', '--', '.')
+        if extra is not None:
+            rel.extend(_split_z(extra))
+    return rel
+
+
+def gather_git_files(roots: Iterable[str], opts: Options, untracked: bool = False,
+                     since: Optional[str] = None, lister: DirLister = list_dir,
+                     workers: int = 1) -> FileTable:
+    """
+    Comme core.gather_candidate_files, mais en interrogeant git pour les racines
+    qui sont dans un dépôt (ordre de l'index : chemins triés).
+    """
+    excluded = {d.strip() for d in opts.exclude_dirs if d.strip()}
+    include_all = (len(opts.include_exts) == 0)
+    table = FileTable()
+
+    for root in unique_paths(roots):
+        rel = git_files(root, untracked, since) if os.path.isdir(root) else None
+        if rel is None:
+            gather_candidate_files([root], opts, lister, workers, table)
+            continue
+        prefix = root if root.endswith(os.sep) else root + os.sep
+        for r in rel:
+            parts = r.split('/')
+            if not opts.recursive and len(parts) > 1:
+                continue
+            if excluded and not excluded.isdisjoint(parts[:-1]):
+                continue
+            if not include_all and os.path.splitext(parts[-1])[1].lower() not in opts.include_exts:
+                continue
+            path = prefix + r.replace('/', os.sep)
+            # Sous-modules, fichiers supprimés mais encore dans l'index
+            if os.path.isfile(path):
+                table.append(path)
+
+    return table
@@ -4,9 +4,7 @@
 
 import sys
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import QCoreApplication, QSize, QSettings   # ← QSettings
-from ui_mainwindow import MainWindow, ico
-from typing import Optional, cast
+from PySide6.QtCore import QCoreApplication
 
 def main() -> int:
     QCoreApplication.setOrganizationName("ConcatTools")
@@ -14,8 +12,11 @@ def main() -> int:
     QCoreApplication.setApplicationVersion("1.0.5")
 
     app = QApplication(sys.argv)
-    app.setWindowIcon(ico("app.svg", QSize(24, 24)))
+    # L'icône de l'application est posée par MainWindow après le premier affichage
 
+    # Importée une fois QApplication créée : la fenêtre est le premier affichage,
+    # ses dépendances lourdes (QtSvg, caches, archives…) sont chargées à la demande.
+    from ui_mainwindow import MainWindow
     win = MainWindow()
     win.show()
     return app.exec()
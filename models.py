@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Set
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
 
 
 @dataclass
@@ -14,4 +14,93 @@ class Options:
     add_headers: bool
     normalize_eol: bool
     cs_remove_comments: bool = False
-    cs_remove_usings: bool = False
\ No newline at end of file
+    cs_remove_usings: bool = False
+    truncate_large: bool = False  # > max_mb : garder le début et la fin au lieu d'ignorer
+    head_kb: int = 64
+    tail_kb: int = 16
+    output_format: str = 'text'   # 'text' | 'jsonl' | 'markdown'
+    transforms: Tuple[str, ...] = ()  # noms d'étapes de core.TRANSFORMS (en plus de 'eol')
+    tab_size: int = 4
+    skip_lockfiles: bool = False  # package-lock.json, yarn.lock, Cargo.lock…
+    skip_minified: bool = False   # *.min.js, source maps, lignes très longues
+    skip_generated: bool = False  # stubs protobuf, marques « @generated », « DO NOT EDIT »…
+    read_order: str = 'path'      # 'path' (ordre de sortie) | 'inode' (ordre du disque, caches froids)
+
+
+@dataclass
+class ProfileItem:
+    path: str
+    kind: str = 'file'            # 'file' | 'dir'
+    checked: bool = True
+    unchecked: List[str] = field(default_factory=list)  # enfants décochés d'un dossier
+
+
+@dataclass
+class Profile:
+    name: str
+    items: List[ProfileItem] = field(default_factory=list)
+    exts: str = ".py,.ts,.tsx,.js,.java,.kt,.cs,.cpp,.h,.hpp"
+    excludedirs: str = ".git,node_modules,venv,build,dist,.idea,.vscode,target,bin,obj"
+    recursive: bool = True
+    headers: bool = True
+    ignore_bin: bool = True
+    normalize_eol: bool = True
+    max_mb: float = 5.0
+    transforms: List[str] = field(default_factory=list)
+    tab_size: int = 4
+    skip_lockfiles: bool = False
+    skip_minified: bool = False
+    skip_generated: bool = False
+    read_order: str = 'path'
+    truncate_large: bool = False
+    head_kb: int = 64
+    tail_kb: int = 16
+    out_path: str = ""
+    output_format: str = 'auto'   # 'auto' (d'après out_path) | 'text' | 'jsonl' | 'markdown'
+    also_clipboard: bool = False  # « Concaténer » copie aussi le texte (même passe)
+    split_by_ext: bool = False    # « Concaténer » écrit aussi une sortie par extension
+    ui_geometry: str = ""         # base64 (QMainWindow.saveGeometry)
+    ui_state: str = ""            # base64 (QMainWindow.saveState)
+
+
+@dataclass
+class Estimate:
+    """Prévision d'une concaténation, calculée uniquement à partir des métadonnées (stat)."""
+    files: int = 0                # candidats examinés
+    kept: int = 0                 # fichiers qui seraient écrits
+    total_bytes: int = 0          # taille de tous les candidats
+    kept_bytes: int = 0           # taille des fichiers retenus
+    est_tokens: int = 0
+    skip_size: int = 0            # ignorés car > max_mb
+    truncated: int = 0            # > max_mb, réduits au début et à la fin
+    skip_binary: int = 0          # ignorés car binaires (d'après l'extension)
+    skip_generated: int = 0       # ignorés car générés (d'après le nom : verrouillage, minifiés…)
+    skip_error: int = 0           # introuvables / illisibles
+    largest: List[Tuple[str, int]] = field(default_factory=list)
+    by_ext: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # ext -> (nb, octets)
+
+
+@dataclass
+class BatchResult:
+    """Résultat d'un profil dans une exécution groupée (batch.run_batch)."""
+    profile: str
+    out_path: str = ""
+    files: int = 0                # fichiers retenus par les filtres du profil
+    written: int = 0
+    skipped: List[Tuple[str, str]] = field(default_factory=list)
+    changed: Optional[bool] = None  # sortie remplacée ? (False : contenu identique, non modifiée)
+    error: str = ""
+
+
+@dataclass
+class DeltaResult:
+    """Bilan d'une sortie différentielle (delta.concat_delta)."""
+    baseline: bool = False        # pas de manifeste valide : tous les fichiers sont « ajoutés »
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    retained: List[str] = field(default_factory=list)  # hors sélection mais présents : gardés au manifeste
+    unchanged: int = 0
+    rendered: int = 0             # fichiers relus (les autres : mtime et taille inchangés)
+    skipped: List[Tuple[str, str]] = field(default_factory=list)
+    changed: Optional[bool] = None  # sortie remplacée ? (False : contenu identique, non modifiée)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Index de chemins en mémoire pour le filtre de l'arbre des sources.
+
+Les chemins (en minuscules) sont concaténés en un seul texte, un par ligne,
+avec la table des positions de début de ligne. Une recherche est un str.find
+sur ce texte, exécuté en C : quelques millisecondes pour des centaines de
+milliers de chemins. Chaque occurrence est ramenée à son chemin par bisection.
+Sans résultat, on retombe sur une correspondance approximative (lettres de la
+requête dans l'ordre).
+"""
+from __future__ import annotations
+import re
+from array import array
+from bisect import bisect_right
+from typing import List, Optional, Set
+
+
+def _fuzzy_pattern(chars: str) -> re.Pattern:
+    """
+    Lettres dans l'ordre. Chaque saut exclut la lettre attendue ([^c]*c) :
+    pas de retour arrière, coût linéaire.
+    """
+    parts = [re.escape(chars[0])]
+    for c in chars[1:]:
+        parts.append(f"[^{re.escape(c)}]*{re.escape(c)}")
+    return re.compile(''.join(parts))
+
+
+class PathIndex:
+    def __init__(self):
+        self._keys: List[str] = []          # id -> chemin en minuscules ('' si supprimé)
+        self._blob: Optional[str] = None    # reconstruit à la demande après ajout/suppression
+        self._starts = array('Q')
+        self._alive = 0
+
+    def __len__(self) -> int:
+        return self._alive
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._blob = None
+        self._alive = 0
+
+    def add(self, path: str) -> int:
+        """Indexe un chemin et retourne son identifiant."""
+        self._keys.append(path.lower().replace('\n', ' '))
+        self._alive += 1
+        self._blob = None
+        return len(self._keys) - 1
+
+    def remove(self, ident: int) -> None:
+        if 0 <= ident < len(self._keys) and self._keys[ident]:
+            self._keys[ident] = ''
+            self._alive -= 1
+            self._blob = None
+
+    def _text(self) -> str:
+        if self._blob is None:
+            starts = array('Q')
+            pos = 0
+            for k in self._keys:
+                starts.append(pos)
+                pos += len(k) + 1
+            self._starts = starts
+            self._blob = '\n'.join(self._keys) + '\n'
+        return self._blob
+
+    def _find_all(self, term: str) -> Set[int]:
+        text = self._text()
+        if text.count(term) > len(self._keys) // 16:
+            # Terme très fréquent : un test par chemin revient moins cher qu'une bisection par occurrence
+            return {i for i, k in enumerate(self._keys) if k and term in k}
+        out: Set[int] = set()
+        starts = self._starts
+        find = text.find
+        pos = find(term)
+        while pos >= 0:
+            ident = bisect_right(starts, pos) - 1
+            out.add(ident)
+            # Chemin suivant : inutile de chercher d'autres occurrences dans celui-ci
+            nxt = starts[ident + 1] if ident + 1 < len(starts) else len(text)
+            pos = find(term, nxt)
+        return out
+
+    def search(self, query: str, fuzzy: bool = True) -> Set[int]:
+        """
+        Identifiants des chemins contenant tous les termes de la requête
+        (séparés par des espaces). Sans résultat et si fuzzy, essaie une
+        correspondance approximative (lettres de la requête dans l'ordre).
+        """
+        terms = query.lower().split()
+        if not terms:
+            return {i for i, k in enumerate(self._keys) if k}
+        ordered = sorted(terms, key=len, reverse=True)  # le terme le plus long est le plus sélectif
+        keys = self._keys
+        result = self._find_all(ordered[0])
+        for t in ordered[1:]:
+            result = {i for i in result if t in keys[i]}
+        if result or not fuzzy:
+            return result
+        match = _fuzzy_pattern(''.join(terms)).search
+        return {i for i, k in enumerate(keys) if k and match(k)}
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""Aperçu virtualisé du fichier de sortie : projection mémoire + index des lignes en arrière-plan."""
+from __future__ import annotations
+import mmap
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Callable, List, Optional, Tuple
+
+from PySide6.QtCore import Qt, QObject, QSize, QUrl, Signal
+from PySide6.QtGui import QColor, QDesktopServices, QFontDatabase, QIcon, QPainter, QPalette
+from PySide6.QtWidgets import (
+    QAbstractScrollArea, QComboBox, QHBoxLayout, QLabel, QLineEdit, QToolButton, QVBoxLayout, QWidget
+)
+
+_HEADER_RE = re.compile(rb'^={12} (.+) ={12}\r?$', re.M)
+_NL_RE = re.compile(rb'\n')
+_INDEX_BLOCK = 4 * 1024 * 1024
+_MAX_LINE_BYTES = 4096
+
+
+class MappedText:
+    """
+    Fichier texte projeté en mémoire.
+
+    `starts` contient l'offset de début de chaque ligne ; il est rempli
+    progressivement par build_index() (thread de fond) et peut être lu pendant
+    ce temps : il ne fait que croître.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, 'rb')
+        self.size = os.fstat(self._f.fileno()).st_size
+        self.mm: Optional[mmap.mmap] = None
+        if self.size:
+            self.mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.starts = array('Q', [0])
+        self.headers: List[Tuple[int, str]] = []  # (n° de ligne, chemin source)
+        self.complete = self.size == 0
+
+    def close(self) -> None:
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        self._f.close()
+
+    def build_index(self, stop: threading.Event, progress: Callable[[int], None]) -> None:
+        mm = self.mm
+        if mm is None:
+            return
+        pos = 0
+        while pos < self.size and not stop.is_set():
+            end = min(self.size, pos + _INDEX_BLOCK)
+            if end < self.size:
+                # Découpe sur une fin de ligne pour ne pas couper un en-tête en deux
+                nl = mm.rfind(b'\n', pos, end)
+                if nl < 0:
+                    nl = mm.find(b'\n', end)
+                end = self.size if nl < 0 else nl + 1
+            block = mm[pos:end]
+            first = len(self.starts) - 1
+            self.starts.extend([m.end() + pos for m in _NL_RE.finditer(block)])
+            starts = self.starts
+            for m in _HEADER_RE.finditer(block):
+                line = bisect_right(starts, m.start() + pos, first) - 1
+                self.headers.append((line, m.group(1).decode('utf-8', errors='replace')))
+            pos = end
+            progress(pos)
+        self.complete = not stop.is_set()
+
+    def line_count(self) -> int:
+        n = len(self.starts)
+        if not self.complete or self.starts[-1] == self.size:
+            n -= 1
+        return max(0, n)
+
+    def line(self, i: int) -> str:
+        if self.mm is None or i < 0 or i >= len(self.starts):
+            return ''
+        start = self.starts[i]
+        end = self.starts[i + 1] - 1 if i + 1 < len(self.starts) else self.size
+        end = min(end, start + _MAX_LINE_BYTES)
+        return self.mm[start:end].decode('utf-8', errors='replace').rstrip('\r')
+
+    def line_of_offset(self, offset: int) -> int:
+        return max(0, bisect_right(self.starts, offset) - 1)
+
+    def find(self, needle: bytes, start: int) -> int:
+        """Recherche directe dans les octets projetés (repart du début si besoin)."""
+        mm = self.mm
+        if mm is None or not needle:
+            return -1
+        try:
+            pos = mm.find(needle, start)
+            if pos < 0 and start > 0:
+                pos = mm.find(needle, 0)
+        except ValueError:  # projection libérée entre-temps
+            return -1
+        return pos
+
+    def header_for_line(self, line: int) -> Optional[str]:
+        idx = bisect_right(self.headers, (line, '\uffff')) - 1
+        return self.headers[idx][1] if idx >= 0 else None
+
+
+class PreviewView(QAbstractScrollArea):
+    """Vue qui ne dessine que les lignes visibles du document."""
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.doc: Optional[MappedText] = None
+        self.highlight = -1
+        self.horizontalScrollBar().setSingleStep(20)
+
+    def set_document(self, doc: Optional[MappedText]) -> None:
+        self.doc = doc
+        self.highlight = -1
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self.update_ranges()
+
+    def _visible_lines(self) -> int:
+        return max(1, self.viewport().height() // max(1, self.fontMetrics().height()))
+
+    def update_ranges(self) -> None:
+        count = self.doc.line_count() if self.doc else 0
+        page = self._visible_lines()
+        vs = self.verticalScrollBar()
+        vs.setPageStep(page)
+        vs.setRange(0, max(0, count - page + 1))
+        hs = self.horizontalScrollBar()
+        hs.setPageStep(self.viewport().width())
+        hs.setRange(0, self.fontMetrics().horizontalAdvance('M') * 400)
+        self.viewport().update()
+
+    def top_line(self) -> int:
+        return self.verticalScrollBar().value()
+
+    def scroll_to_line(self, line: int, highlight: bool = True) -> None:
+        self.highlight = line if highlight else -1
+        self.verticalScrollBar().setValue(max(0, line - 3))
+        self.viewport().update()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.update_ranges()
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        self.viewport().update()
+
+    def paintEvent(self, e):
+        painter = QPainter(self.viewport())
+        pal = self.palette()
+        painter.fillRect(self.viewport().rect(), pal.color(QPalette.ColorRole.Base))
+        doc = self.doc
+        if doc is None:
+            return
+        fm = self.fontMetrics()
+        lh = fm.height()
+        first = self.top_line()
+        count = doc.line_count()
+        gutter = fm.horizontalAdvance('9' * max(4, len(str(count)))) + 12
+        dx = self.horizontalScrollBar().value()
+        text_col = pal.color(QPalette.ColorRole.Text)
+        dim = QColor(text_col)
+        dim.setAlpha(110)
+        hl = pal.color(QPalette.ColorRole.Highlight)
+        hl.setAlpha(60)
+        width = self.viewport().width()
+        for k in range(self._visible_lines() + 1):
+            i = first + k
+            if i >= count:
+                break
+            y = k * lh
+            if i == self.highlight:
+                painter.fillRect(0, y, width, lh, hl)
+            painter.setClipRect(gutter, y, width - gutter, lh)
+            painter.setPen(text_col)
+            painter.drawText(gutter + 4 - dx, y + fm.ascent(), doc.line(i).expandtabs(4))
+            painter.setClipping(False)
+            painter.setPen(dim)
+            painter.drawText(0, y, gutter - 6, lh, int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter), str(i + 1))
+
+
+class _PreviewBridge(QObject):
+    """Relaye vers le thread UI l'avancement de l'indexation et des recherches."""
+    progress = Signal(int, object)  # (génération, octets indexés) — object : offsets > 2 Go
+    found = Signal(int, object)     # (génération, offset ou -1)
+
+
+class PreviewPanel(QWidget):
+    """Dock d'aperçu : vue virtualisée, navigation par en-têtes et recherche."""
+
+    def __init__(self, icon: Optional[Callable[[str], QIcon]] = None, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.path = ""
+        self.doc: Optional[MappedText] = None
+        self._gen = 0
+        self._stop: Optional[threading.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._headers_shown = 0
+        self._bridge = _PreviewBridge(self)
+        self._bridge.progress.connect(self._on_progress)
+        self._bridge.found.connect(self._on_found)
+
+        self.view = PreviewView()
+        self.cmb_headers = QComboBox()
+        self.cmb_headers.setMinimumWidth(240)
+        self.cmb_headers.setToolTip("Aller au fichier source")
+        self.btn_reload = QToolButton(); self.btn_reload.setAutoRaise(True); self.btn_reload.setIconSize(QSize(18, 18)); self.btn_reload.setToolTip("Recharger l'aperçu")
+        self.btn_source = QToolButton(); self.btn_source.setAutoRaise(True); self.btn_source.setIconSize(QSize(18, 18)); self.btn_source.setToolTip("Ouvrir le fichier source affiché")
+        self.ed_search = QLineEdit(); self.ed_search.setPlaceholderText("Rechercher…"); self.ed_search.setClearButtonEnabled(True)
+        self.btn_search = QToolButton(); self.btn_search.setAutoRaise(True); self.btn_search.setIconSize(QSize(18, 18)); self.btn_search.setToolTip("Occurrence suivante")
+        self.lbl_status = QLabel()
+
+        bar = QHBoxLayout(); bar.setContentsMargins(0, 0, 0, 0)
+        bar.addWidget(self.btn_reload)
+        bar.addWidget(self.cmb_headers, 1)
+        bar.addWidget(self.btn_source)
+        bar.addWidget(self.ed_search, 1)
+        bar.addWidget(self.btn_search)
+        lay = QVBoxLayout(self); lay.setContentsMargins(4, 4, 4, 4)
+        lay.addLayout(bar)
+        lay.addWidget(self.view, 1)
+        lay.addWidget(self.lbl_status)
+
+        self.btn_reload.clicked.connect(self.reload)
+        self.btn_source.clicked.connect(self.open_current_source)
+        self.btn_search.clicked.connect(self.find_next)
+        self.ed_search.returnPressed.connect(self.find_next)
+        self.cmb_headers.activated.connect(self._on_header_activated)
+        if icon is not None:
+            self.set_icons(icon)
+
+    def set_icons(self, icon: Callable[[str], QIcon]) -> None:
+        """Icônes des boutons (peuvent être posées après coup, une fois la fenêtre affichée)."""
+        self.btn_reload.setIcon(icon("refresh.svg"))
+        self.btn_source.setIcon(icon("open.svg"))
+        self.btn_search.setIcon(icon("search.svg"))
+
+    # ----- Chargement -----
+    def is_open(self) -> bool:
+        return self.doc is not None
+
+    def open(self, path: str) -> None:
+        self.release()
+        self.path = path
+        if not path or not os.path.isfile(path):
+            self.lbl_status.setText("Fichier de sortie introuvable.")
+            return
+        try:
+            doc = MappedText(path)
+        except OSError as e:
+            self.lbl_status.setText(f"Lecture impossible : {e}")
+            return
+        self.doc = doc
+        self.view.set_document(doc)
+        self.cmb_headers.clear()
+        self._headers_shown = 0
+        self._gen += 1
+        gen = self._gen
+        stop = threading.Event()
+        bridge = self._bridge
+        self._stop = stop
+        self._thread = threading.Thread(
+            target=doc.build_index, args=(stop, lambda pos: bridge.progress.emit(gen, pos)), daemon=True)
+        self._thread.start()
+        self.lbl_status.setText("Indexation…")
+
+    def reload(self) -> None:
+        self.open(self.path)
+
+    def release(self) -> None:
+        """Libère la projection (à appeler avant de réécrire le fichier de sortie)."""
+        if self._stop is not None:
+            self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._stop = None
+        self._thread = None
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+        self.view.set_document(None)
+
+    # ----- Indexation -----
+    def _on_progress(self, gen: int, pos: int):
+        doc = self.doc
+        if gen != self._gen or doc is None:
+            return
+        self.view.update_ranges()
+        headers = doc.headers
+        if len(headers) > self._headers_shown:
+            self.cmb_headers.addItems([p for _, p in headers[self._headers_shown:]])
+            self._headers_shown = len(headers)
+        pct = int(pos * 100 / max(1, doc.size))
+        done = pos >= doc.size
+        self.lbl_status.setText(
+            f"{doc.line_count()} lignes, {len(headers)} fichier(s)" + ("" if done else f" — indexation {pct} %"))
+
+    def _on_header_activated(self, idx: int):
+        if self.doc is not None and 0 <= idx < len(self.doc.headers):
+            self.view.scroll_to_line(self.doc.headers[idx][0])
+
+    def open_current_source(self) -> None:
+        if self.doc is None:
+            return
+        line = self.view.highlight if self.view.highlight >= 0 else self.view.top_line()
+        src = self.doc.header_for_line(line)
+        if src and os.path.exists(src):
+            QDesktopServices.openUrl(QUrl.fromLocalFile(src))
+
+    # ----- Recherche -----
+    def find_next(self) -> None:
+        doc = self.doc
+        needle = self.ed_search.text().encode('utf-8')
+        if doc is None or not needle:
+            return
+        line = self.view.highlight + 1 if self.view.highlight >= 0 else self.view.top_line()
+        start = doc.starts[line] if line < len(doc.starts) else 0
+        gen = self._gen
+        bridge = self._bridge
+        threading.Thread(target=lambda: bridge.found.emit(gen, doc.find(needle, start)), daemon=True).start()
+
+    def _on_found(self, gen: int, offset: int):
+        doc = self.doc
+        if gen != self._gen or doc is None:
+            return
+        if offset < 0:
+            self.lbl_status.setText("Aucune occurrence.")
+            return
+        if offset >= doc.starts[-1] and not doc.complete:
+            self.lbl_status.setText("Occurrence au-delà de la partie indexée, réessayez dans un instant.")
+            return
+        self.view.scroll_to_line(doc.line_of_offset(offset))
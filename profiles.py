@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Stockage des profils dans des fichiers JSON versionnés (un fichier par profil)."""
+from __future__ import annotations
+import json
+import os
+import pathlib
+from dataclasses import asdict, fields
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+
+from models import Options, Profile, ProfileItem
+from core import OUTPUT_FORMATS, READ_ORDERS, app_data_dir, format_for_path, normalize_exts, parse_csv_list
+
+PROFILE_VERSION = 1
+PROFILE_SUFFIX = '.json'
+
+
+def profiles_dir() -> pathlib.Path:
+    return app_data_dir() / 'profiles'
+
+
+def _profile_file(name: str) -> pathlib.Path:
+    # Nom encodé pour rester un nom de fichier valide sur tous les OS
+    return profiles_dir() / (quote(name, safe=' ') + PROFILE_SUFFIX)
+
+
+# ------------------------ Sérialisation ------------------------
+
+def profile_to_dict(profile: Profile) -> Dict[str, Any]:
+    data = asdict(profile)
+    for it in data['items']:
+        # Format compact : on n'écrit que ce qui diffère des valeurs par défaut
+        if not it['unchecked']:
+            del it['unchecked']
+        if it['checked']:
+            del it['checked']
+    data['version'] = PROFILE_VERSION
+    return data
+
+
+def _check_field(name: str, kind: str, v: Any) -> Any:
+    """Valeur JSON d'un champ de profil, contrôlée contre son type (ValueError sinon)."""
+    if kind == 'bool':
+        ok = isinstance(v, bool)
+    elif kind == 'int':
+        ok = isinstance(v, int) and not isinstance(v, bool)
+    elif kind == 'float':
+        ok = isinstance(v, (int, float)) and not isinstance(v, bool)
+    elif kind == 'str':
+        ok = isinstance(v, str)
+    else:  # List[str]
+        ok = isinstance(v, list) and all(isinstance(x, str) for x in v)
+    if not ok:
+        raise ValueError(f"profil : champ « {name} » invalide ({v!r})")
+    return v
+
+
+def _item_from_dict(raw: Any) -> Optional[ProfileItem]:
+    if not isinstance(raw, dict):
+        raise ValueError(f"profil : élément invalide ({raw!r})")
+    path = _check_field('items.path', 'str', raw.get('path', ''))
+    if not path:
+        return None
+    return ProfileItem(
+        path=path,
+        kind='dir' if _check_field('items.kind', 'str', raw.get('kind', 'file')) == 'dir' else 'file',
+        checked=_check_field('items.checked', 'bool', raw.get('checked', True)),
+        unchecked=_check_field('items.unchecked', 'List[str]', raw.get('unchecked', [])),
+    )
+
+
+def profile_from_dict(data: Any, name: Optional[str] = None) -> Profile:
+    """Profil d'un document JSON, types des champs contrôlés (ValueError si invalide)."""
+    if not isinstance(data, dict):
+        raise ValueError("profil : objet JSON attendu")
+    version = data.get('version', 0)
+    if not isinstance(version, int) or isinstance(version, bool):
+        raise ValueError(f"profil : version invalide ({version!r})")
+    if version > PROFILE_VERSION:
+        raise ValueError(f"version de profil {version} non supportée")
+    kwargs: Dict[str, Any] = {}
+    for f in fields(Profile):
+        if f.name in data and f.name != 'items':
+            kwargs[f.name] = _check_field(f.name, str(f.type), data[f.name])
+    if name is not None:
+        kwargs['name'] = name
+    elif 'name' not in kwargs:
+        raise ValueError("profil : champ « name » manquant")
+    raw_items = data.get('items', [])
+    if not isinstance(raw_items, list):
+        raise ValueError("profil : « items » doit être une liste")
+    items = [it for it in map(_item_from_dict, raw_items) if it is not None]
+    return Profile(items=items, **kwargs)
+
+
+def profile_options(profile: Profile, out_path: Optional[str] = None) -> Options:
+    """
+    Construit les Options de concaténation décrites par un profil.
+    out_path (défaut : celui du profil) sert à déduire le format en mode 'auto'.
+    """
+    fmt = profile.output_format
+    if fmt not in OUTPUT_FORMATS:
+        fmt = format_for_path(out_path if out_path is not None else profile.out_path)
+    return Options(
+        recursive=profile.recursive,
+        include_exts=normalize_exts(parse_csv_list(profile.exts)),
+        exclude_dirs=set(parse_csv_list(profile.excludedirs)),
+        ignore_binaries=profile.ignore_bin,
+        max_mb=profile.max_mb,
+        add_headers=profile.headers,
+        normalize_eol=profile.normalize_eol,
+        truncate_large=profile.truncate_large,
+        head_kb=profile.head_kb,
+        tail_kb=profile.tail_kb,
+        output_format=fmt,
+        transforms=tuple(profile.transforms),
+        tab_size=profile.tab_size,
+        skip_lockfiles=profile.skip_lockfiles,
+        skip_minified=profile.skip_minified,
+        skip_generated=profile.skip_generated,
+        read_order=profile.read_order if profile.read_order in READ_ORDERS else 'path',
+    )
+
+
+def profile_selection(profile: Profile) -> Tuple[List[str], Set[str]]:
+    """Retourne (racines cochées, fichiers explicitement décochés) d'un profil."""
+    roots: List[str] = []
+    excluded: Set[str] = set()
+    for it in profile.items:
+        if not it.checked:
+            continue
+        roots.append(it.path)
+        excluded.update(os.path.normpath(p) for p in it.unchecked)
+    return roots, excluded
+
+
+# ------------------------ Accès disque ------------------------
+
+def list_profiles() -> List[str]:
+    d = profiles_dir()
+    if not d.is_dir():
+        return []
+    names = [unquote(p.name[:-len(PROFILE_SUFFIX)]) for p in d.iterdir() if p.name.endswith(PROFILE_SUFFIX)]
+    return sorted(names)
+
+
+def load_profile(name: str) -> Optional[Profile]:
+    path = _profile_file(name)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    return profile_from_dict(data, name=name)
+
+
+def save_profile(profile: Profile) -> None:
+    """Écrit le profil de façon atomique (fichier temporaire puis remplacement)."""
+    path = _profile_file(profile.name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(profile_to_dict(profile), f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def delete_profile(name: str) -> None:
+    try:
+        _profile_file(name).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def rename_profile(old: str, new: str) -> None:
+    profile = load_profile(old)
+    if profile is None:
+        return
+    profile.name = new
+    save_profile(profile)
+    delete_profile(old)
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Caches persistants du parcours (SQLite dans le dossier de données).
+
+- listings de dossiers : un dossier dont le mtime n'a pas changé depuis la
+  dernière exécution est servi depuis le cache, sans scandir ;
+- natures de fichiers (texte, binaire, minifié, généré) d'après leur contenu :
+  un fichier inchangé (inode, mtime, taille) n'est pas relu pour être classé.
+  Le nom (extension, fichier de verrouillage…) est réévalué à chaque appel :
+  un fichier renommé est reclassé sans être relu.
+
+Le même fichier est partagé par l'interface et la ligne de commande ; sa taille
+est bornée (les entrées les moins récemment utilisées sont évincées).
+"""
+from __future__ import annotations
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from core import (
+    BINARY_EXTS, DirListing, RenderFn, app_data_dir, detect_content_kind, detect_kind, kind_with_name, list_dir,
+    render_file
+)
+
+SCAN_CACHE_FILE = "scancache.sqlite"
+DEFAULT_BUDGET = 64 * 1024 * 1024
+DEFAULT_MAX_VERDICTS = 1_000_000
+_FLUSH_EVERY = 512
+# Un dossier modifié il y a moins d'une seconde peut encore changer sans que
+# son mtime bouge (granularité du système de fichiers) : on ne le met pas en cache.
+_RACY_NS = 1_000_000_000
+_SEP = '\0'
+
+# Version du schéma (PRAGMA user_version). 2 : table kinds (nature du contenu
+# seul) à la place de verdicts (binaire ou non) et des natures dépendant du nom.
+_SCHEMA_VERSION = 2
+_MIGRATE = """
+DROP TABLE IF EXISTS verdicts;
+DROP TABLE IF EXISTS kinds;
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    path  TEXT PRIMARY KEY,
+    mtime INTEGER NOT NULL,
+    files TEXT NOT NULL,
+    dirs  TEXT NOT NULL,
+    size  INTEGER NOT NULL,
+    used  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS listings_used ON listings(used);
+CREATE TABLE IF NOT EXISTS kinds (
+    dev    INTEGER NOT NULL,
+    ino    INTEGER NOT NULL,
+    mtime  INTEGER NOT NULL,
+    size   INTEGER NOT NULL,
+    kind   TEXT NOT NULL,
+    used   INTEGER NOT NULL,
+    PRIMARY KEY (dev, ino)
+);
+CREATE INDEX IF NOT EXISTS kinds_used ON kinds(used);
+"""
+
+
+def _split(s: str) -> list:
+    return s.split(_SEP) if s else []
+
+
+def _open_db(db_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    db = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    if db.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+        db.executescript(_MIGRATE)
+        db.executescript(_SCHEMA)
+        db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+    else:
+        db.executescript(_SCHEMA)
+    return db
+
+
+class PersistentListingCache:
+    """Lister de dossiers (voir core.DirLister) adossé à une base SQLite."""
+
+    def __init__(self, db_path: Optional[str] = None, budget_bytes: int = DEFAULT_BUDGET):
+        self.db_path = db_path or os.path.join(app_data_dir(), SCAN_CACHE_FILE)
+        self.budget = budget_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[int, str, str, int]] = {}
+        self._touched: Set[str] = set()
+        self._db: Optional[sqlite3.Connection] = None
+        self._used = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._db is not None:
+            return self._db
+        try:
+            db = _open_db(self.db_path)
+            self._used = db.execute("SELECT COALESCE(SUM(size), 0) FROM listings").fetchone()[0]
+        except sqlite3.Error:
+            # Cache indisponible (disque en lecture seule, base corrompue…) : on liste directement
+            self.budget = 0
+            return None
+        self._db = db
+        return db
+
+    def __call__(self, path: str) -> DirListing:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], []
+        with self._lock:
+            db = self._connect() if self.budget > 0 else None
+            row = None
+            pending = self._pending.get(path)
+            if pending is not None:
+                row = pending[:3]
+            elif db is not None:
+                try:
+                    row = db.execute("SELECT mtime, files, dirs FROM listings WHERE path = ?",
+                                     (path,)).fetchone()
+                except sqlite3.Error:
+                    row = None
+            if row is not None and row[0] == mtime:
+                self.hits += 1
+                self._touched.add(path)
+                return _split(row[1]), _split(row[2])
+            self.misses += 1
+
+        files, dirs = list_dir(path)
+        if db is not None and time.time_ns() - mtime >= _RACY_NS:
+            f, d = _SEP.join(files), _SEP.join(dirs)
+            with self._lock:
+                self._pending[path] = (mtime, f, d, len(path) + len(f) + len(d) + 64)
+                if len(self._pending) >= _FLUSH_EVERY:
+                    self._flush_locked()
+        return files, dirs
+
+    def _flush_locked(self) -> None:
+        db = self._db
+        if db is None or not (self._pending or self._touched):
+            self._pending.clear()
+            self._touched.clear()
+            return
+        now = time.time_ns()
+        try:
+            with db:
+                if self._pending:
+                    paths = list(self._pending)
+                    for i in range(0, len(paths), 500):
+                        chunk = paths[i:i + 500]
+                        q = "SELECT COALESCE(SUM(size), 0) FROM listings WHERE path IN (%s)" % ','.join('?' * len(chunk))
+                        self._used -= db.execute(q, chunk).fetchone()[0]
+                    db.executemany(
+                        "INSERT OR REPLACE INTO listings (path, mtime, files, dirs, size, used) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(p, m, f, d, s, now) for p, (m, f, d, s) in self._pending.items()])
+                    self._used += sum(v[3] for v in self._pending.values())
+                if self._touched:
+                    db.executemany("UPDATE listings SET used = ? WHERE path = ?",
+                                   [(now, p) for p in self._touched])
+                if self._used > self.budget:
+                    self._evict_locked(db)
+        except sqlite3.Error:
+            pass
+        self._pending.clear()
+        self._touched.clear()
+
+    def _evict_locked(self, db: sqlite3.Connection) -> None:
+        """Supprime les entrées les moins récemment utilisées jusqu'à 90 % du budget."""
+        target = int(self.budget * 0.9)
+        cur = db.execute("SELECT path, size FROM listings ORDER BY used")
+        doomed = []
+        for path, size in cur:
+            if self._used <= target:
+                break
+            doomed.append((path,))
+            self._used -= size
+        cur.close()
+        db.executemany("DELETE FROM listings WHERE path = ?", doomed)
+
+    def flush(self) -> None:
+        """Écrit sur disque les listings récemment relus."""
+        with self._lock:
+            self._flush_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._touched.clear()
+            db = self._connect()
+            if db is not None:
+                with db:
+                    db.execute("DELETE FROM listings")
+                self._used = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'used': self._used, 'budget': self.budget, 'pending': len(self._pending),
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class VerdictCache:
+    """
+    Natures de contenu (core.detect_content_kind) mémorisées par (périphérique,
+    inode), valides tant que le mtime et la taille du fichier n'ont pas changé.
+    La partie qui dépend du nom est recalculée à chaque appel (core.kind_with_name).
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = DEFAULT_MAX_VERDICTS):
+        self.db_path = db_path or os.path.join(app_data_dir(), SCAN_CACHE_FILE)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, int], Tuple[int, int, str]] = {}
+        self._touched: Set[Tuple[int, int]] = set()
+        self._db: Optional[sqlite3.Connection] = None
+        self._count = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._db is not None:
+            return self._db
+        try:
+            db = _open_db(self.db_path)
+            self._count = db.execute("SELECT COUNT(*) FROM kinds").fetchone()[0]
+        except sqlite3.Error:
+            self.max_entries = 0
+            return None
+        self._db = db
+        return db
+
+    def is_binary(self, path: str) -> bool:
+        """Comme core.detect_binary, sans relire un fichier déjà classé."""
+        return self.kind(path) == 'binary'
+
+    def kind(self, path: str) -> str:
+        """Comme core.detect_kind, sans relire un fichier déjà classé."""
+        if os.path.splitext(path)[1].lower() in BINARY_EXTS:
+            return 'binary'
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 'binary'
+        if not st.st_ino:
+            return detect_kind(path)  # pas d'inode fiable sur ce système de fichiers
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            row = self._pending.get(key)
+            if row is None and self.max_entries > 0:
+                db = self._connect()
+                if db is not None:
+                    try:
+                        r = db.execute("SELECT mtime, size, kind FROM kinds WHERE dev = ? AND ino = ?",
+                                       key).fetchone()
+                    except sqlite3.Error:
+                        r = None
+                    if r is not None:
+                        row = (r[0], r[1], str(r[2]))
+            if row is not None and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+                self.hits += 1
+                self._touched.add(key)
+                return kind_with_name(path, row[2])
+            self.misses += 1
+
+        content = detect_content_kind(path)
+        if self.max_entries > 0 and time.time_ns() - st.st_mtime_ns >= _RACY_NS:
+            with self._lock:
+                self._pending[key] = (st.st_mtime_ns, st.st_size, content)
+                if len(self._pending) >= _FLUSH_EVERY:
+                    self._flush_locked()
+        return kind_with_name(path, content)
+
+    def _flush_locked(self) -> None:
+        db = self._db
+        if db is None or not (self._pending or self._touched):
+            self._pending.clear()
+            self._touched.clear()
+            return
+        now = time.time_ns()
+        try:
+            with db:
+                if self._pending:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO kinds (dev, ino, mtime, size, kind, used) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(k[0], k[1], m, s, v, now) for k, (m, s, v) in self._pending.items()])
+                if self._touched:
+                    db.executemany("UPDATE kinds SET used = ? WHERE dev = ? AND ino = ?",
+                                   [(now, k[0], k[1]) for k in self._touched])
+                self._count = db.execute("SELECT COUNT(*) FROM kinds").fetchone()[0]
+                if self._count > self.max_entries:
+                    excess = self._count - int(self.max_entries * 0.9)
+                    db.execute("DELETE FROM kinds WHERE rowid IN "
+                               "(SELECT rowid FROM kinds ORDER BY used LIMIT ?)", (excess,))
+                    self._count -= excess
+        except sqlite3.Error:
+            pass
+        self._pending.clear()
+        self._touched.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': self._count, 'max_entries': self.max_entries,
+                    'pending': len(self._pending), 'hits': self.hits, 'misses': self.misses}
+
+
+_default: Optional[PersistentListingCache] = None
+_default_verdicts: Optional[VerdictCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> PersistentListingCache:
+    """Cache de listings partagé du processus, écrit sur disque à la sortie."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = PersistentListingCache()
+            atexit.register(_default.close)
+        return _default
+
+
+def default_verdicts() -> VerdictCache:
+    """Cache des natures de fichiers (binaire, texte, généré…) partagé du processus, écrit sur disque à la sortie."""
+    global _default_verdicts
+    with _default_lock:
+        if _default_verdicts is None:
+            _default_verdicts = VerdictCache()
+            atexit.register(_default_verdicts.close)
+        return _default_verdicts
+
+
+def cached_renderer() -> RenderFn:
+    """core.render_file dont le classement (binaire, généré…) passe par le cache de verdicts."""
+    verdicts = default_verdicts()
+    return lambda fpath, opts: render_file(fpath, opts, verdicts.kind)
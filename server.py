@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+Serveur local de concaténation (HTTP sur 127.0.0.1) et sa bibliothèque cliente.
+
+Les listings de dossiers et les contenus déjà rendus restent en mémoire entre
+les requêtes : un second appel sur les mêmes dépôts ne relit que ce qui a changé.
+
+Points d'accès :
+  POST /concat      {"roots": [...], "options": {...}} → texte en flux (chunked),
+                    en-tête X-Concat-Job pour récupérer le rapport ensuite
+  GET  /jobs/<id>   rapport JSON {"written": n, "skipped": [[chemin, raison], ...]}
+  GET  /stats       état des caches
+
+Le serveur lit des fichiers locaux arbitraires : seules les requêtes adressées
+à 127.0.0.1:<port> ou localhost:<port> sont servies (403 sinon, contre le
+DNS rebinding), et POST /concat exige Content-Type: application/json (415
+sinon), qu'un formulaire ou un POST text/plain d'une page web ne peut envoyer
+sans requête préalable (CORS).
+"""
+from __future__ import annotations
+import codecs
+import http.client
+import itertools
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models import Options
+from core import (
+    CHUNK_SIZE, OUTPUT_FORMATS, READ_ORDERS, RenderFn, gather_candidate_files, iter_concat_bytes, unique_paths
+)
+from caches import ContentCache, ListingCache, render_key
+from filetable import FileTable
+
+DEFAULT_PORT = 8765
+_MAX_JOBS = 64
+
+
+def options_to_dict(opts: Options) -> Dict[str, Any]:
+    data = asdict(opts)
+    for k, v in data.items():
+        if isinstance(v, (set, frozenset)):
+            data[k] = sorted(v)
+    return data
+
+
+def _check_option(name: str, kind: str, v: Any) -> Any:
+    """Valeur JSON convertie au type du champ d'Options (TypeError / ValueError si invalide)."""
+    if kind == 'bool':
+        ok = isinstance(v, bool)
+    elif kind == 'int':
+        ok = isinstance(v, int) and not isinstance(v, bool) and v >= 0
+    elif kind == 'float':
+        ok = isinstance(v, (int, float)) and not isinstance(v, bool) and v >= 0
+    elif kind == 'str':
+        ok = isinstance(v, str)
+    else:  # Set[str], Tuple[str, ...]
+        ok = isinstance(v, list) and all(isinstance(x, str) for x in v)
+        if ok:
+            v = set(v) if kind.startswith('Set') else tuple(v)
+    if not ok:
+        raise TypeError(f"option « {name} » : valeur invalide {v!r}")
+    return v
+
+
+def options_from_dict(data: Any) -> Options:
+    """Options d'une requête JSON, validées (TypeError / ValueError si invalides)."""
+    if not isinstance(data, dict):
+        raise TypeError("« options » doit être un objet")
+    kwargs: Dict[str, Any] = {}
+    for f in fields(Options):
+        if f.name in data:
+            kwargs[f.name] = _check_option(f.name, str(f.type), data[f.name])
+    opts = Options(**kwargs)
+    if opts.output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"format de sortie inconnu : {opts.output_format!r}")
+    if opts.read_order not in READ_ORDERS:
+        raise ValueError(f"ordre de lecture inconnu : {opts.read_order!r}")
+    return opts
+
+
+# ------------------------ Serveur ------------------------
+
+class ConcatService:
+    """État partagé du serveur : caches chauds et rapports des dernières requêtes."""
+
+    def __init__(self, listing_budget: int = 64 * 1024 * 1024, content_budget: int = 256 * 1024 * 1024):
+        self.listings = ListingCache(listing_budget)
+        self.contents = ContentCache(content_budget)
+        self._jobs: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def new_job(self) -> str:
+        return str(next(self._ids))
+
+    def finish_job(self, job: str, report: Dict[str, Any]) -> None:
+        with self._jobs_lock:
+            self._jobs[job] = report
+            while len(self._jobs) > _MAX_JOBS:
+                self._jobs.popitem(last=False)
+
+    def job_report(self, job: str) -> Optional[Dict[str, Any]]:
+        with self._jobs_lock:
+            return self._jobs.get(job)
+
+    def files_for(self, roots: List[str], opts: Options) -> FileTable:
+        return gather_candidate_files(roots, opts, lister=self.listings)
+
+    def renderer(self, opts: Options) -> RenderFn:
+        """Fonction de rendu servie par le cache de contenus, pour iter_concat."""
+        rkey = render_key(opts)
+        return lambda fpath, o: self.contents.render(fpath, o, rkey)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'listings': self.listings.stats(), 'contents': self.contents.stats()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: '_Server'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, code: int, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _host_allowed(self) -> bool:
+        """En-tête Host égal à l'adresse locale du serveur (refuse le DNS rebinding)."""
+        port = self.server.server_address[1]
+        host = (self.headers.get('Host') or '').strip().lower()
+        return host in (f'127.0.0.1:{port}', f'localhost:{port}')
+
+    def do_GET(self):
+        if not self._host_allowed():
+            self._send_json(403, {'error': 'hôte refusé'})
+            return
+        service = self.server.service
+        if self.path == '/stats':
+            self._send_json(200, service.stats())
+        elif self.path.startswith('/jobs/'):
+            report = service.job_report(self.path[len('/jobs/'):])
+            if report is None:
+                self._send_json(404, {'error': 'job inconnu'})
+            else:
+                self._send_json(200, report)
+        else:
+            self._send_json(404, {'error': 'introuvable'})
+
+    def do_POST(self):
+        if not self._host_allowed():
+            self._send_json(403, {'error': 'hôte refusé'})
+            return
+        if self.path != '/concat':
+            self._send_json(404, {'error': 'introuvable'})
+            return
+        if self.headers.get_content_type() != 'application/json':
+            self._send_json(415, {'error': 'Content-Type: application/json attendu'})
+            return
+        service = self.server.service
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(payload, dict):
+                raise TypeError("le corps doit être un objet JSON")
+            roots = payload.get('roots', [])
+            if not isinstance(roots, list):
+                raise TypeError("« roots » doit être une liste")
+            roots = unique_paths(str(p) for p in roots)
+            opts = options_from_dict(payload.get('options', {}))
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': f"requête invalide : {e}"})
+            return
+
+        files = service.files_for(roots, opts)
+        job = service.new_job()
+        skipped: List[Tuple[str, str]] = []
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('X-Concat-Job', job)
+        self.send_header('X-Concat-Files', str(len(files)))
+        self.end_headers()
+
+        def report() -> Dict[str, Any]:
+            return {'written': len(files) - len(skipped), 'skipped': skipped, 'files': len(files)}
+
+        finished = False
+        try:
+            for chunk in iter_concat_bytes(files, opts, skipped, render=service.renderer(opts)):
+                self._write_chunk(chunk)
+            # Rapport enregistré avant le dernier bloc : un client qui le demande
+            # dès la fin du flux le trouve toujours.
+            service.finish_job(job, report())
+            finished = True
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            if not finished:
+                service.finish_job(job, report())
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b'%x\r\n' % len(data))
+        self.wfile.write(data)
+        self.wfile.write(b'\r\n')
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr: Tuple[str, int], service: ConcatService):
+        super().__init__(addr, _Handler)
+        self.service = service
+
+
+def make_server(host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                service: Optional[ConcatService] = None) -> _Server:
+    """Crée le serveur (port 0 = port libre choisi par l'OS, voir server_address)."""
+    return _Server((host, port), service or ConcatService())
+
+
+def serve(host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> None:
+    with make_server(host, port) as srv:
+        srv.serve_forever()
+
+
+# ------------------------ Client ------------------------
+
+class ConcatClient:
+    """Client du serveur local."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, timeout: float = 300.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.last_job: Optional[str] = None
+
+    def _conn(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _get_json(self, path: str) -> Any:
+        conn = self._conn()
+        try:
+            conn.request('GET', path)
+            resp = conn.getresponse()
+            data = json.loads(resp.read() or b'null')
+            if resp.status != 200:
+                raise RuntimeError(data.get('error') if isinstance(data, dict) else resp.reason)
+            return data
+        finally:
+            conn.close()
+
+    def iter_concat(self, roots: List[str], opts: Options, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+        """Itère sur le texte concaténé au fur et à mesure de sa réception."""
+        body = json.dumps({'roots': list(roots), 'options': options_to_dict(opts)}).encode('utf-8')
+        conn = self._conn()
+        try:
+            conn.request('POST', '/concat', body=body, headers={'Content-Type': 'application/json'})
+            resp = conn.getresponse()
+            if resp.status != 200:
+                data = json.loads(resp.read() or b'{}')
+                raise RuntimeError(data.get('error', resp.reason))
+            self.last_job = resp.getheader('X-Concat-Job')
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            while True:
+                data = resp.read(chunk_size)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+        finally:
+            conn.close()
+
+    def concat(self, roots: List[str], opts: Options) -> Tuple[str, int, List[Tuple[str, str]]]:
+        """Retourne (texte_concaténé, nb_fichiers_écrits, skipped), comme core.concat_to_string."""
+        text = ''.join(self.iter_concat(roots, opts))
+        report = self.report()
+        return text, int(report.get('written', 0)), [tuple(x) for x in report.get('skipped', [])]
+
+    def report(self, job: Optional[str] = None) -> Dict[str, Any]:
+        job = job or self.last_job
+        if job is None:
+            return {}
+        return self._get_json(f'/jobs/{job}')
+
+    def stats(self) -> Dict[str, Any]:
+        return self._get_json('/stats')
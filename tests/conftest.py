@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Options  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def app_home(tmp_path, monkeypatch):
+    """Dossier de données isolé (profils, caches) pour chaque test."""
+    home = tmp_path / "app"
+    monkeypatch.setenv("CONCATENATOR_HOME", str(home))
+    return home
+
+
+@pytest.fixture
+def opts():
+    return Options(recursive=True, include_exts=set(), exclude_dirs=set(), ignore_binaries=True,
+                   max_mb=5.0, add_headers=True, normalize_eol=True)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Dix petits fichiers texte, src/f00.txt … src/f09.txt."""
+    src = tmp_path / "src"
+    src.mkdir()
+    paths = []
+    for i in range(10):
+        p = src / f"f{i:02d}.txt"
+        p.write_text(f"fichier {i}\n", encoding="utf-8")
+        paths.append(str(p))
+    return paths
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import dataclasses
+import os
+import zipfile
+
+import pytest
+
+import archives
+from archives import list_members
+from caches import ContentCache
+from core import ARCHIVE_MARK, render_file
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / "src.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("pkg/a.txt", "un\r\ndeux\r\n")
+        z.writestr("pkg/b.py", "x = 1\n")
+    return str(path)
+
+
+def member(archive, name):
+    return archive + ARCHIVE_MARK + name.replace("/", os.sep)
+
+
+@pytest.mark.parametrize("normalize_eol", [True, False])
+def test_member_renders_like_file_on_disk(tmp_path, opts, archive, normalize_eol):
+    o = dataclasses.replace(opts, add_headers=False, normalize_eol=normalize_eol)
+    disk = tmp_path / "a.txt"
+    disk.write_bytes(b"un\r\ndeux\r\n")
+    assert render_file(member(archive, "pkg/a.txt"), o) == render_file(str(disk), o) == ("un\ndeux\n", None)
+
+
+def test_content_cache_renders_archive_members(opts, archive):
+    cache = ContentCache()
+    paths = list_members(archive, opts)
+    assert sorted(paths) == [member(archive, "pkg/a.txt"), member(archive, "pkg/b.py")]
+    for p in paths:
+        segment, reason = cache.render(p, opts)
+        assert reason is None and segment == render_file(p, opts)[0]
+    assert cache.render(paths[0], opts) == render_file(paths[0], opts)
+    assert cache.stats()["hits"] == 1
+
+
+def test_evicted_archive_stays_open_for_its_reader(tmp_path, opts, archive):
+    others = []
+    for i in range(archives._MAX_OPEN + 1):
+        path = tmp_path / f"autre{i}.zip"
+        with zipfile.ZipFile(path, "w") as z:
+            z.writestr("x.txt", "x\n")
+        others.append(str(path))
+    archives.close_archives()
+    with archives._opened(archive) as arc:
+        for path in others:  # d'autres threads ouvrent assez d'archives pour évincer celle-ci
+            list_members(path, opts)
+        assert arc.retired
+        with arc.lock, arc.open("pkg/b.py") as f:
+            assert f.read() == b"x = 1\n"
+    assert arc._zip.fp is None  # fermée au départ de son dernier lecteur
+    assert render_file(member(archive, "pkg/b.py"), opts)[1] is None
+    archives.close_archives()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import core
+from core import concat_to_file, concat_to_string
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="chemins des descripteurs via /proc")
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """Journal des fsync (chemin du descripteur) et des renommages, dans l'ordre."""
+    log = []
+    real_fsync, real_replace = os.fsync, os.replace
+
+    def fsync(fd):
+        log.append(("fsync", os.readlink(f"/proc/self/fd/{fd}")))
+        real_fsync(fd)
+
+    def replace(src, dst):
+        log.append(("replace", str(src), str(dst)))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(core.os, "fsync", fsync)
+    monkeypatch.setattr(core.os, "replace", replace)
+    return log
+
+
+def assert_durable_rename(log, target):
+    """Un seul renommage sur `target`, précédé du fsync du temporaire et suivi de celui du dossier."""
+    renames = [i for i, e in enumerate(log) if e[0] == "replace" and e[2] == target]
+    assert len(renames) == 1
+    i = renames[0]
+    assert ("fsync", log[i][1]) in log[:i]
+    assert log[i + 1] == ("fsync", os.path.dirname(target))
+
+
+@pytest.mark.parametrize("checkpoint", [False, True])
+def test_output_is_fsynced_around_rename(tmp_path, opts, tree, events, checkpoint):
+    out = str(tmp_path / "out.txt")
+    concat_to_file(tree, opts, out, checkpoint=checkpoint)
+    assert_durable_rename(events, out)
+    with open(out, encoding="utf-8") as f:
+        assert f.read() == concat_to_string(tree, opts)[0]
+
+
+def test_checkpoint_is_fsynced_around_rename(tmp_path, opts, tree, events, monkeypatch):
+    monkeypatch.setattr(core, "CHECKPOINT_INTERVAL", 0)
+    monkeypatch.setattr(core, "_iter_indexed", lambda files, *a, **k: iter([(0, files[0], "x\n")]))
+    out = str(tmp_path / "out.txt")
+    concat_to_file(tree, opts, out, checkpoint=True)
+    assert_durable_rename(events, core.checkpoint_path(out))
+
+
+def test_unchanged_output_is_left_alone(tmp_path, opts, tree, events):
+    out = str(tmp_path / "out.txt")
+    concat_to_file(tree, opts, out)
+    events.clear()
+    concat_to_file(tree, opts, out)
+    assert not [e for e in events if e[0] == "replace"]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from dataclasses import replace
+
+import batch
+from batch import SharedRenderer
+from core import render_file
+
+
+def test_shared_renderer_reads_each_file_once(opts, tree):
+    other = replace(opts, add_headers=False)
+    shared = SharedRenderer([(tree, opts), (tree, opts), (tree, other)])
+    for o in (opts, opts, other):
+        render = shared.renderer(o)
+        for f in tree:
+            assert render(f, o) == render_file(f, o)
+    assert (shared.reads, shared.renders, shared.evictions) == (10, 20, 0)
+    assert shared.buffered == 0
+
+
+def test_lagging_profile_does_not_grow_the_buffer(opts, tree):
+    # Un profil passe en entier avant l'autre : sans borne, les dix segments
+    # resteraient en mémoire en attendant le second.
+    shared = SharedRenderer([(tree, opts), (tree, opts)], max_buffer=300)
+    ahead, late = shared.renderer(opts), shared.renderer(opts)
+    peak = 0
+    for f in tree:
+        ahead(f, opts)
+        peak = max(peak, shared.buffered)
+    assert peak <= 300 and shared.evictions > 0
+    for f in tree:
+        assert late(f, opts) == render_file(f, opts)
+    assert shared.renders > 10
+    assert shared.buffered == 0
+
+
+def test_render_failure_reaches_every_waiting_profile(monkeypatch, opts, tree):
+    started, release = threading.Event(), threading.Event()
+
+    def failing(fpath, o, classify=None, data=None):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("lecture impossible")
+
+    monkeypatch.setattr(batch, "render_file", failing)
+    shared = SharedRenderer([(tree[:1], opts), (tree[:1], opts)])
+    errors = []
+
+    def run():
+        try:
+            shared.renderer(opts)(tree[0], opts)
+        except Exception as e:
+            errors.append(e)
+
+    owner = threading.Thread(target=run)
+    owner.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=run)
+    waiter.start()
+    time.sleep(0.05)  # le second profil attend le rendu en cours
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+    assert [str(e) for e in errors] == ["lecture impossible"] * 2
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert shared.buffered == 0 and not shared._entries
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import dataclasses
+import os
+
+import pytest
+
+import core
+
+
+class Interrupt(Exception):
+    pass
+
+
+@pytest.mark.parametrize("order", ["path", "inode"])
+def test_resume_after_interrupt_keeps_every_file(tmp_path, monkeypatch, opts, tree, order):
+    o = dataclasses.replace(opts, read_order=order)
+    expected, _, _ = core.concat_to_string(tree, o)
+    out = str(tmp_path / "out.txt")
+
+    # Un point de reprise après chaque segment ; interruption après le troisième.
+    monkeypatch.setattr(core, "CHECKPOINT_INTERVAL", 0.0)
+    real_save = core._save_checkpoint
+    saves = []
+
+    def save(path, ck):
+        real_save(path, ck)
+        saves.append(ck['index'])
+        if len(saves) == 3:
+            raise Interrupt()
+
+    monkeypatch.setattr(core, "_save_checkpoint", save)
+    with pytest.raises(Interrupt):
+        core.concat_to_file(tree, o, out, checkpoint=True)
+    assert core.load_checkpoint(out, tree, o)['index'] == 3
+
+    monkeypatch.setattr(core, "_save_checkpoint", real_save)
+    written, skipped = core.concat_to_file(tree, o, out, checkpoint=True, resume=True)
+    assert (written, skipped) == (10, [])
+    with open(out, encoding="utf-8") as f:
+        assert f.read() == expected
+    assert not os.path.exists(core.checkpoint_path(out))
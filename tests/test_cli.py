@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import cli
+
+
+@pytest.mark.parametrize("argv, message", [
+    (["--resume", "-o", "-"], "--resume nécessite"),
+    (["--resume", "-o", "out.txt.gz"], "--resume nécessite"),
+    (["--resume", "-o", "out.txt", "--route", ".py=py.txt"], "--resume ne se combine pas"),
+    (["--delta", "-o", "out.txt", "--route", ".py=py.txt"], "--delta ne se combine pas"),
+    (["--diff", "-o", "out.txt", "--split-by-ext"], "--delta ne se combine pas"),
+    (["--delta", "-o", "out.txt.gz"], "--delta nécessite"),
+    (["--watch", "-o", "-"], "--watch nécessite"),
+    (["--watch", "-o", "out.txt.gz"], "--watch nécessite"),
+    (["--watch", "-o", "out.txt", "--route", ".py=py.txt"], "--watch ne se combine pas avec --route"),
+    (["--watch", "-o", "out.txt", "--diff", "--git"], "--watch ne se combine pas avec --delta, --git"),
+    (["--watch", "-o", "out.txt", "-n", "-j", "4"], "avec --dry-run, -j"),
+])
+def test_rejected_combinations(tmp_path, capsys, argv, message):
+    with pytest.raises(SystemExit) as exc:
+        cli.main([str(tmp_path)] + argv)
+    assert exc.value.code == 2
+    assert message in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_resume_with_plain_file_reaches_checkpoint(tmp_path, tree):
+    out = tmp_path / "out.txt"
+    with pytest.raises(SystemExit, match="aucun point de reprise"):
+        cli.main([str(tmp_path / "src"), "-o", str(out), "--exts", ".txt", "--resume", "--no-cache"])
+    assert cli.main([str(tmp_path / "src"), "-o", str(out), "--exts", ".txt", "--no-cache"]) == 0
+    assert out.read_text(encoding="utf-8").count("fichier ") == 10
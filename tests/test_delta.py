@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import dataclasses
+import json
+import os
+
+from delta import ADDED, DELETED, MODIFIED, concat_delta, delta_block
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_added_modified_deleted(tmp_path, opts, tree):
+    out = str(tmp_path / "delta.txt")
+    first = concat_delta(tree, opts, out, diff=True)
+    assert first.baseline and len(first.added) == 10
+
+    with open(tree[1], "a", encoding="utf-8") as f:
+        f.write("suite\n")
+    os.remove(tree[2])
+    res = concat_delta([p for p in tree if p != tree[2]], opts, out, diff=True)
+    assert (res.added, res.modified, res.deleted, res.unchanged) == ([], [tree[1]], [tree[2]], 8)
+    text = read(out)
+    assert "+suite" in text and tree[2] in text
+
+    again = concat_delta([p for p in tree if p != tree[2]], opts, out)
+    assert (again.added, again.modified, again.deleted, again.unchanged) == ([], [], [], 9)
+
+
+def test_skipped_or_unselected_files_are_not_deleted(tmp_path, opts, tree):
+    out = str(tmp_path / "delta.txt")
+    concat_delta(tree, opts, out)
+
+    with open(tree[0], "wb") as f:
+        f.write(b"\x00\x01binaire")  # ignoré (binaire) cette fois
+    res = concat_delta(tree[:9], opts, out)  # tree[9] décoché
+    assert res.deleted == [] and res.retained == [tree[9]]
+    assert [p for p, _ in res.skipped] == [tree[0]]
+    assert read(out) == ""
+
+    with open(tree[0], "w", encoding="utf-8") as f:
+        f.write("fichier 0\n")  # contenu d'origine : inchangé par rapport au manifeste
+    res = concat_delta(tree, opts, out)
+    assert (res.added, res.modified, res.deleted) == ([], [], [])
+
+
+def test_structured_blocks_use_core_formatting(opts):
+    body = "avant\n```py\nx\n```\nsep\u2028ligne\n"
+    md = delta_block("/src/a.md", MODIFIED, body, dataclasses.replace(opts, output_format="markdown"))
+    assert "\n````markdown\n" in md and md.endswith("````\n\n")
+
+    line = delta_block("/src/a.md", ADDED, body, dataclasses.replace(opts, output_format="jsonl"))
+    assert line.count("\n") == 1 and "\\u2028" in line
+    assert json.loads(line) == {"path": "/src/a.md", "status": ADDED, "content": body}
+    assert json.loads(delta_block("/src/a.md", DELETED, "", dataclasses.replace(opts, output_format="jsonl"))) \
+        == {"path": "/src/a.md", "status": DELETED}
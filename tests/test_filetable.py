@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import os
+
+from filetable import FileTable
+
+
+def _table(root):
+    t = FileTable()
+    t.add_listing(os.path.join(root, "a"), ["x.py", "y.py", "z.py"])
+    t.add_listing(os.path.join(root, "b"), ["x.py", "é.txt"])
+    return t
+
+
+def test_listing_and_loose_paths(tmp_path):
+    root = str(tmp_path)
+    t = _table(root)
+    a, b = os.path.join(root, "a"), os.path.join(root, "b")
+    assert not t.add_listing(a, ["w.py"])  # dossier déjà listé
+    assert t.append(os.path.join(root, "seul.md"))
+    assert not t.append(os.path.join(a, "y.py"))
+    assert list(t) == [os.path.join(a, "x.py"), os.path.join(a, "y.py"), os.path.join(a, "z.py"),
+                       os.path.join(b, "x.py"), os.path.join(b, "é.txt"), os.path.join(root, "seul.md")]
+    assert t[-1] == os.path.join(root, "seul.md") and t[4] == os.path.join(b, "é.txt")
+    assert os.path.join(b, "é.txt") in t and os.path.join(b, "y.py") not in t
+    assert os.path.join(root, "c", "x.py") not in t and 42 not in t
+
+
+def test_loose_path_is_not_listed_twice(tmp_path):
+    root = str(tmp_path)
+    t = FileTable()
+    t.append(os.path.join(root, "a", "y.py"))
+    t.add_listing(os.path.join(root, "a"), ["x.py", "y.py"])
+    assert list(t) == [os.path.join(root, "a", "y.py"), os.path.join(root, "a", "x.py")]
+
+
+def test_selection_keeps_membership(tmp_path):
+    root = str(tmp_path)
+    t = _table(root)
+    t.append(os.path.join(root, "seul.md"))
+    paths = list(t)
+
+    kept = t.without({paths[1], paths[4], os.path.join(root, "absent.py")})
+    assert list(kept) == [paths[0], paths[2], paths[3], paths[5]]
+    assert all(p in kept for p in kept) and paths[1] not in kept and paths[4] not in kept
+    assert t.without({os.path.join(root, "absent.py")}) is t
+
+    rev = t.take(reversed(range(len(t))))
+    assert list(rev) == paths[::-1] and all(p in rev for p in paths)
+    assert list(t[1:4]) == paths[1:4] and paths[0] not in t[1:4]
+    assert list(t.select(lambda p: p.endswith(".py"))) == paths[:4]
+
+
+def test_growing_span_refreshes_the_name_index(tmp_path):
+    root = str(tmp_path)
+    t = _table(root)
+    a = os.path.join(root, "a")
+    out = t.take([0])
+    assert os.path.join(a, "x.py") in out and os.path.join(a, "y.py") not in out
+    out._copy_rows(t, 1, 3)
+    assert [os.path.join(a, n) in out for n in ("x.py", "y.py", "z.py")] == [True, True, True]
+
+
+def test_stat_is_read_once(tmp_path):
+    f = tmp_path / "f.txt"
+    f.write_bytes(b"abc")
+    t = FileTable()
+    t.add_listing(str(tmp_path), ["f.txt", "absent.txt"])
+    assert t.sizes[0] == -1 and t.stat(0)[0] == 3
+    f.write_bytes(b"abcdef")
+    assert t.stat(0)[0] == 3 and t.stat(1) is None
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+import profiles
+from batch import prepare_jobs
+from models import Profile, ProfileItem
+
+
+def test_round_trip(tmp_path):
+    prof = Profile(name="p", items=[ProfileItem(path=str(tmp_path), kind='dir', unchecked=[str(tmp_path / "x")]),
+                                    ProfileItem(path=str(tmp_path / "f.py"), checked=False)],
+                   max_mb=2.5, transforms=['tabs'], head_kb=8)
+    profiles.save_profile(prof)
+    assert profiles.load_profile("p") == prof
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"version": "1"},
+    {"items": {"path": "/tmp"}},
+    {"items": ["/tmp"]},
+    {"items": [{"path": "/tmp", "checked": "non"}]},
+    {"items": [{"path": "/tmp", "unchecked": "/tmp/x"}]},
+    {"items": [{"path": 3}]},
+    {"recursive": "true"},
+    {"max_mb": "5"},
+    {"head_kb": 1.5},
+    {"transforms": "tabs"},
+    {"exts": None},
+])
+def test_wrong_field_types_raise_value_error(data):
+    with pytest.raises(ValueError):
+        profiles.profile_from_dict(data, name="p")
+
+
+def test_items_without_path_are_dropped():
+    prof = profiles.profile_from_dict({"items": [{"path": ""}, {"path": "/tmp", "kind": "dir"}], "max_mb": 3}, name="p")
+    assert prof.items == [ProfileItem(path="/tmp", kind='dir')] and prof.max_mb == 3
+
+
+def test_hand_edited_profile_is_reported_by_batch():
+    profiles.profiles_dir().mkdir(parents=True)
+    profiles._profile_file("cassé").write_text(json.dumps({"items": "/tmp"}), encoding="utf-8")
+    results, jobs = prepare_jobs(["cassé"])
+    assert jobs == [] and results[0].error.startswith("profil illisible")
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import time
+
+from scancache import VerdictCache, _open_db, _SCHEMA_VERSION
+
+PAST_NS = time.time_ns() - 3600 * 10**9
+
+
+def make(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.utime(path, ns=(PAST_NS, PAST_NS))  # hors de la fenêtre « racy » : mis en cache
+
+
+def test_renamed_file_is_reclassified_from_cached_content(tmp_path):
+    cache = VerdictCache(str(tmp_path / "cache.sqlite"))
+    src = tmp_path / "app.js"
+    make(src, "function f() { return 1; }\n")
+    assert cache.kind(str(src)) == "text"
+    cache.flush()
+
+    for name, expected in (("app.min.js", "minified"), ("package-lock.json", "lockfile"),
+                           ("app.png", "binary"), ("app2.js", "text")):
+        dst = tmp_path / name
+        os.rename(src, dst)
+        assert cache.kind(str(dst)) == expected, name
+        src = dst
+    assert cache.stats()["misses"] == 1  # contenu lu une seule fois
+
+
+def test_content_kind_survives_reopen(tmp_path):
+    db = str(tmp_path / "cache.sqlite")
+    path = tmp_path / "big.js"
+    make(path, "x" * 5000)
+    cache = VerdictCache(db)
+    assert cache.kind(str(path)) == "minified"
+    cache.close()
+    again = VerdictCache(db)
+    assert again.kind(str(path)) == "minified"
+    assert again.stats()["hits"] == 1
+
+
+def test_schema_migration_runs_once(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite")
+    old = sqlite3.connect(db_path)
+    old.executescript("CREATE TABLE verdicts (dev INTEGER, ino INTEGER, binary INTEGER);"
+                      "CREATE TABLE kinds (dev INTEGER, ino INTEGER, kind TEXT);"
+                      "INSERT INTO kinds VALUES (1, 2, 'lockfile');")
+    old.close()
+
+    db = _open_db(db_path)
+    tables = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "verdicts" not in tables and {"listings", "kinds"} <= tables
+    assert db.execute("SELECT COUNT(*) FROM kinds").fetchone()[0] == 0
+    assert db.execute("PRAGMA user_version").fetchone()[0] == _SCHEMA_VERSION
+    db.execute("INSERT INTO kinds VALUES (1, 2, 0, 0, 'text', 0)")
+    db.commit()
+    db.close()
+
+    db = _open_db(db_path)
+    assert db.execute("SELECT COUNT(*) FROM kinds").fetchone()[0] == 1
+    db.close()
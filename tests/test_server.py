@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import http.client
+import json
+import os
+import threading
+
+import pytest
+
+from core import concat_to_string, gather_candidate_files
+from server import ConcatClient, make_server, options_to_dict
+
+
+@pytest.fixture
+def server():
+    srv = make_server(port=0)
+    thread = threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def post(srv, body, **headers):
+    headers.setdefault('Content-Type', 'application/json')
+    conn = http.client.HTTPConnection(*srv.server_address, timeout=10)
+    try:
+        conn.request('POST', '/concat', body=body, headers=headers)
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def test_concat_round_trip(server, opts, tree):
+    root = os.path.dirname(tree[0])
+    text, written, skipped = ConcatClient(*server.server_address).concat([root], opts)
+    assert (written, skipped) == (10, [])
+    assert text == concat_to_string(gather_candidate_files([root], opts), opts)[0]
+
+
+@pytest.mark.parametrize("body", [
+    b'[]',
+    b'"roots"',
+    b'{"roots": "/tmp"}',
+    b'{"roots": [], "options": []}',
+])
+def test_malformed_payload_is_rejected(server, body):
+    status, data = post(server, body)
+    assert status == 400
+    assert 'error' in json.loads(data)
+
+
+@pytest.mark.parametrize("field, value", [
+    ("max_mb", "5"), ("recursive", 1), ("head_kb", -1), ("include_exts", ".py"),
+    ("transforms", [1]), ("output_format", "html"), ("read_order", "random"),
+])
+def test_bad_option_values_are_rejected_before_streaming(server, opts, tree, field, value):
+    options = options_to_dict(opts)
+    options[field] = value
+    status, data = post(server, json.dumps({'roots': [os.path.dirname(tree[0])], 'options': options}))
+    assert status == 400, data
+    assert field in json.loads(data)['error'] or repr(value) in json.loads(data)['error']
+
+
+@pytest.mark.parametrize("host", ["evil.example:{port}", "127.0.0.1:1", "localhost"])
+def test_foreign_host_is_rejected(server, opts, tree, host):
+    body = json.dumps({'roots': [os.path.dirname(tree[0])], 'options': options_to_dict(opts)})
+    status, data = post(server, body, Host=host.format(port=server.server_address[1]))
+    assert status == 403, data
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        conn.request('GET', '/stats', headers={'Host': 'evil.example'})
+        assert conn.getresponse().status == 403
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("ctype", ["text/plain", "application/x-www-form-urlencoded", "multipart/form-data"])
+def test_non_json_content_type_is_rejected(server, opts, tree, ctype):
+    body = json.dumps({'roots': [os.path.dirname(tree[0])], 'options': options_to_dict(opts)})
+    status, data = post(server, body, **{'Content-Type': ctype})
+    assert status == 415, data
+    assert post(server, body, **{'Content-Type': 'application/json; charset=utf-8'})[0] == 200
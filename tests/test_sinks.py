@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from core import Sink, StringSink, concat_to_sinks, concat_to_string, render_file
+
+
+def test_sink_is_abstract():
+    with pytest.raises(TypeError):
+        Sink()
+
+    class Incomplete(Sink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_routed_sinks_share_one_pass(opts, tree):
+    everything = StringSink()
+    evens = StringSink(route=lambda f: int(f[-6:-4]) % 2 == 0)
+    calls = []
+
+    def render(fpath, o):
+        calls.append(fpath)
+        return render_file(fpath, o)
+
+    written, skipped = concat_to_sinks(tree, opts, [everything, evens], render=render)
+    assert (written, skipped, len(calls)) == (10, [], 10)
+    assert everything.text() == concat_to_string(tree, opts)[0]
+    assert evens.text() == concat_to_string(tree[::2], opts)[0]
+    assert (everything.count, evens.count) == (10, 5)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import dataclasses
+
+import pytest
+
+from core import apply_transforms
+
+
+@pytest.fixture
+def strip(opts):
+    o = dataclasses.replace(opts, transforms=('license',))
+    return lambda text: apply_transforms(text, o)
+
+
+def test_license_block_keeps_code_after_closing_marker(strip):
+    assert strip("/* Copyright */ int x;\ncode\n") == "int x;\ncode\n"
+    assert strip("/*\n * Copyright 2024\n */ int x;\ncode\n") == "int x;\ncode\n"
+    assert strip("<!-- License: MIT --> <p>a</p>\n") == "<p>a</p>\n"
+
+
+def test_license_block_removed_with_following_blank_lines(strip):
+    assert strip("/*\n * SPDX-License-Identifier: MIT\n */\n\nint x;\n") == "int x;\n"
+    assert strip("#!/bin/sh\n# Copyright (c) X\n# licence MIT\n\necho\n") == "#!/bin/sh\necho\n"
+
+
+def test_html_comment_closing_marker_not_found_in_opener(strip):
+    # « <!-->» : le '-->' chevauche l'ouverture, le commentaire n'est pas fermé sur cette ligne
+    text = "<!-->Copyright\nstill comment -->\nbody\n"
+    assert strip(text) == "body\n"
+
+
+def test_non_license_comment_is_kept(strip):
+    text = "/* helper */ int x;\ncode\n"
+    assert strip(text) == text
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from core import concat_to_string, render_file
+from watch import Watcher, watch
+
+
+def test_rebuild_matches_concat_and_rereads_only_changes(tmp_path, opts, tree):
+    out = str(tmp_path / "out.txt")
+    w = Watcher([os.path.dirname(tree[0])], opts, out)
+    w.scan()
+    assert w.rebuild()[2] == 10
+    with open(tree[4], "a", encoding="utf-8") as f:
+        f.write("modifié\n")
+    assert w.scan() == {tree[4]}
+    written, skipped, rendered = w.rebuild()
+    assert (written, skipped, rendered) == (10, [], 1)
+    with open(out, encoding="utf-8") as f:
+        assert f.read() == concat_to_string(w._files, opts)[0]
+    assert sorted(os.listdir(tmp_path)) == ["out.txt", "src"]
+
+
+def test_watchers_on_same_output_use_distinct_temp_files(tmp_path, opts, tree):
+    out = str(tmp_path / "out.txt")
+    a = Watcher([os.path.dirname(tree[0])], opts, out)
+    b = Watcher([os.path.dirname(tree[0])], opts, out)
+    assert a._tmp_path != b._tmp_path
+    assert os.path.dirname(a._tmp_path) == str(tmp_path)
+
+
+def test_stop_aborts_the_initial_rebuild(tmp_path, opts, tree):
+    out = tmp_path / "out.txt"
+    stop = threading.Event()
+    calls = []
+
+    def render(fpath, o):
+        calls.append(fpath)
+        stop.set()  # arrêt demandé pendant la première régénération
+        return render_file(fpath, o)
+
+    watch([os.path.dirname(tree[0])], opts, str(out), stop=stop, render=render, interval=60)
+    assert len(calls) == 1
+    assert sorted(os.listdir(tmp_path)) == ["src"]
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Traces de performance au format « Chrome trace event » (chrome://tracing,
+https://ui.perfetto.dev).
+
+Activation : variable d'environnement CONCATENATOR_TRACE (chemin du fichier
+.json à écrire à la sortie, ou "1" pour un fichier horodaté dans le dossier de
+données), ou depuis l'interface (menu contextuel des logs).
+
+Désactivé, span() renvoie un gestionnaire de contexte partagé sans effet et
+@traced ne fait qu'un test de booléen avant d'appeler la fonction.
+"""
+from __future__ import annotations
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+ENV_VAR = 'CONCATENATOR_TRACE'
+MAX_EVENTS = 1_000_000
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+_enabled = False
+_path: Optional[str] = None
+_events: List[Dict[str, Any]] = []
+_threads: Dict[int, str] = {}
+_dropped = 0
+_lock = threading.Lock()
+_pid = os.getpid()
+_t0 = time.perf_counter_ns()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter_ns()
+        _record(self.name, self.start, end, self.args)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _record(name: str, start: int, end: int, args: Dict[str, Any]) -> None:
+    global _dropped
+    tid = threading.get_ident()
+    ev = {'name': name, 'ph': 'X', 'pid': _pid, 'tid': tid,
+          'ts': (start - _t0) / 1000, 'dur': (end - start) / 1000}
+    if args:
+        ev['args'] = args
+    with _lock:
+        if not _enabled:
+            return
+        if len(_events) >= MAX_EVENTS:
+            _dropped += 1
+            return
+        _events.append(ev)
+        if tid not in _threads:
+            _threads[tid] = threading.current_thread().name
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, **args: Any):
+    """Gestionnaire de contexte qui enregistre la durée du bloc (sans effet si désactivé)."""
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, args)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """Décorateur : chaque appel de la fonction devient un span (nom par défaut : qualname)."""
+    def deco(fn: F) -> F:
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*a, **k):
+            if not _enabled:
+                return fn(*a, **k)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*a, **k)
+            finally:
+                _record(label, start, time.perf_counter_ns(), {})
+        return wrapper  # type: ignore[return-value]
+    return deco
+
+
+def default_trace_path() -> str:
+    from core import app_data_dir
+    d = app_data_dir() / 'traces'
+    return str(d / time.strftime('trace-%Y%m%d-%H%M%S.json'))
+
+
+def start(path: Optional[str] = None) -> None:
+    """Commence l'enregistrement (les événements précédents sont oubliés)."""
+    global _enabled, _path, _dropped
+    with _lock:
+        _events.clear()
+        _threads.clear()
+        _dropped = 0
+        _path = path
+        _enabled = True
+
+
+def stop() -> Optional[str]:
+    """Arrête l'enregistrement et écrit la trace. Retourne le chemin écrit, ou None."""
+    global _enabled
+    with _lock:
+        if not _enabled:
+            return None
+        _enabled = False
+        events = list(_events)
+        threads = dict(_threads)
+        dropped = _dropped
+        _events.clear()
+        _threads.clear()
+    path = _path or default_trace_path()
+    meta = [{'name': 'thread_name', 'ph': 'M', 'pid': _pid, 'tid': tid, 'args': {'name': n}}
+            for tid, n in threads.items()]
+    data: Dict[str, Any] = {'traceEvents': meta + events, 'displayTimeUnit': 'ms'}
+    if dropped:
+        data['otherData'] = {'dropped_events': dropped}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return path
+
+
+def _start_from_env() -> None:
+    value = os.environ.get(ENV_VAR, '').strip()
+    if not value or value == '0':
+        return
+    start(None if value == '1' else value)
+    atexit.register(stop)
+
+
+_start_from_env()
@@ -2,30 +2,41 @@
 from __future__ import annotations
 import os
 import pathlib
-from typing import Iterable, List, Optional, cast
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, cast
 import sys
 import datetime
+import time
+import threading
 
-from PySide6.QtSvg import QSvgRenderer
-from PySide6.QtGui import QPainter, QColor, QPalette, QDesktopServices, QIcon, QPixmap, QFont
-from PySide6.QtCore import Qt, QMimeData, QSize, QSettings, QUrl, QByteArray, QTimer
+from PySide6.QtGui import QPainter, QColor, QPalette, QDesktopServices, QIcon, QPixmap, QFont, QBrush, QFontDatabase
+from PySide6.QtCore import Qt, QMimeData, QSize, QSettings, QUrl, QByteArray, QTimer, QObject, Signal
 from PySide6.QtWidgets import (
-    QApplication,QDockWidget, QTextEdit,
+    QApplication,QDockWidget, QTextEdit, QPlainTextEdit,
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QTreeWidget, QTreeWidgetItem,
     QPushButton, QFileDialog, QLineEdit,
-    QCheckBox, QDoubleSpinBox, QLabel, QProgressBar, QGroupBox,
-    QSplitter, QComboBox, QInputDialog, QAbstractItemView, QHeaderView, QToolButton
+    QCheckBox, QDoubleSpinBox, QSpinBox, QLabel, QProgressBar, QGroupBox,
+    QSplitter, QComboBox, QInputDialog, QAbstractItemView, QHeaderView, QToolButton, QMenu
 )
 
-from models import Options
+from models import Options, Profile, ProfileItem
 from core import (
     unique_paths, parse_csv_list, normalize_exts, human_size,
-    gather_candidate_files, concat_to_file, concat_to_string
+    gather_candidate_files, concat_to_file, concat_to_string, concat_to_sinks, ext_sinks,
+    ResumeError, checkpoint_path, load_checkpoint,
+    FileSink, Sink, StringSink, OUTPUT_FORMATS, TRANSFORMS, format_for_path,
+    estimate_files, format_estimate
 )
+import profiles
+from filetable import FileTable
+from preview import PreviewPanel
+from pathindex import PathIndex
+import tracing
+from tracing import traced
 
 ROLE_META = int(Qt.ItemDataRole.UserRole)
 ROLE_HOOKED = ROLE_META + 1
+ROLE_INDEX = ROLE_META + 2   # identifiant dans l'index de recherche (DropTreeWidget)
 
 
 class ConcatCancelled(Exception):
@@ -34,11 +45,18 @@ class ConcatCancelled(Exception):
 
 
 # ----- Icônes (SVG recolorés selon la palette) -----
+_ICONS_DIR: Optional[pathlib.Path] = None
+_icon_cache: Dict[Tuple[str, int, int, int], QIcon] = {}
+
 def _icons_dir() -> pathlib.Path:
-    base = pathlib.Path(getattr(sys, "_MEIPASS", pathlib.Path(__file__).resolve().parent))
-    return base / "icons"
+    global _ICONS_DIR
+    if _ICONS_DIR is None:
+        base = pathlib.Path(getattr(sys, "_MEIPASS", pathlib.Path(__file__).resolve().parent))
+        _ICONS_DIR = base / "icons"
+    return _ICONS_DIR
 
 def _render_svg_to_icon(svg_path: pathlib.Path, size: QSize, color: QColor) -> QIcon:
+    from PySide6.QtSvg import QSvgRenderer  # importé au premier rendu, pas au démarrage
     if not svg_path.exists():
         return QIcon()
     try:
@@ -62,8 +80,8 @@ def _render_svg_to_icon(svg_path: pathlib.Path, size: QSize, color: QColor) -> Q
         painter.end()
     return QIcon(pm)
 
+@traced()
 def ico(name: str, size: QSize = QSize(20, 20), color: QColor | None = None) -> QIcon:
-    p = _icons_dir() / name
     if color is None:
         pal = QApplication.palette()
         color = pal.color(QPalette.ColorRole.ButtonText)
@@ -71,7 +89,12 @@ def ico(name: str, size: QSize = QSize(20, 20), color: QColor | None = None) ->
             color = pal.color(QPalette.ColorRole.WindowText)
         if not color.isValid():
             color = QColor("#000000")
-    return _render_svg_to_icon(p, size, color)
+    # Mémorisé : le même SVG (ex. bouton « retirer » de chaque ligne) n'est rendu qu'une fois
+    key = (name, size.width(), size.height(), color.rgba())
+    icon = _icon_cache.get(key)
+    if icon is None:
+        icon = _icon_cache[key] = _render_svg_to_icon(_icons_dir() / name, size, color)
+    return icon
 
 
 # ----- Helpers d’éléments (chemin plein + rendu nom en gras) -----
@@ -97,6 +120,37 @@ def get_item_fullpath(item: QTreeWidgetItem) -> str:
         return cast(str, meta['fullpath'])
     return item.text(0)
 
+# ----- Vérification des chemins hors du thread UI -----
+class _PathProbe(QObject):
+    """Vérifie l'existence et le type des chemins d'un profil en arrière-plan."""
+    done = Signal(int, object)  # (génération, {chemin: 'dir' | 'file' | 'missing'})
+
+    def start(self, generation: int, paths: List[str]):
+        def run():
+            from archives import is_archive
+            res: dict[str, str] = {}
+            for p in paths:
+                if os.path.isdir(p) or is_archive(p):
+                    res[p] = 'dir'
+                elif os.path.exists(p):
+                    res[p] = 'file'
+                else:
+                    res[p] = 'missing'
+            self.done.emit(generation, res)
+        threading.Thread(target=run, daemon=True).start()
+
+
+class _WatchBridge(QObject):
+    """Relaye vers le thread UI les événements du mode surveillance."""
+    updated = Signal(int, object, int)  # (écrits, skipped, relus)
+    failed = Signal(str)
+
+
+class _EstimateBridge(QObject):
+    """Relaye vers le thread UI le résultat d'une estimation."""
+    done = Signal(int, object)  # (génération, Estimate | str d'erreur)
+
+
 # ----- Liste avec DnD + colonne bouton supprimer -----
 class DropTreeWidget(QTreeWidget):
     def __init__(self, parent=None, get_files_cb=None, mark_dirty_cb=None):
@@ -120,6 +174,14 @@ class DropTreeWidget(QTreeWidget):
         self.setAllColumnsShowFocus(True)
         self.setIndentation(10)
         self.setIconSize(QSize(16,16))
+        # Une feuille de style pour tous les boutons « retirer » (pas une par ligne)
+        self.setStyleSheet("QToolButton#rowRemove{padding:0;margin:0;border:0;}")
+        self._remove_icon: Optional[QIcon] = None
+        # Index de recherche des éléments, alimenté au fil du peuplement de l'arbre
+        self._index = PathIndex()
+        self._index_stale = False
+        self._filter_text = ""
+        self._filter_matches: List[QTreeWidgetItem] = []
 
     def dragEnterEvent(self, e):
         if e.mimeData().hasUrls():
@@ -147,6 +209,7 @@ class DropTreeWidget(QTreeWidget):
             super().dropEvent(e)
 
     def add_paths(self, paths: Iterable[str]):
+        from archives import is_archive
         existing: set[str] = set()
         for i in range(self.topLevelItemCount()):
             it = self.topLevelItem(i)
@@ -156,7 +219,8 @@ class DropTreeWidget(QTreeWidget):
             if p in existing:
                 continue
             it = QTreeWidgetItem([""])
-            if os.path.isdir(p):
+            if os.path.isdir(p) or is_archive(p):
+                # Les archives se déplient comme des dossiers (membres lus sans extraction)
                 set_item_path_display(it, p, 'dir', populated=False)
                 it.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
             else:
@@ -165,9 +229,112 @@ class DropTreeWidget(QTreeWidget):
             it.setCheckState(0, Qt.CheckState.Checked)
             self.addTopLevelItem(it)
             self._attach_remove_button(it)
+            self._index_add(it, p)
+        if self._filter_text:
+            self.apply_filter(self._filter_text)
         if self.mark_dirty_cb:
             self.mark_dirty_cb()
 
+    # ----- Filtre / index -----
+    @staticmethod
+    def _index_key(fullpath: str, root: str) -> str:
+        # Chemin relatif au parent de la racine : le nom de la racine reste cherchable
+        base = os.path.dirname(root.rstrip(os.sep))
+        return fullpath[len(base):].lstrip(os.sep) if fullpath.startswith(base) else fullpath
+
+    def _index_add(self, item: QTreeWidgetItem, root: str):
+        if not self._index_stale:
+            item.setData(0, ROLE_INDEX, self._index.add(self._index_key(get_item_fullpath(item), root)))
+
+    def invalidate_index(self):
+        """Des éléments ont été retirés : l'index sera reconstruit à la prochaine recherche."""
+        self._index_stale = True
+
+    def _rebuild_index(self):
+        self._index.clear()
+        self._index_stale = False
+        for i in range(self.topLevelItemCount()):
+            it = self.topLevelItem(i)
+            if it is None:
+                continue
+            root = get_item_fullpath(it)
+            self._index_add(it, root)
+            for j in range(it.childCount()):
+                ch = it.child(j)
+                if ch is not None:
+                    self._index_add(ch, root)
+
+    def clear(self):
+        super().clear()
+        self._index.clear()
+        self._index_stale = True  # les éléments peuvent être ajoutés directement (chargement de profil)
+        self._filter_matches = []
+
+    def apply_filter(self, text: str) -> int:
+        """
+        Masque les éléments qui ne correspondent pas au filtre (sous-chaîne, plusieurs
+        termes séparés par des espaces, sinon approximatif). Retourne le nombre de
+        fichiers correspondants. Un dossier reste visible si lui ou un enfant correspond.
+        """
+        self._filter_text = text.strip()
+        if self._index_stale:
+            self._rebuild_index()
+        if not self._filter_text:
+            shown = None
+        else:
+            shown = self._index.search(self._filter_text)
+        self.setUpdatesEnabled(False)
+        try:
+            matches: List[QTreeWidgetItem] = []
+
+            def visible(it: QTreeWidgetItem) -> bool:
+                return shown is None or it.data(0, ROLE_INDEX) in shown
+
+            for i in range(self.topLevelItemCount()):
+                top = self.topLevelItem(i)
+                if top is None:
+                    continue
+                any_child = False
+                for j in range(top.childCount()):
+                    ch = top.child(j)
+                    if ch is None:
+                        continue
+                    vis = visible(ch)
+                    if ch.isHidden() == vis:
+                        ch.setHidden(not vis)
+                    if vis:
+                        any_child = True
+                        matches.append(ch)
+                top_vis = visible(top) or any_child
+                if top.isHidden() == top_vis:
+                    top.setHidden(not top_vis)
+                if top_vis and top.childCount() == 0:
+                    matches.append(top)
+                elif shown is not None and any_child and not top.isExpanded():
+                    top.setExpanded(True)
+        finally:
+            self.setUpdatesEnabled(True)
+        self._filter_matches = matches if shown is not None else []
+        return len(matches)
+
+    def set_matches_checked(self, checked: bool) -> int:
+        """Coche / décoche tous les fichiers correspondant au filtre courant."""
+        state = Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked
+        n = 0
+        self.blockSignals(True)
+        try:
+            for it in self._filter_matches:
+                if it.checkState(0) != state:
+                    it.setCheckState(0, state)
+                    n += 1
+        finally:
+            self.blockSignals(False)
+        if n:
+            self.viewport().update()
+            if self.mark_dirty_cb:
+                self.mark_dirty_cb()
+        return n
+
     def selected_paths(self) -> List[str]:
         return [get_item_fullpath(i) for i in self.selectedItems() if not i.parent()]
 
@@ -220,17 +387,23 @@ class DropTreeWidget(QTreeWidget):
             it = self.topLevelItem(i)
             if it is None:
                 continue
+            meta = it.data(0, ROLE_META) or {}
+            if isinstance(meta, dict) and meta.get('unchecked') and not meta.get('populated'):
+                # Des enfants décochés attendent d'être appliqués : on peuple d'abord
+                self._maybe_populate_children(it)
             _, paths = collect(it)
             out.extend(paths)
         return out
 
     def _attach_remove_button(self, item: QTreeWidgetItem):
         btn = QToolButton()
+        btn.setObjectName("rowRemove")
         btn.setAutoRaise(True)
-        btn.setIcon(ico("delete.svg"))
+        if self._remove_icon is None:
+            self._remove_icon = ico("delete.svg")
+        btn.setIcon(self._remove_icon)
         btn.setIconSize(QSize(16, 16))
         btn.setToolTip("Retirer cet élément de la liste")
-        btn.setStyleSheet("QToolButton{padding:0;margin:0;border:0;}")
         btn.clicked.connect(lambda _=False, it=item: self._remove_item(it))
         self.setItemWidget(item, 1, btn)
         self._ensure_delete_col_width_for(btn)
@@ -257,6 +430,7 @@ class DropTreeWidget(QTreeWidget):
         self.setColumnWidth(1, maxw)
 
     def _remove_item(self, item: QTreeWidgetItem):
+        self.invalidate_index()
         if item.parent():
             item.parent().removeChild(item)
         else:
@@ -266,6 +440,7 @@ class DropTreeWidget(QTreeWidget):
         if self.mark_dirty_cb:
             self.mark_dirty_cb()
 
+    @traced()
     def _maybe_populate_children(self, item: QTreeWidgetItem):
         meta = item.data(0, ROLE_META) or {}
         if not isinstance(meta, dict):
@@ -274,15 +449,19 @@ class DropTreeWidget(QTreeWidget):
             return
         dir_path = cast(str, meta.get('fullpath') or item.text(0))
         files = self.get_files_cb([dir_path]) or []
+        unchecked = set(meta.pop('unchecked', None) or [])
         for fp in files:
             child = QTreeWidgetItem([""])
             set_item_path_display(child, fp, 'file', populated=True)
             child.setFlags(child.flags() | Qt.ItemFlag.ItemIsUserCheckable)
-            child.setCheckState(0, Qt.CheckState.Checked)
+            child.setCheckState(0, Qt.CheckState.Unchecked if fp in unchecked else Qt.CheckState.Checked)
             item.addChild(child)
             self._attach_remove_button(child)
+            self._index_add(child, dir_path)
         meta['populated'] = True
         item.setData(0, ROLE_META, meta)
+        if self._filter_text:
+            self.apply_filter(self._filter_text)
         if not bool(item.data(0, ROLE_HOOKED)):
             def propagate(state: Qt.CheckState):
                 for j in range(item.childCount()):
@@ -295,18 +474,54 @@ class DropTreeWidget(QTreeWidget):
             self.itemChanged.connect(on_changed)  # type: ignore[arg-type]
             item.setData(0, ROLE_HOOKED, True)
 
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
 # ----- Fenêtre principale -----
 class MainWindow(QMainWindow):
+    ready = Signal()  # tâches différées du démarrage terminées (icônes, boutons de l'arbre…)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Concatenator - Sélection & concaténation")
-        self.setWindowIcon(ico("app.svg", QSize(24, 24)))
         self.resize(980, 720)
 
+        # Démarrage : la fenêtre s'affiche d'abord, le reste est fait par lots au repos
+        self._deferred: List[Callable[[], None]] = []
+        self._deferred_timer = QTimer(self)
+        self._deferred_timer.setInterval(0)
+        self._deferred_timer.timeout.connect(self._run_deferred_batch)
+        self._shown_once = False
+        self._is_ready = False
+        self._load_gen = 0
+
         self.dirty = False
         self._block_dirty = False
         self._cancel_concat = False
         self._concat_running = False
+        self._probe_gen = 0
+        self._probe = _PathProbe(self)
+        self._probe.done.connect(self._on_paths_probed)
+        self._watch_stop: threading.Event | None = None
+        self._watch_thread: threading.Thread | None = None
+        self._watch_key: tuple | None = None
+        self._watch_bridge = _WatchBridge(self)
+        self._watch_bridge.updated.connect(self._on_watch_updated)
+        self._watch_bridge.failed.connect(self._on_watch_failed)
+        self._watch_restart_timer = QTimer(self)
+        self._watch_restart_timer.setSingleShot(True)
+        self._watch_restart_timer.setInterval(600)
+        self._watch_restart_timer.timeout.connect(self._maybe_restart_watch)
+        self._estimate_gen = 0
+        self._estimate_bridge = _EstimateBridge(self)
+        self._estimate_bridge.done.connect(self._on_estimate_done)
+        self._estimate_timer = QTimer(self)
+        self._estimate_timer.setSingleShot(True)
+        self._estimate_timer.setInterval(400)
+        self._estimate_timer.timeout.connect(self._start_estimate)
 
         self._autosave_timer = QTimer(self) 
         self._autosave_timer.setSingleShot(True) 
@@ -316,15 +531,14 @@ class MainWindow(QMainWindow):
         # --- Fenêtre / central “vide” (obligatoire pour QMainWindow) ---
         central = QWidget()
         self.setCentralWidget(central)   # on ne l'utilise pas, tout est en dock
-        self.menuBar().hide()
 
         # ----- PROFIL -----
         prof_bar = QWidget()
         prof_row = QHBoxLayout(prof_bar)
         self.cmb_profile = QComboBox(); self.cmb_profile.setMinimumWidth(220)
-        self.btn_prof_new = QToolButton(); self.btn_prof_new.setAutoRaise(True); self.btn_prof_new.setIcon(ico("new_profile.svg")); self.btn_prof_new.setIconSize(QSize(18,18))
-        self.btn_prof_rename = QToolButton(); self.btn_prof_rename.setAutoRaise(True); self.btn_prof_rename.setIcon(ico("edit.svg")); self.btn_prof_rename.setIconSize(QSize(18,18))
-        self.btn_prof_delete = QToolButton(); self.btn_prof_delete.setAutoRaise(True); self.btn_prof_delete.setIcon(ico("delete.svg")); self.btn_prof_delete.setIconSize(QSize(18,18))
+        self.btn_prof_new = QToolButton(); self.btn_prof_new.setAutoRaise(True); self._defer_icon(self.btn_prof_new, "new_profile.svg"); self.btn_prof_new.setIconSize(QSize(18,18))
+        self.btn_prof_rename = QToolButton(); self.btn_prof_rename.setAutoRaise(True); self._defer_icon(self.btn_prof_rename, "edit.svg"); self.btn_prof_rename.setIconSize(QSize(18,18))
+        self.btn_prof_delete = QToolButton(); self.btn_prof_delete.setAutoRaise(True); self._defer_icon(self.btn_prof_delete, "delete.svg"); self.btn_prof_delete.setIconSize(QSize(18,18))
  
         prof_row.addWidget(self.cmb_profile, 1)
         prof_row.addWidget(self.btn_prof_new)
@@ -337,10 +551,10 @@ class MainWindow(QMainWindow):
         # Toolbar
         top_bar_w = QWidget()
         top = QHBoxLayout(top_bar_w); top.setContentsMargins(0,0,0,0)
-        self.btn_add_files = QToolButton(); self.btn_add_files.setAutoRaise(True); self.btn_add_files.setIcon(ico("add_file.svg")); self.btn_add_files.setIconSize(QSize(20,20)); self.btn_add_files.setToolTip("Ajouter des fichiers…")
-        self.btn_add_dirs  = QToolButton(); self.btn_add_dirs.setAutoRaise(True); self.btn_add_dirs.setIcon(ico("add_folder.svg")); self.btn_add_dirs.setIconSize(QSize(20,20)); self.btn_add_dirs.setToolTip("Ajouter des dossiers…")
-        self.btn_reload    = QToolButton(); self.btn_reload.setAutoRaise(True); self.btn_reload.setIcon(ico("refresh.svg")); self.btn_reload.setIconSize(QSize(20,20)); self.btn_reload.setToolTip("Recharger les dossiers (rescanner le contenu)")
-        self.btn_clear     = QToolButton(); self.btn_clear.setAutoRaise(True); self.btn_clear.setIcon(ico("delete.svg")); self.btn_clear.setIconSize(QSize(20,20)); self.btn_clear.setToolTip("Vider la liste")
+        self.btn_add_files = QToolButton(); self.btn_add_files.setAutoRaise(True); self._defer_icon(self.btn_add_files, "add_file.svg"); self.btn_add_files.setIconSize(QSize(20,20)); self.btn_add_files.setToolTip("Ajouter des fichiers…")
+        self.btn_add_dirs  = QToolButton(); self.btn_add_dirs.setAutoRaise(True); self._defer_icon(self.btn_add_dirs, "add_folder.svg"); self.btn_add_dirs.setIconSize(QSize(20,20)); self.btn_add_dirs.setToolTip("Ajouter des dossiers…")
+        self.btn_reload    = QToolButton(); self.btn_reload.setAutoRaise(True); self._defer_icon(self.btn_reload, "refresh.svg"); self.btn_reload.setIconSize(QSize(20,20)); self.btn_reload.setToolTip("Recharger les dossiers (rescanner le contenu)")
+        self.btn_clear     = QToolButton(); self.btn_clear.setAutoRaise(True); self._defer_icon(self.btn_clear, "delete.svg"); self.btn_clear.setIconSize(QSize(20,20)); self.btn_clear.setToolTip("Vider la liste")
         top.addWidget(self.btn_add_files); top.addWidget(self.btn_add_dirs); top.addWidget(self.btn_reload); top.addWidget(self.btn_clear); top.addStretch(1)
 
         # Tree
@@ -350,9 +564,28 @@ class MainWindow(QMainWindow):
         )
         self.listw.setToolTip("Glissez-déposez des fichiers/dossiers ici")
 
+        # Filtre de l'arbre
+        filter_bar_w = QWidget()
+        fl = QHBoxLayout(filter_bar_w); fl.setContentsMargins(0,0,0,0)
+        self.ed_filter = QLineEdit()
+        self.ed_filter.setPlaceholderText("Filtrer les fichiers (dossiers dépliés)…")
+        self.ed_filter.setClearButtonEnabled(True)
+        act_search = self.ed_filter.addAction(QIcon(), QLineEdit.ActionPosition.LeadingPosition)
+        self._defer_icon(act_search, "search.svg", QSize(16,16))
+        self.lbl_filter = QLabel("")
+        self.btn_check_matches = QToolButton(); self.btn_check_matches.setAutoRaise(True); self.btn_check_matches.setText("Cocher"); self.btn_check_matches.setToolTip("Cocher tous les fichiers filtrés")
+        self.btn_uncheck_matches = QToolButton(); self.btn_uncheck_matches.setAutoRaise(True); self.btn_uncheck_matches.setText("Décocher"); self.btn_uncheck_matches.setToolTip("Décocher tous les fichiers filtrés")
+        fl.addWidget(self.ed_filter, 1); fl.addWidget(self.lbl_filter)
+        fl.addWidget(self.btn_check_matches); fl.addWidget(self.btn_uncheck_matches)
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(60)
+        self._filter_timer.timeout.connect(self._apply_tree_filter)
+
         src_panel = QWidget()
         src_layout = QVBoxLayout(src_panel); src_layout.setContentsMargins(4,4,4,4)
         src_layout.addWidget(top_bar_w)
+        src_layout.addWidget(filter_bar_w)
         src_layout.addWidget(self.listw, 1)
 
         dock_sources = self._make_dock(src_panel, "Sources")
@@ -381,15 +614,55 @@ class MainWindow(QMainWindow):
         self.chk_headers = QCheckBox("Ajouter un séparateur avec le chemin du fichier"); self.chk_headers.setChecked(True)
         self.chk_ignore_bin = QCheckBox("Ignorer les fichiers binaires"); self.chk_ignore_bin.setChecked(True)
         self.chk_norm_eol = QCheckBox("Normaliser les fins de ligne en \\n"); self.chk_norm_eol.setChecked(True)
+        self.chk_disk_order = QCheckBox("Lire dans l'ordre du disque (caches froids, disques durs)")
+        self.chk_disk_order.setToolTip("Les fichiers sont lus par inode, par fenêtres, puis écrits dans l'ordre habituel.")
         ly_flags.addWidget(self.chk_recursive)
         ly_flags.addWidget(self.chk_headers)
         ly_flags.addWidget(self.chk_ignore_bin)
+        hl_gen = QHBoxLayout()
+        self.chk_skip_lock = QCheckBox("verrouillage")
+        self.chk_skip_lock.setToolTip("package-lock.json, yarn.lock, poetry.lock, Cargo.lock, go.sum…")
+        self.chk_skip_min = QCheckBox("minifiés / source maps")
+        self.chk_skip_min.setToolTip("*.min.js, *.min.css, *.map, fichiers aux lignes très longues")
+        self.chk_skip_gen = QCheckBox("générés")
+        self.chk_skip_gen.setToolTip("Stubs protobuf (_pb2.py, .pb.go…), *.designer.cs, marques « @generated », « DO NOT EDIT »…")
+        hl_gen.addWidget(QLabel("Ignorer aussi les fichiers :"))
+        hl_gen.addWidget(self.chk_skip_lock); hl_gen.addWidget(self.chk_skip_min); hl_gen.addWidget(self.chk_skip_gen)
+        hl_gen.addStretch(1)
+        ly_flags.addLayout(hl_gen)
         ly_flags.addWidget(self.chk_norm_eol)
+        ly_flags.addWidget(self.chk_disk_order)
         hl_size = QHBoxLayout()
         self.spin_maxmb = QDoubleSpinBox(); self.spin_maxmb.setDecimals(1); self.spin_maxmb.setRange(0.1, 1024.0); self.spin_maxmb.setSingleStep(0.5); self.spin_maxmb.setValue(5.0)
         hl_size.addWidget(QLabel("Taille max / fichier :")); hl_size.addWidget(self.spin_maxmb); hl_size.addWidget(QLabel("Mo"))
         ly_flags.addLayout(hl_size)
+        hl_trunc = QHBoxLayout()
+        self.chk_truncate = QCheckBox("Au-delà, garder le début")
+        self.spin_head_kb = QSpinBox(); self.spin_head_kb.setRange(1, 65536); self.spin_head_kb.setValue(64)
+        self.spin_tail_kb = QSpinBox(); self.spin_tail_kb.setRange(0, 65536); self.spin_tail_kb.setValue(16)
+        hl_trunc.addWidget(self.chk_truncate); hl_trunc.addWidget(self.spin_head_kb)
+        hl_trunc.addWidget(QLabel("Ko et la fin")); hl_trunc.addWidget(self.spin_tail_kb); hl_trunc.addWidget(QLabel("Ko"))
+        hl_trunc.addStretch(1)
+        ly_flags.addLayout(hl_trunc)
         opts_layout.addWidget(gb_flags)
+
+        gb_transforms = QGroupBox("Transformations du texte")
+        ly_transforms = QVBoxLayout(gb_transforms)
+        # Une case par étape enregistrée dans core.TRANSFORMS ('eol' a sa propre case ci-dessus)
+        self.chk_transforms: Dict[str, QCheckBox] = {}
+        for name, t in TRANSFORMS.items():
+            if name == 'eol':
+                continue
+            chk = QCheckBox(t.label)
+            self.chk_transforms[name] = chk
+            if name == 'tabs':
+                hl_tabs = QHBoxLayout()
+                self.spin_tab_size = QSpinBox(); self.spin_tab_size.setRange(1, 16); self.spin_tab_size.setValue(4)
+                hl_tabs.addWidget(chk); hl_tabs.addWidget(self.spin_tab_size); hl_tabs.addStretch(1)
+                ly_transforms.addLayout(hl_tabs)
+            else:
+                ly_transforms.addWidget(chk)
+        opts_layout.addWidget(gb_transforms)
         opts_layout.addStretch(1)
 
         dock_filters = self._make_dock(opts_panel, "Configuration")
@@ -401,21 +674,36 @@ class MainWindow(QMainWindow):
         out_row = QHBoxLayout()
         self.ed_out = QLineEdit(str(pathlib.Path.home() / 'concat.txt'))
         self.btn_browse_out = QPushButton("Parcourir…"); self.btn_browse_out.setMinimumWidth(140)
-        self.btn_open_out = QPushButton("Ouvrir"); self.btn_open_out.setIcon(ico("open.svg")); self.btn_open_out.setIconSize(QSize(18,18)); self.btn_open_out.setMinimumWidth(140)
+        self.btn_open_out = QPushButton("Ouvrir"); self._defer_icon(self.btn_open_out, "open.svg"); self.btn_open_out.setIconSize(QSize(18,18)); self.btn_open_out.setMinimumWidth(140)
+        self.cmb_format = QComboBox()
+        for label, fmt in (("Auto", 'auto'), ("Texte", 'text'), ("JSONL", 'jsonl'), ("Markdown", 'markdown')):
+            self.cmb_format.addItem(label, fmt)
+        self.cmb_format.setToolTip("Format de sortie (Auto : d'après l'extension, .jsonl / .md / texte)")
         out_row.addWidget(self.ed_out, 1)
+        out_row.addWidget(self.cmb_format)
         out_row.addWidget(self.btn_browse_out)
         out_row.addWidget(self.btn_open_out)
 
         actions = QHBoxLayout()
         self.progress = QProgressBar(); self.progress.setRange(0,100); self.progress.setValue(0)
-        self.btn_concat = QPushButton("oncaténer"); self.btn_concat.setIcon(ico("app.svg", QSize(18,18))); self.btn_concat.setIconSize(QSize(18,18)); self.btn_concat.setMinimumWidth(140)
-        self.btn_copy = QPushButton("Copier"); self.btn_copy.setIcon(ico("copy.svg")); self.btn_copy.setIconSize(QSize(18,18)); self.btn_copy.setMinimumWidth(140)
+        self.btn_concat = QPushButton("oncaténer"); self._defer_icon(self.btn_concat, "app.svg", QSize(18,18)); self.btn_concat.setIconSize(QSize(18,18)); self.btn_concat.setMinimumWidth(140)
+        self.btn_copy = QPushButton("Copier"); self._defer_icon(self.btn_copy, "copy.svg"); self.btn_copy.setIconSize(QSize(18,18)); self.btn_copy.setMinimumWidth(140)
         actions.addWidget(self.progress, 1)
         actions.addWidget(self.btn_concat)
         actions.addWidget(self.btn_copy)
 
+        self.chk_watch = QCheckBox("Surveiller les sources et régénérer la sortie automatiquement")
+        self.chk_also_clipboard = QCheckBox("Copier aussi dans le presse-papiers")
+        self.chk_split_ext = QCheckBox("Écrire aussi une sortie par extension (concat.py.txt…)")
+        self.chk_resume = QCheckBox("Reprendre une concaténation interrompue (mêmes options et fichiers)")
+        self.chk_resume.setChecked(True)
+
         va.addLayout(out_row)
         va.addLayout(actions)
+        va.addWidget(self.chk_also_clipboard)
+        va.addWidget(self.chk_split_ext)
+        va.addWidget(self.chk_resume)
+        va.addWidget(self.chk_watch)
 
         dock_actions = self._make_dock(out_actions_panel, "Sortie")
 
@@ -423,9 +711,25 @@ class MainWindow(QMainWindow):
         self.logs = QTextEdit()
         self.logs.setReadOnly(True)
         self.logs.setObjectName("LogsText")
+        self.logs.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.logs.customContextMenuRequested.connect(self._show_logs_menu)
 
         dock_logs = self._make_dock(self.logs, "Logs")
 
+        # ----- ESTIMATION -----
+        self.estimate_view = QPlainTextEdit()
+        self.estimate_view.setReadOnly(True)
+        self.estimate_view.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.estimate_view.setPlaceholderText("Estimation (stat uniquement) de la prochaine concaténation.")
+        self.dock_estimate = self._make_dock(self.estimate_view, "Estimation")
+        self.dock_estimate.visibilityChanged.connect(lambda vis: vis and self._estimate_timer.start())
+
+        # ----- APERÇU -----
+        self.preview = PreviewPanel()
+        self._defer(lambda: self.preview.set_icons(ico))
+        dock_preview = self._make_dock(self.preview, "Aperçu")
+        dock_preview.visibilityChanged.connect(self._on_preview_visibility)
+
         # ----- Placement des docks -----
         # Colonne de gauche (haut->bas) : Profil / Sources / Filtres
         self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, dock_profile)
@@ -439,6 +743,9 @@ class MainWindow(QMainWindow):
 
         # Bas (sur toute la largeur) : Logs
         self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, dock_logs)
+        self.tabifyDockWidget(dock_logs, dock_preview)
+        self.tabifyDockWidget(dock_logs, self.dock_estimate)
+        dock_logs.raise_()
 
         # Tailles initiales approximatives (facultatif)
         self.resizeDocks([dock_profile, dock_sources, dock_filters], [80, 420, 180], Qt.Orientation.Vertical)
@@ -447,7 +754,7 @@ class MainWindow(QMainWindow):
         # Notif d’accueil légère
         self.notify("Prêt.", details="Glissez-déposez des fichiers ou dossiers, puis Concaténer / Copier.")
 
-        docks = [dock_profile, dock_sources, dock_filters, dock_actions, dock_logs]
+        docks = [dock_profile, dock_sources, dock_filters, dock_actions, dock_logs, dock_preview, self.dock_estimate]
 
         # 1) Sauvegarder quand un dock change d’emplacement (zone ou position dans la zone)
         for d in docks:
@@ -468,10 +775,14 @@ class MainWindow(QMainWindow):
         self.btn_add_dirs.clicked.connect(self.on_add_dirs)
         self.btn_reload.clicked.connect(self.on_reload)
         self.btn_clear.clicked.connect(self.on_clear)
+        self.ed_filter.textChanged.connect(lambda _t: self._filter_timer.start())
+        self.btn_check_matches.clicked.connect(lambda: self._check_filter_matches(True))
+        self.btn_uncheck_matches.clicked.connect(lambda: self._check_filter_matches(False))
         self.btn_browse_out.clicked.connect(self.on_browse_out)
         self.btn_concat.clicked.connect(self.on_concat)
         self.btn_copy.clicked.connect(self.on_copy_to_clipboard)
         self.btn_open_out.clicked.connect(self.on_open_out)
+        self.chk_watch.toggled.connect(self.on_watch_toggled)
 
         self.cmb_profile.currentIndexChanged.connect(self.on_profile_combo_changed)
         self.btn_prof_new.clicked.connect(self.on_profile_new)
@@ -485,20 +796,72 @@ class MainWindow(QMainWindow):
         self.chk_recursive.toggled.connect(self.mark_dirty)
         self.chk_headers.toggled.connect(self.mark_dirty)
         self.chk_ignore_bin.toggled.connect(self.mark_dirty)
+        self.chk_skip_lock.toggled.connect(self.mark_dirty)
+        self.chk_skip_min.toggled.connect(self.mark_dirty)
+        self.chk_skip_gen.toggled.connect(self.mark_dirty)
         self.chk_norm_eol.toggled.connect(self.mark_dirty)
+        self.chk_disk_order.toggled.connect(self.mark_dirty)
         self.spin_maxmb.valueChanged.connect(self.mark_dirty)
+        self.chk_truncate.toggled.connect(self.mark_dirty)
+        self.spin_head_kb.valueChanged.connect(self.mark_dirty)
+        self.spin_tail_kb.valueChanged.connect(self.mark_dirty)
+        for chk in self.chk_transforms.values():
+            chk.toggled.connect(self.mark_dirty)
+        self.spin_tab_size.valueChanged.connect(self.mark_dirty)
+        self.cmb_format.currentIndexChanged.connect(self.mark_dirty)
         self.ed_out.textChanged.connect(self.mark_dirty)
 
         self.init_profiles_and_load()
         self._last_profile_name = self.current_profile_name()
         s = QSettings(); s.beginGroup("ui")
         s.endGroup()
-        self.setWindowIcon(ico("app.svg", QSize(24, 24)))
-        self._fix_delete_column_width()
+        self._defer(self._set_app_icon)
 
         # Notif d’accueil légère
         self.notify("Prêt.", details="Glissez-déposez des fichiers ou dossiers, puis Concaténer / Copier.")
 
+    # ----- Démarrage différé -----
+    def _defer(self, task: Callable[[], None]) -> None:
+        """Exécute task au repos, après le premier affichage (par lots, voir _run_deferred_batch)."""
+        self._deferred.append(task)
+        if self._shown_once:
+            self._deferred_timer.start()
+
+    def _defer_icon(self, target, name: str, size: QSize = QSize(20, 20)) -> None:
+        self._defer(lambda: target.setIcon(ico(name, size)))
+
+    def _set_app_icon(self):
+        icon = ico("app.svg", QSize(24, 24))
+        self.setWindowIcon(icon)
+        QApplication.setWindowIcon(icon)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._shown_once:
+            self._start_deferred()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Filet de sécurité si la fenêtre n'est pas peinte (démarrage réduit…)
+        QTimer.singleShot(250, self._start_deferred)
+
+    def _start_deferred(self):
+        if not self._shown_once:
+            self._shown_once = True
+            self._deferred_timer.start()
+
+    def _run_deferred_batch(self):
+        # ~25 ms de travail par passage dans la boucle d'événements : l'interface reste réactive
+        deadline = time.perf_counter() + 0.025
+        while self._deferred and time.perf_counter() < deadline:
+            self._deferred.pop(0)()
+        if self._deferred:
+            return
+        self._deferred_timer.stop()
+        if not self._is_ready:
+            self._is_ready = True
+            self.ready.emit()
+
     # ----- Notifications -----
     def notify(self, message: str, level: str = "info", details: Optional[str] = None):
         text = message.strip()
@@ -513,6 +876,30 @@ class MainWindow(QMainWindow):
                 self.logs.append(f"[{ts}] {text}\n")
 
 
+    def _show_logs_menu(self, pos):
+        menu = self.logs.createStandardContextMenu()
+        menu.addSeparator()
+        act = menu.addAction("Enregistrer une trace de performance")
+        act.setCheckable(True)
+        act.setChecked(tracing.enabled())
+        act.toggled.connect(self._toggle_tracing)
+        menu.exec(self.logs.mapToGlobal(pos))
+        menu.deleteLater()
+
+    def _toggle_tracing(self, on: bool):
+        if on:
+            tracing.start()
+            self.notify("Trace de performance démarrée.",
+                        details="Décochez l'option pour l'écrire (format Chrome : chrome://tracing, ui.perfetto.dev).")
+            return
+        try:
+            path = tracing.stop()
+        except OSError as e:
+            self.notify("Trace non écrite.", level="warn", details=str(e))
+            return
+        if path:
+            self.notify("Trace de performance écrite.", details=path)
+
     # ----- Divers helpers UI -----
 
     def _on_dock_location_changed(self, dock: QDockWidget, area: Qt.DockWidgetArea):
@@ -544,11 +931,6 @@ class MainWindow(QMainWindow):
         self.notify("Dock déplacé.", details=f"{name} → {human}")
 
         
-    def _fix_delete_column_width(self):
-        try:
-            self.listw.fix_delete_column_width()
-        except Exception:
-            pass
     
     def _make_dock(self, child: QWidget, name: str) -> QDockWidget:
         dock = QDockWidget(name, self)
@@ -565,6 +947,10 @@ class MainWindow(QMainWindow):
         self.dirty = True
         self.setWindowTitle("Concatenator - Sélection & concaténation")
         self._autosave_timer.start()
+        if self._watch_stop is not None:
+            self._watch_restart_timer.start()
+        if self.dock_estimate.isVisible():
+            self._estimate_timer.start()
 
     def clear_dirty(self):
         self.dirty = False
@@ -575,11 +961,7 @@ class MainWindow(QMainWindow):
         return "profiles"
 
     def list_profiles(self) -> List[str]:
-        s = QSettings()
-        s.beginGroup(self.profiles_root())
-        names = s.childGroups()
-        s.endGroup()
-        return sorted(names)
+        return profiles.list_profiles()
 
     def current_profile_name(self) -> str:
         return self.cmb_profile.currentText().strip()
@@ -651,18 +1033,7 @@ class MainWindow(QMainWindow):
         if new in self.list_profiles():
             self.notify(f"Le profil « {new} » existe déjà.", level="warn")
             return
-        s = QSettings()
-        s.beginGroup(self.profiles_root())
-        s.beginGroup(old)
-        keys = s.allKeys()
-        values = {k: s.value(k) for k in keys}
-        s.endGroup()
-        s.beginGroup(new)
-        for k, v in values.items():
-            s.setValue(k, v)
-        s.endGroup()
-        s.remove(old)
-        s.endGroup()
+        profiles.rename_profile(old, new)
         self.refresh_profiles_combo(select=new)
         self.clear_dirty()
         self._last_profile_name = new
@@ -673,10 +1044,7 @@ class MainWindow(QMainWindow):
         if not name:
             return
         # Suppression directe (pas de popup) + notification
-        s = QSettings()
-        s.beginGroup(self.profiles_root())
-        s.remove(name)
-        s.endGroup()
+        profiles.delete_profile(name)
         self.refresh_profiles_combo()
         if self.cmb_profile.count() == 0:
             self.ensure_default_profile()
@@ -685,109 +1053,233 @@ class MainWindow(QMainWindow):
         self._last_profile_name = self.current_profile_name()
         self.notify(f"Profil « {name} » supprimé.")
 
-    # ----- Enregistrement / chargement d'un profil -----
-    def save_profile_to_settings(self, prof_name: str):
+    def _migrate_legacy_profiles(self):
+        """Convertit une fois pour toutes les profils QSettings (ancien format) en fichiers JSON."""
         s = QSettings()
         s.beginGroup(self.profiles_root())
-        s.beginGroup(prof_name)
+        legacy = s.childGroups()
+        if not legacy:
+            s.endGroup()
+            return
+        existing = set(self.list_profiles())
+        for name in legacy:
+            if name not in existing:
+                s.beginGroup(name)
+                prof = Profile(name=name)
+                for entry in cast(list[str], s.value("list/items", [], list)):
+                    try:
+                        path, chk = entry.rsplit('|', 1)
+                    except ValueError:
+                        path, chk = entry, '1'
+                    path = os.path.normpath(os.path.abspath(path))
+                    kind = 'dir' if os.path.isdir(path) else 'file'
+                    prof.items.append(ProfileItem(path=path, kind=kind, checked=(chk == '1')))
+                prof.exts = cast(str, s.value("opts/exts", prof.exts, str))
+                prof.excludedirs = cast(str, s.value("opts/excludedirs", prof.excludedirs, str))
+                prof.recursive = cast(bool, s.value("opts/recursive", prof.recursive, bool))
+                prof.headers = cast(bool, s.value("opts/headers", prof.headers, bool))
+                prof.ignore_bin = cast(bool, s.value("opts/ignore_bin", prof.ignore_bin, bool))
+                prof.normalize_eol = cast(bool, s.value("opts/normalize_eol", prof.normalize_eol, bool))
+                prof.max_mb = float(cast(float, s.value("opts/max_mb", prof.max_mb, float)))
+                prof.out_path = cast(str, s.value("out/path", prof.out_path, str))
+                geo = s.value("ui/geometry", None)
+                if isinstance(geo, QByteArray):
+                    prof.ui_geometry = bytes(geo.toBase64().data()).decode('ascii')
+                st = s.value("ui/state", None)
+                if isinstance(st, QByteArray):
+                    prof.ui_state = bytes(st.toBase64().data()).decode('ascii')
+                s.endGroup()
+                profiles.save_profile(prof)
+            s.remove(name)
+        s.endGroup()
+        self.notify("Profils migrés vers le nouveau format.", details=", ".join(legacy))
 
-        items: list[str] = []
+    # ----- Enregistrement / chargement d'un profil -----
+    def save_profile_to_settings(self, prof_name: str):
+        prof = Profile(name=prof_name)
         for i in range(self.listw.topLevelItemCount()):
             it = self.listw.topLevelItem(i)
             if it is None:
                 continue
-            chk = '1' if it.checkState(0) == Qt.CheckState.Checked else '0'
-            items.append(f"{get_item_fullpath(it)}|{chk}")
-        s.setValue("list/items", items)
-
-        s.setValue("opts/exts", self.ed_exts.text())
-        s.setValue("opts/excludedirs", self.ed_excludedirs.text())
-        s.setValue("opts/recursive", self.chk_recursive.isChecked())
-        s.setValue("opts/headers", self.chk_headers.isChecked())
-        s.setValue("opts/ignore_bin", self.chk_ignore_bin.isChecked())
-        s.setValue("opts/normalize_eol", self.chk_norm_eol.isChecked())
-        s.setValue("opts/max_mb", self.spin_maxmb.value())
-        s.setValue("out/path", self.ed_out.text())
-
-        s.setValue("ui/geometry", self.saveGeometry())
-        s.setValue("ui/state", self.saveState())
- 
-
-        s.endGroup()
-        s.endGroup()
+            meta = it.data(0, ROLE_META) or {}
+            if not isinstance(meta, dict):
+                meta = {}
+            checked = it.checkState(0) == Qt.CheckState.Checked
+            unchecked: list[str] = []
+            if checked and meta.get('type') == 'dir':
+                if meta.get('populated'):
+                    for j in range(it.childCount()):
+                        ch = it.child(j)
+                        if ch is not None and ch.checkState(0) != Qt.CheckState.Checked:
+                            unchecked.append(get_item_fullpath(ch))
+                else:
+                    unchecked = list(meta.get('unchecked') or [])
+            prof.items.append(ProfileItem(
+                path=get_item_fullpath(it),
+                kind='dir' if meta.get('type') == 'dir' else 'file',
+                checked=checked,
+                unchecked=unchecked,
+            ))
+
+        prof.exts = self.ed_exts.text()
+        prof.excludedirs = self.ed_excludedirs.text()
+        prof.recursive = self.chk_recursive.isChecked()
+        prof.headers = self.chk_headers.isChecked()
+        prof.ignore_bin = self.chk_ignore_bin.isChecked()
+        prof.skip_lockfiles = self.chk_skip_lock.isChecked()
+        prof.skip_minified = self.chk_skip_min.isChecked()
+        prof.skip_generated = self.chk_skip_gen.isChecked()
+        prof.normalize_eol = self.chk_norm_eol.isChecked()
+        prof.read_order = 'inode' if self.chk_disk_order.isChecked() else 'path'
+        prof.max_mb = self.spin_maxmb.value()
+        prof.truncate_large = self.chk_truncate.isChecked()
+        prof.head_kb = self.spin_head_kb.value()
+        prof.tail_kb = self.spin_tail_kb.value()
+        prof.transforms = self._checked_transforms()
+        prof.tab_size = self.spin_tab_size.value()
+        prof.out_path = self.ed_out.text()
+        prof.also_clipboard = self.chk_also_clipboard.isChecked()
+        prof.output_format = cast(str, self.cmb_format.currentData())
+        prof.split_by_ext = self.chk_split_ext.isChecked()
+
+        prof.ui_geometry = bytes(self.saveGeometry().toBase64().data()).decode('ascii')
+        prof.ui_state = bytes(self.saveState().toBase64().data()).decode('ascii')
+
+        profiles.save_profile(prof)
         QSettings().setValue("profiles/current", prof_name)
 
+    @traced()
     def load_profile_from_settings(self, prof_name: str):
         self._block_dirty = True
         try:
-            s = QSettings()
-            s.beginGroup(self.profiles_root())
-            s.beginGroup(prof_name)
+            try:
+                prof = profiles.load_profile(prof_name)
+            except (OSError, ValueError) as e:
+                self.notify(f"Profil « {prof_name} » illisible.", level="warn", details=str(e))
+                prof = None
+            if prof is None:
+                prof = Profile(name=prof_name)
+
+            # Les éléments s'affichent tout de suite avec le type mémorisé ;
+            # leur existence est vérifiée ensuite en arrière-plan.
             self.listw.blockSignals(True)
             self.listw.clear()
-            items = cast(list[str], s.value("list/items", [], list))
-            if items:
-                existing = set()
-                for entry in items:
-                    try:
-                        path, chk = entry.rsplit('|', 1)
-                    except ValueError:
-                        path, chk = entry, '1'
-                    path = os.path.normpath(os.path.abspath(path))
-                    if path in existing:
-                        continue
-                    existing.add(path)
-                    it = QTreeWidgetItem([""])
-                    if os.path.isdir(path):
-                        set_item_path_display(it, path, 'dir', populated=False)
-                        it.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
-                    else:
-                        set_item_path_display(it, path, 'file', populated=True)
-                    it.setFlags(it.flags() | Qt.ItemFlag.ItemIsUserCheckable)
-                    it.setCheckState(0, Qt.CheckState.Checked if chk == '1' else Qt.CheckState.Unchecked)
-                    self.listw.addTopLevelItem(it)
-                    self.listw._attach_remove_button(it)
+            existing = set()
+            added: List[QTreeWidgetItem] = []
+            for entry in prof.items:
+                path = os.path.normpath(os.path.abspath(entry.path))
+                if path in existing:
+                    continue
+                existing.add(path)
+                it = QTreeWidgetItem([""])
+                if entry.kind == 'dir':
+                    set_item_path_display(it, path, 'dir', populated=False)
+                    it.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+                    if entry.unchecked:
+                        meta = it.data(0, ROLE_META)
+                        meta['unchecked'] = list(entry.unchecked)
+                        it.setData(0, ROLE_META, meta)
+                else:
+                    set_item_path_display(it, path, 'file', populated=True)
+                it.setFlags(it.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+                it.setCheckState(0, Qt.CheckState.Checked if entry.checked else Qt.CheckState.Unchecked)
+                self.listw.addTopLevelItem(it)
+                added.append(it)
             self.listw.blockSignals(False)
-
-            exts = cast(Optional[str], s.value("opts/exts", None, str))
-            if exts is not None:
-                self.ed_exts.setText(exts)
-            exdirs = cast(Optional[str], s.value("opts/excludedirs", None, str))
-            if exdirs is not None:
-                self.ed_excludedirs.setText(exdirs)
-
-            self.chk_recursive.setChecked(cast(bool, s.value("opts/recursive", self.chk_recursive.isChecked(), bool)))
-            self.chk_headers.setChecked(cast(bool, s.value("opts/headers", self.chk_headers.isChecked(), bool)))
-            self.chk_ignore_bin.setChecked(cast(bool, s.value("opts/ignore_bin", self.chk_ignore_bin.isChecked(), bool)))
-            self.chk_norm_eol.setChecked(cast(bool, s.value("opts/normalize_eol", self.chk_norm_eol.isChecked(), bool)))
-
-            max_mb = cast(Optional[float], s.value("opts/max_mb", None, float))
-            if max_mb is not None:
-                try:
-                    self.spin_maxmb.setValue(float(max_mb))
-                except Exception:
-                    pass
-
-            outp = cast(Optional[str], s.value("out/path", None, str))
-            if outp is not None:
-                self.ed_out.setText(outp)
-
-            geo = cast(Optional[QByteArray], s.value("ui/geometry", None))
-            if geo:
-                self.restoreGeometry(geo)
-            st = cast(Optional[QByteArray], s.value("ui/state", None))
-            if st:
-                self.restoreState(st)
-
-            s.endGroup()
-            s.endGroup()
+            # Boutons « retirer » : créés au repos, par petits lots
+            self._load_gen += 1
+            for i in range(0, len(added), 25):
+                self._defer(lambda chunk=added[i:i + 25], gen=self._load_gen: self._attach_buttons(chunk, gen))
+
+            self.ed_exts.setText(prof.exts)
+            self.ed_excludedirs.setText(prof.excludedirs)
+            self.chk_recursive.setChecked(prof.recursive)
+            self.chk_headers.setChecked(prof.headers)
+            self.chk_ignore_bin.setChecked(prof.ignore_bin)
+            self.chk_skip_lock.setChecked(prof.skip_lockfiles)
+            self.chk_skip_min.setChecked(prof.skip_minified)
+            self.chk_skip_gen.setChecked(prof.skip_generated)
+            self.chk_norm_eol.setChecked(prof.normalize_eol)
+            self.chk_disk_order.setChecked(prof.read_order == 'inode')
+            try:
+                self.spin_maxmb.setValue(float(prof.max_mb))
+            except Exception:
+                pass
+            self.chk_truncate.setChecked(prof.truncate_large)
+            self.spin_head_kb.setValue(int(prof.head_kb))
+            self.spin_tail_kb.setValue(int(prof.tail_kb))
+            for name, chk in self.chk_transforms.items():
+                chk.setChecked(name in prof.transforms)
+            self.spin_tab_size.setValue(int(prof.tab_size))
+            if prof.out_path:
+                self.ed_out.setText(prof.out_path)
+            self.chk_also_clipboard.setChecked(prof.also_clipboard)
+            idx = self.cmb_format.findData(prof.output_format)
+            self.cmb_format.setCurrentIndex(max(0, idx))
+            self.chk_split_ext.setChecked(prof.split_by_ext)
+
+            if prof.ui_geometry:
+                self.restoreGeometry(QByteArray.fromBase64(prof.ui_geometry.encode('ascii')))
+            if prof.ui_state:
+                self.restoreState(QByteArray.fromBase64(prof.ui_state.encode('ascii')))
 
             self.clear_dirty()
             QSettings().setValue("profiles/current", prof_name)
         finally:
             self._block_dirty = False
+        self._start_path_probe()
+
+    def _attach_buttons(self, items: List[QTreeWidgetItem], gen: int):
+        if gen != self._load_gen:
+            return  # un autre profil a été chargé entre-temps : ces éléments n'existent plus
+        for it in items:
+            try:
+                if it.treeWidget() is self.listw:
+                    self.listw._attach_remove_button(it)
+            except RuntimeError:
+                pass  # élément supprimé entre-temps (liste vidée…)
+
+    def _start_path_probe(self):
+        self._probe_gen += 1
+        self._probe.start(self._probe_gen, self.listw.all_paths())
+
+    def _on_paths_probed(self, generation: int, result: dict):
+        if generation != self._probe_gen:
+            return  # profil changé entre-temps
+        missing = 0
+        self.listw.blockSignals(True)
+        try:
+            for i in range(self.listw.topLevelItemCount()):
+                it = self.listw.topLevelItem(i)
+                if it is None:
+                    continue
+                path = get_item_fullpath(it)
+                kind = result.get(path)
+                if kind is None:
+                    continue
+                if kind == 'missing':
+                    missing += 1
+                    it.setForeground(0, QBrush(QColor("#999999")))
+                    it.setToolTip(0, f"{path} (introuvable)")
+                    continue
+                meta = it.data(0, ROLE_META) or {}
+                if isinstance(meta, dict) and meta.get('type') != kind:
+                    set_item_path_display(it, path, kind, populated=(kind == 'file'))
+                    if kind == 'dir' and meta.get('unchecked'):
+                        # Enfants décochés du profil, appliqués au premier dépliage : à garder
+                        fresh = it.data(0, ROLE_META)
+                        fresh['unchecked'] = meta['unchecked']
+                        it.setData(0, ROLE_META, fresh)
+                    policy = (QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator if kind == 'dir'
+                              else QTreeWidgetItem.ChildIndicatorPolicy.DontShowIndicator)
+                    it.setChildIndicatorPolicy(policy)
+        finally:
+            self.listw.blockSignals(False)
+        if missing:
+            self.notify("Chemins introuvables dans le profil.", level="warn", details=f"{missing} élément(s).")
 
     def init_profiles_and_load(self):
+        self._migrate_legacy_profiles()
         self.ensure_default_profile()
         last = QSettings().value("profiles/current")
         if last and last in self.list_profiles():
@@ -810,6 +1302,19 @@ class MainWindow(QMainWindow):
         self.mark_dirty()
         self.notify("Liste vidée.")
 
+    # ----- Filtre de l'arbre -----
+    def _apply_tree_filter(self):
+        text = self.ed_filter.text()
+        n = self.listw.apply_filter(text)
+        self.lbl_filter.setText(f"{n} fichier(s)" if text.strip() else "")
+
+    def _check_filter_matches(self, checked: bool):
+        if not self.ed_filter.text().strip():
+            return
+        n = self.listw.set_matches_checked(checked)
+        self.notify("Filtre : éléments cochés." if checked else "Filtre : éléments décochés.",
+                    details=f"{n} élément(s) modifié(s).")
+
     def on_reload(self):
         """Re-scanne le contenu des dossiers listés (utile après changements)."""
         # Pour chaque dossier racine : vider les enfants et re-populer
@@ -821,6 +1326,7 @@ class MainWindow(QMainWindow):
             meta = it.data(0, ROLE_META) or {}
             if isinstance(meta, dict) and meta.get('type') == 'dir':
                 # Flush enfants
+                self.listw.invalidate_index()
                 while it.childCount() > 0:
                     it.takeChild(0)
                 meta['populated'] = False
@@ -854,19 +1360,41 @@ class MainWindow(QMainWindow):
             include_exts=normalize_exts(parse_csv_list(self.ed_exts.text())),
             exclude_dirs=set(parse_csv_list(self.ed_excludedirs.text())),
             ignore_binaries=self.chk_ignore_bin.isChecked(),
+            skip_lockfiles=self.chk_skip_lock.isChecked(),
+            skip_minified=self.chk_skip_min.isChecked(),
+            skip_generated=self.chk_skip_gen.isChecked(),
             max_mb=self.spin_maxmb.value(),
             add_headers=self.chk_headers.isChecked(),
             normalize_eol=self.chk_norm_eol.isChecked(),
+            truncate_large=self.chk_truncate.isChecked(),
+            head_kb=self.spin_head_kb.value(),
+            tail_kb=self.spin_tail_kb.value(),
+            output_format=self._output_format(),
+            transforms=tuple(self._checked_transforms()),
+            tab_size=self.spin_tab_size.value(),
+            read_order='inode' if self.chk_disk_order.isChecked() else 'path',
         )
 
-    def gather_candidate_files(self, paths: Iterable[str], opts: Options) -> List[str]:
-        return gather_candidate_files(paths, opts)
+    def _checked_transforms(self) -> List[str]:
+        return [name for name, chk in self.chk_transforms.items() if chk.isChecked()]
+
+    def _output_format(self) -> str:
+        fmt = cast(str, self.cmb_format.currentData())
+        return fmt if fmt in OUTPUT_FORMATS else format_for_path(self.ed_out.text().strip())
+
+    def gather_candidate_files(self, paths: Iterable[str], opts: Options) -> FileTable:
+        from scancache import default_cache
+        cache = default_cache()
+        files = gather_candidate_files(paths, opts, cache)
+        cache.flush()
+        return files
 
     def _set_progress(self, i: int, total: int):
         pct = int(i * 100 / max(1, total))
         self.progress.setValue(pct)
 
     def on_concat(self):
+        from scancache import cached_renderer
         from PySide6.QtWidgets import QApplication
         if self._concat_running:
             self._cancel_concat = True
@@ -898,18 +1426,53 @@ class MainWindow(QMainWindow):
             if self._cancel_concat:
                 raise ConcatCancelled()
 
+        # Une seule passe : fichier, presse-papiers et sorties par extension
+        sinks: List[Sink] = [FileSink(out_path)]
+        clip = StringSink() if self.chk_also_clipboard.isChecked() else None
+        if clip is not None:
+            sinks.append(clip)
+        if self.chk_split_ext.isChecked():
+            sinks.extend(ext_sinks(files, out_path))
+        # Sortie unique : points de reprise (annulation / plantage), et reprise si possible
+        single = len(sinks) == 1
+        resume = False
+        if single and self.chk_resume.isChecked() and os.path.exists(checkpoint_path(out_path)):
+            try:
+                ck = load_checkpoint(out_path, files, opts)
+            except ResumeError as e:
+                self.notify("Reprise impossible, concaténation complète.", level="warn", details=str(e))
+            else:
+                resume = True
+                self.notify("Reprise de la concaténation interrompue.",
+                            details=f"{ck['index']} / {len(files)} fichier(s) déjà traités.")
+
+        had_preview = self.preview.is_open()
+        self.preview.release()  # la projection doit être libérée avant de réécrire la sortie
+        before = _mtime_ns(out_path)
         try:
-            written, skipped = concat_to_file(files, opts, out_path, cb)
+            if single:
+                written, skipped = concat_to_file(files, opts, out_path, cb, cached_renderer(),
+                                                  checkpoint=True, resume=resume)
+            else:
+                written, skipped = concat_to_sinks(files, opts, sinks, cb, cached_renderer())
         except ConcatCancelled:
             self.progress.setValue(0)
-            try:
-                os.remove(out_path)
-            except Exception:
-                pass
-            self.notify("Concaténation annulée.")
+            if single:
+                self.notify("Concaténation annulée.",
+                            details="Sortie précédente intacte ; « Concaténer » reprendra là où la passe s'est arrêtée.")
+                return
+            self.notify("Concaténation annulée.", details="Sorties précédentes intactes.")
         else:
             self.progress.setValue(100)
             details_lines = [f"Sortie : {out_path}", f"Écrits : {written} fichier(s)."]
+            if before is not None and _mtime_ns(out_path) == before:
+                details_lines.append("Contenu identique : fichier de sortie non modifié.")
+            if clip is not None:
+                QApplication.clipboard().setText(clip.text())
+                details_lines.append("Copié dans le presse-papiers.")
+            extra = [s for s in sinks[1:] if isinstance(s, FileSink) and s.count]
+            if extra:
+                details_lines.append("Par extension : " + ", ".join(os.path.basename(s.path) for s in extra))
             if skipped:
                 details_lines.append(f"Ignorés : {len(skipped)}")
                 preview = "\n".join([f"- {p} ({why})" for p, why in skipped[:5]])
@@ -917,12 +1480,15 @@ class MainWindow(QMainWindow):
                     preview += "\n…"
                 details_lines.append(preview)
             self.notify("Concaténation terminée.", details="\n".join(details_lines))
+            if had_preview:
+                self.preview.open(out_path)
         finally:
             self.btn_concat.setText("oncaténer") # not a spelling mistake
             self._concat_running = False
             self._cancel_concat = False
 
     def on_copy_to_clipboard(self):
+        from scancache import cached_renderer
         from PySide6.QtWidgets import QApplication
         paths = self.listw.checked_paths()
         if not paths:
@@ -937,7 +1503,7 @@ class MainWindow(QMainWindow):
         def cb(i, total):
             self._set_progress(i, total)
             QApplication.processEvents()
-        final_text, written, skipped = concat_to_string(files, opts, cb)
+        final_text, written, skipped = concat_to_string(files, opts, cb, cached_renderer())
         self.progress.setValue(100)
         QApplication.clipboard().setText(final_text)
         details_lines = [f"Fichiers copiés : {written}."]
@@ -949,7 +1515,110 @@ class MainWindow(QMainWindow):
             details_lines.append(preview)
         self.notify("Concaténation copiée dans le presse-papiers.", details="\n".join(details_lines))
 
+    # ----- Aperçu -----
+    def _on_preview_visibility(self, visible: bool):
+        path = self.ed_out.text().strip()
+        if visible and (not self.preview.is_open() or self.preview.path != path):
+            self.preview.open(path)
+
+    # ----- Estimation (stat uniquement, en arrière-plan) -----
+    def _start_estimate(self):
+        paths = self.listw.checked_paths()
+        opts = self.current_options()
+        self._estimate_gen += 1
+        gen = self._estimate_gen
+        bridge = self._estimate_bridge
+
+        def run():
+            from scancache import default_cache
+            try:
+                result: object = estimate_files(gather_candidate_files(paths, opts, default_cache()), opts)
+            except Exception as e:
+                result = f"Estimation impossible : {e}"
+            bridge.done.emit(gen, result)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _on_estimate_done(self, generation: int, result: object):
+        if generation != self._estimate_gen:
+            return  # filtres modifiés entre-temps : un calcul plus récent arrive
+        if isinstance(result, str):
+            self.estimate_view.setPlainText(result)
+        else:
+            self.estimate_view.setPlainText(format_estimate(result))
+
+    # ----- Mode surveillance -----
+    def _current_watch_key(self) -> tuple:
+        return (tuple(self.listw.checked_paths()), repr(self.current_options()), self.ed_out.text().strip())
+
+    def on_watch_toggled(self, on: bool):
+        if on:
+            self._start_watch()
+        else:
+            self._stop_watch()
+            self.notify("Surveillance arrêtée.")
+
+    def _start_watch(self):
+        from scancache import cached_renderer, default_cache
+        from watch import watch
+        self._stop_watch()
+        if self._watch_thread is not None:
+            # La surveillance précédente doit avoir quitté sa régénération avant que la
+            # nouvelle ne commence la sienne ; arrêtée, elle l'abandonne au fichier suivant.
+            self._watch_thread.join()
+            self._watch_thread = None
+        key = self._current_watch_key()
+        roots, _, out_path = key
+        if not roots or not out_path:
+            self.notify("Surveillance impossible.", level="warn", details="Cochez des sources et définissez un fichier de sortie.")
+            self.chk_watch.blockSignals(True)
+            self.chk_watch.setChecked(False)
+            self.chk_watch.blockSignals(False)
+            return
+        opts = self.current_options()
+        stop = threading.Event()
+        bridge = self._watch_bridge
+
+        def run():
+            try:
+                watch(list(roots), opts, out_path, stop=stop, on_update=bridge.updated.emit,
+                      lister=default_cache(), render=cached_renderer())
+            except Exception as e:
+                if not stop.is_set():
+                    bridge.failed.emit(str(e))
+
+        self._watch_stop = stop
+        self._watch_key = key
+        self._watch_thread = threading.Thread(target=run, daemon=True)
+        self._watch_thread.start()
+        self.notify("Surveillance démarrée.", details=out_path)
+
+    def _stop_watch(self):
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+        self._watch_stop = None
+        self._watch_key = None
+
+    def _maybe_restart_watch(self):
+        if self._watch_stop is not None and self._current_watch_key() != self._watch_key:
+            self._start_watch()
+
+    def _on_watch_updated(self, written: int, skipped: list, rendered: int):
+        if self.preview.is_open():
+            self.preview.reload()
+        details = f"{written} fichier(s) écrits, {rendered} relu(s)."
+        if skipped:
+            details += f" Ignorés : {len(skipped)}"
+        self.notify("Sortie régénérée.", details=details)
+
+    def _on_watch_failed(self, message: str):
+        self._stop_watch()
+        self.chk_watch.setChecked(False)
+        self.notify("Surveillance interrompue.", level="warn", details=message)
+
     def closeEvent(self, event):
+        self._stop_watch()
+        self.preview.release()
         try:
             if self.dirty:
                 name = self.current_profile_name() or "Défaut"
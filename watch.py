@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""Mode surveillance : garde le fichier de sortie à jour quand les sources changent."""
+from __future__ import annotations
+import os
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from filetable import FileTable
+from models import Options
+from core import (
+    DirListing, DirLister, RenderFn, gather_candidate_files, list_dir, render_file, replace_if_changed
+)
+
+# Clé de validité d'un fichier : (mtime_ns, taille)
+StatKey = Tuple[int, int]
+UpdateCb = Callable[[int, List[Tuple[str, str]], int], None] | None
+
+_COPY_CHUNK = 1024 * 1024
+
+
+class WatchStopped(Exception):
+    """Arrêt demandé pendant un relevé ou une régénération : le travail en cours est abandonné."""
+
+
+def _stat_key(path: str) -> Optional[StatKey]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _copy_range(src, dst, offset: int, length: int) -> None:
+    """Recopie [offset, offset+length) de src vers dst (copy_file_range si disponible)."""
+    if length <= 0:
+        return
+    dst.flush()
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is not None:
+        try:
+            src_fd, dst_fd = src.fileno(), dst.fileno()
+            pos, remaining = offset, length
+            while remaining > 0:
+                n = copy_file_range(src_fd, dst_fd, remaining, pos)
+                if n <= 0:
+                    break
+                pos += n
+                remaining -= n
+            if remaining == 0:
+                dst.seek(0, os.SEEK_END)
+                return
+            offset, length = pos, remaining
+        except OSError:
+            pass
+        dst.seek(0, os.SEEK_END)
+    src.seek(offset)
+    while length > 0:
+        buf = src.read(min(_COPY_CHUNK, length))
+        if not buf:
+            break
+        dst.write(buf)
+        length -= len(buf)
+
+
+class Watcher:
+    """
+    Maintient out_path à jour pour un ensemble de racines.
+
+    Chaque segment de sortie est mémorisé (position, longueur, clé stat) :
+    lors d'une régénération, les segments des fichiers inchangés sont recopiés
+    tels quels depuis l'ancienne sortie, seuls les fichiers modifiés sont relus.
+    """
+
+    def __init__(self, roots: Iterable[str], opts: Options, out_path: str,
+                 excluded_files: Iterable[str] = (), lister: DirLister = list_dir,
+                 render: RenderFn | None = None, stop: Optional[threading.Event] = None):
+        self.roots = list(roots)
+        self._stop = stop or threading.Event()
+        self._base_lister = lister
+        self._render = render or render_file
+        self.opts = opts
+        self.out_path = os.path.abspath(out_path)
+        # Nom propre à cette surveillance : une surveillance précédente qui termine sa
+        # régénération n'écrit ni ne renomme le même fichier temporaire.
+        directory, base = os.path.split(self.out_path)
+        self._tmp_path = os.path.join(directory, f".{base}.{secrets.token_hex(4)}.watch-tmp")
+        self.excluded_files = {os.path.normpath(p) for p in excluded_files}
+        self._listings: Dict[str, Tuple[int, DirListing]] = {}
+        self._seen: Dict[str, Tuple[int, DirListing]] = {}
+        self._files: Optional[FileTable] = None
+        self._stats: Dict[str, Optional[StatKey]] = {}
+        self._segments: Dict[str, Tuple[int, int, StatKey]] = {}
+        self._skipped: Dict[str, Tuple[str, Optional[StatKey]]] = {}
+        self._out_key: Optional[StatKey] = None
+        self._built_stats: Dict[str, Optional[StatKey]] = {}
+
+    def _check_stop(self) -> None:
+        if self._stop.is_set():
+            raise WatchStopped()
+
+    # ----- Observation -----
+    def _list(self, d: str) -> DirListing:
+        """Lister de dossier mis en cache tant que le mtime du dossier ne change pas."""
+        self._check_stop()
+        try:
+            mtime = os.stat(d).st_mtime_ns
+        except OSError:
+            return [], []
+        cached = self._listings.get(d)
+        if cached is not None and cached[0] == mtime:
+            listing = cached[1]
+        else:
+            listing = self._base_lister(d)
+        self._seen[d] = (mtime, listing)
+        return listing
+
+    def _dirs_changed(self) -> bool:
+        for d, (mtime, _) in self._listings.items():
+            try:
+                if os.stat(d).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def scan(self) -> Set[str]:
+        """Relève l'état des sources. Retourne les fichiers changés depuis la dernière génération."""
+        if self._files is None or self._dirs_changed():
+            # Seuls les dossiers dont le mtime a changé sont relistés
+            self._seen = {}
+            files = gather_candidate_files(self.roots, self.opts, lister=self._list)
+            self._listings, self._seen = self._seen, {}
+            self._files = files.select(lambda f: f not in self.excluded_files
+                                       and not f.startswith(self.out_path))
+        st = os.stat
+        stats: Dict[str, Optional[StatKey]] = {}
+        for i, f in enumerate(self._files):
+            if not i % 1024:
+                self._check_stop()
+            try:
+                r = st(f)
+                stats[f] = (r.st_mtime_ns, r.st_size)
+            except OSError:
+                stats[f] = None
+        self._stats = stats
+        built = self._built_stats
+        changed = {f for f, k in stats.items() if built.get(f, ()) != k}
+        changed.update(f for f in built if f not in stats)
+        if not changed and _stat_key(self.out_path) != self._out_key:
+            changed.add(self.out_path)
+        return changed
+
+    def settle(self, paths: Iterable[str]) -> bool:
+        """Re-stat quelques fichiers (et les dossiers). Retourne True s'ils bougent encore."""
+        moving = self._dirs_changed()
+        for f in paths:
+            if f not in self._stats:
+                continue
+            key = _stat_key(f)
+            if key != self._stats[f]:
+                self._stats[f] = key
+                moving = True
+        return moving
+
+    # ----- Régénération -----
+    def rebuild(self) -> Tuple[int, List[Tuple[str, str]], int]:
+        """Régénère la sortie. Retourne (nb_fichiers_écrits, skipped, nb_fichiers_relus)."""
+        reuse = self._out_key is not None and _stat_key(self.out_path) == self._out_key
+        segments: Dict[str, Tuple[int, int, StatKey]] = {}
+        skipped: Dict[str, Tuple[str, Optional[StatKey]]] = {}
+        rendered = 0
+
+        old = open(self.out_path, 'rb') if reuse else None
+        try:
+            with open(self._tmp_path, 'wb') as new:
+                pos = 0
+                run_start, run_len = -1, 0
+
+                def flush_run():
+                    nonlocal run_start, run_len
+                    if old is not None and run_len:
+                        _copy_range(old, new, run_start, run_len)
+                    run_start, run_len = -1, 0
+
+                for f in self._files or []:
+                    key = self._stats.get(f)
+                    seg = self._segments.get(f) if reuse else None
+                    if seg is not None and key is not None and seg[2] == key:
+                        off, length, _ = seg
+                        if run_len and run_start + run_len == off:
+                            run_len += length
+                        else:
+                            flush_run()
+                            run_start, run_len = off, length
+                        segments[f] = (pos, length, key)
+                        pos += length
+                        continue
+                    prev_skip = self._skipped.get(f)
+                    if prev_skip is not None and key is not None and prev_skip[1] == key:
+                        skipped[f] = prev_skip
+                        continue
+
+                    flush_run()
+                    self._check_stop()
+                    text, reason = self._render(f, self.opts)
+                    rendered += 1
+                    if text is None:
+                        skipped[f] = (reason or "", key)
+                        continue
+                    data = text.encode('utf-8')
+                    new.write(data)
+                    if key is not None:
+                        segments[f] = (pos, len(data), key)
+                    pos += len(data)
+                flush_run()
+        except BaseException:
+            try:
+                os.remove(self._tmp_path)
+            except OSError:
+                pass
+            raise
+        finally:
+            if old is not None:
+                old.close()
+
+        # Contenu identique (fichier touché sans modification…) : sortie laissée intacte, mtime compris
+        replace_if_changed(self._tmp_path, self.out_path)
+        self._segments = segments
+        self._skipped = skipped
+        self._built_stats = dict(self._stats)
+        self._out_key = _stat_key(self.out_path)
+        return len(segments), [(p, why) for p, (why, _) in skipped.items()], rendered
+
+
+def watch(roots: Iterable[str], opts: Options, out_path: str,
+          stop: Optional[threading.Event] = None, on_update: UpdateCb = None,
+          excluded_files: Iterable[str] = (), interval: float = 0.2, debounce: float = 0.1,
+          max_delay: float = 2.0, lister: DirLister = list_dir,
+          render: RenderFn | None = None) -> None:
+    """
+    Surveille les racines jusqu'à ce que stop soit levé. Un arrêt pendant un
+    relevé ou une régénération l'interrompt (sortie laissée telle quelle).
+
+    Les rafales de modifications sont regroupées : la sortie n'est régénérée
+    que lorsque les fichiers modifiés n'ont plus bougé pendant `debounce`
+    secondes (au plus `max_delay`). Les fichiers touchés ensuite seront pris
+    en compte au passage suivant.
+    """
+    stop = stop or threading.Event()
+    w = Watcher(roots, opts, out_path, excluded_files, lister, render, stop)
+    try:
+        _watch_loop(w, stop, on_update, interval, debounce, max_delay)
+    except WatchStopped:
+        pass
+
+
+def _watch_loop(w: Watcher, stop: threading.Event, on_update: UpdateCb,
+                interval: float, debounce: float, max_delay: float) -> None:
+    w.scan()
+    written, skipped, rendered = w.rebuild()
+    if on_update:
+        on_update(written, skipped, rendered)
+
+    while not stop.wait(interval):
+        changed = w.scan()
+        if not changed:
+            continue
+        deadline = time.monotonic() + max_delay
+        while not stop.wait(debounce):
+            if not w.settle(changed) or time.monotonic() >= deadline:
+                break
+            changed = w.scan()
+        if stop.is_set():
+            break
+        written, skipped, rendered = w.rebuild()
+        if on_update:
+            on_update(written, skipped, rendered)